@@ -0,0 +1,34 @@
+"""rule matches
+
+Revision ID: 8a1e0c5d2f47
+Revises: 325b901ac712
+Create Date: 2026-10-19 17:20:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8a1e0c5d2f47"
+down_revision = "325b901ac712"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rule_matches",
+        sa.Column("version", sa.String(length=16), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("bank", sa.Text(), nullable=False),
+        sa.Column("rules", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "version", "description", "bank", name=op.f("pk_rule_matches")
+        ),
+        schema="pfbudget",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rule_matches", schema="pfbudget")
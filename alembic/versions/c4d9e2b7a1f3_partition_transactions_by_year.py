@@ -0,0 +1,236 @@
+"""partition transactions by year
+
+Optionally, and only on Postgres, range partitions the transactions by date, one
+partition per year, with
+    alembic -x partition=year upgrade head
+or, on a database already past this revision, by downgrading it and upgrading again
+with the same argument. Without it, this revision leaves the schema as it is.
+
+Partitioning needs Postgres 11 or later. The partition key must be part of the
+primary key, which becomes (id, date), so the notes, links, split originals and the
+categorized and tagged side tables can no longer reference the transactions by id
+alone. Their foreign keys are dropped, and their deletes cascade by a trigger
+instead. Changing a transaction's date to another year moves its row to another
+partition, which Postgres runs as a delete and an insert, so the trigger skips the
+transactions that were only moved.
+
+The side tables themselves aren't partitioned, as their partition key would have to
+be written along with every category and tag.
+
+Years after the last partition fall in the default one. A new year must be added
+before it has any transactions, e.g.
+    CREATE TABLE pfbudget.transactions_2040 PARTITION OF pfbudget.transactions
+        FOR VALUES FROM ('2040-01-01') TO ('2041-01-01');
+
+Revision ID: c4d9e2b7a1f3
+Revises: 8a1e0c5d2f47
+Create Date: 2026-10-19 19:40:00.000000+00:00
+
+"""
+import datetime as dt
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c4d9e2b7a1f3"
+down_revision = "8a1e0c5d2f47"
+branch_labels = None
+depends_on = None
+
+# empty partitions for the coming years
+AHEAD = 5
+
+# the first with primary keys and default partitions on partitioned tables
+MINIMUM = (11,)
+
+# foreign keys to the transactions, by id
+references = [
+    ("notes", "id"),
+    ("links", "original"),
+    ("links", "link"),
+    ("transactions", "original"),
+    ("transactions_categorized", "id"),
+    ("transactions_tagged", "id"),
+]
+
+
+def upgrade() -> None:
+    if _partitioning():
+        _partition()
+
+
+def downgrade() -> None:
+    if _partitioned():
+        _unpartition()
+
+
+def _partitioning() -> bool:
+    partition = context.get_x_argument(as_dictionary=True).get("partition")
+    if partition is None:
+        return False
+
+    if partition != "year":
+        raise ValueError(f"Unknown partitioning {partition}, only year is supported")
+    if op.get_bind().dialect.name != "postgresql":
+        raise ValueError("Partitioning is only supported on Postgres")
+    if op.get_bind().dialect.server_version_info < MINIMUM:
+        raise ValueError("Partitioning needs Postgres 11 or later")
+    return True
+
+
+def _partitioned() -> bool:
+    return op.get_bind().dialect.name == "postgresql" and bool(
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = 'pfbudget.transactions'::regclass"
+            )
+        )
+        .first()
+    )
+
+
+def _partition() -> None:
+    first, last = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT min(extract(year FROM date))::int, "
+                "max(extract(year FROM date))::int FROM pfbudget.transactions"
+            )
+        )
+        .one()
+    )
+    this = dt.date.today().year
+    years = range(min(first or this, this), max(last or this, this) + AHEAD + 1)
+
+    for table, column in references:
+        op.drop_constraint(
+            f"fk_{table}_{column}_transactions",
+            table,
+            type_="foreignkey",
+            schema="pfbudget",
+        )
+
+    op.execute("ALTER TABLE pfbudget.transactions RENAME TO transactions_unpartitioned")
+    op.execute(
+        "CREATE TABLE pfbudget.transactions (LIKE pfbudget.transactions_unpartitioned "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)"
+    )
+    for year in years:
+        op.execute(
+            f"CREATE TABLE pfbudget.transactions_{year} "
+            "PARTITION OF pfbudget.transactions "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        )
+    op.execute(
+        "CREATE TABLE pfbudget.transactions_default "
+        "PARTITION OF pfbudget.transactions DEFAULT"
+    )
+    op.execute(
+        "INSERT INTO pfbudget.transactions "
+        "SELECT * FROM pfbudget.transactions_unpartitioned"
+    )
+
+    _move_sequence("transactions_unpartitioned", "transactions")
+    op.execute("DROP TABLE pfbudget.transactions_unpartitioned")
+
+    # the partition key must be part of the primary key
+    op.create_primary_key(
+        op.f("pk_transactions"), "transactions", ["id", "date"], schema="pfbudget"
+    )
+    _bank()
+
+    op.execute(
+        """
+        CREATE FUNCTION pfbudget.transactions_cascade() RETURNS trigger AS $$
+        BEGIN
+            -- a date update across years deletes the row from its partition, but
+            -- the after triggers only run once it's inserted into the other one
+            IF NOT EXISTS (SELECT 1 FROM pfbudget.transactions WHERE id = OLD.id)
+            THEN
+                DELETE FROM pfbudget.transactions_categorized WHERE id = OLD.id;
+                DELETE FROM pfbudget.transactions_tagged WHERE id = OLD.id;
+                DELETE FROM pfbudget.notes WHERE id = OLD.id;
+                DELETE FROM pfbudget.links
+                    WHERE original = OLD.id OR link = OLD.id;
+                DELETE FROM pfbudget.transactions WHERE original = OLD.id;
+            END IF;
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER transactions_cascade AFTER DELETE ON pfbudget.transactions "
+        "FOR EACH ROW EXECUTE FUNCTION pfbudget.transactions_cascade()"
+    )
+
+
+def _unpartition() -> None:
+    op.execute("DROP TRIGGER transactions_cascade ON pfbudget.transactions")
+    op.execute("DROP FUNCTION pfbudget.transactions_cascade()")
+
+    op.execute("ALTER TABLE pfbudget.transactions RENAME TO transactions_partitioned")
+    op.execute(
+        "CREATE TABLE pfbudget.transactions (LIKE pfbudget.transactions_partitioned "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    op.execute(
+        "INSERT INTO pfbudget.transactions "
+        "SELECT * FROM pfbudget.transactions_partitioned"
+    )
+
+    _move_sequence("transactions_partitioned", "transactions")
+    # along with its partitions
+    op.execute("DROP TABLE pfbudget.transactions_partitioned")
+
+    op.create_primary_key(
+        op.f("pk_transactions"), "transactions", ["id"], schema="pfbudget"
+    )
+    _bank()
+
+    for table, column in references:
+        op.create_foreign_key(
+            op.f(f"fk_{table}_{column}_transactions"),
+            table,
+            "transactions",
+            [column],
+            ["id"],
+            source_schema="pfbudget",
+            referent_schema="pfbudget",
+            ondelete="CASCADE",
+        )
+
+
+def _move_sequence(old: str, new: str) -> None:
+    """The id sequence is owned by the old table's column, and would be dropped
+    with it"""
+    op.execute(
+        f"""
+        DO $$
+        BEGIN
+            EXECUTE format(
+                'ALTER SEQUENCE %s OWNED BY pfbudget.{new}.id',
+                pg_get_serial_sequence('pfbudget.{old}', 'id')
+            );
+        END
+        $$
+        """
+    )
+
+
+def _bank() -> None:
+    """Foreign key of the rebuilt table, other than to itself"""
+    op.create_foreign_key(
+        op.f("fk_transactions_bank_banks"),
+        "transactions",
+        "banks",
+        ["bank"],
+        ["name"],
+        source_schema="pfbudget",
+        referent_schema="pfbudget",
+    )
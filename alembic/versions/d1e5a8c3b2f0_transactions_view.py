@@ -0,0 +1,37 @@
+"""transactions view
+
+Revision ID: d1e5a8c3b2f0
+Revises: c4d9e2b7a1f3
+Create Date: 2026-10-19 20:30:00.000000+00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d1e5a8c3b2f0"
+down_revision = "c4d9e2b7a1f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE VIEW pfbudget.transactions_view AS
+        SELECT t.id, t.date, t.description, t.amount, t.type, t.bank, t.original,
+            t.split, c.name AS category, c.selector, tags.tags, n.note
+        FROM pfbudget.transactions AS t
+        LEFT OUTER JOIN pfbudget.transactions_categorized AS c ON c.id = t.id
+        LEFT OUTER JOIN (
+            SELECT id, string_agg(tag, ':') AS tags
+            FROM pfbudget.transactions_tagged
+            GROUP BY id
+        ) AS tags ON tags.id = t.id
+        LEFT OUTER JOIN pfbudget.notes AS n ON n.id = t.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP VIEW pfbudget.transactions_view")
@@ -0,0 +1,199 @@
+"""Seeded synthetic ledger
+
+Builds banks, category groups, categories with their rules, tags with their rules and
+N transactions spread over a number of years. The descriptions follow what a bank
+extract looks like: a long tail of card purchases over merchants picked with a Zipf
+distribution, plus monthly salary, rent, subscriptions and transfers between the
+checking and savings accounts, which the Nullifier should cancel.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import datetime as dt
+from decimal import Decimal
+from pathlib import Path
+import random
+
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    Category,
+    CategoryGroup,
+    CategoryRule,
+    Tag,
+    TagRule,
+)
+
+# merchant, category, mean amount, standard deviation
+MERCHANTS = [
+    ("CONTINENTE", "groceries", 45, 30),
+    ("PINGO DOCE", "groceries", 25, 15),
+    ("LIDL", "groceries", 30, 20),
+    ("MERCADONA", "groceries", 35, 25),
+    ("MCDONALDS", "restaurants", 9, 3),
+    ("UBER EATS", "restaurants", 18, 6),
+    ("TELEPIZZA", "restaurants", 16, 5),
+    ("GALP", "fuel", 55, 15),
+    ("BP", "fuel", 50, 15),
+    ("REPSOL", "fuel", 52, 15),
+    ("UBER", "transport", 11, 6),
+    ("CP COMBOIOS", "transport", 8, 4),
+    ("METRO LISBOA", "transport", 40, 1),
+    ("FNAC", "shopping", 60, 50),
+    ("WORTEN", "shopping", 80, 70),
+    ("ZARA", "shopping", 45, 25),
+    ("IKEA", "shopping", 120, 90),
+    ("AMAZON", "shopping", 35, 30),
+    ("FARMACIA", "health", 15, 10),
+    ("CUF", "health", 60, 30),
+    ("NOS", "utilities", 45, 2),
+    ("EDP", "utilities", 70, 20),
+    ("EPAL", "utilities", 25, 5),
+]
+
+SUBSCRIPTIONS = [("NETFLIX.COM", 12), ("SPOTIFY", 7), ("GYM FITNESS", 35)]
+
+CITIES = ["LISBOA", "PORTO", "BRAGA", "COIMBRA", "FARO", "SETUBAL"]
+
+CATEGORIES = {
+    "income": ["salary"],
+    "housing": ["rent", "utilities"],
+    "daily": ["groceries", "restaurants", "health"],
+    "transport": ["fuel", "transport"],
+    "leisure": ["shopping", "subscriptions"],
+}
+
+
+@dataclass
+class Ledger:
+    banks: list[Bank]
+    groups: list[CategoryGroup]
+    categories: list[Category]
+    tags: list[Tag]
+    rows: list[tuple[dt.date, str, Decimal, str]]
+
+    def transactions(self) -> list[BankTransaction]:
+        """Fresh, uncategorized, ORM transactions"""
+        return [
+            BankTransaction(date, description, amount, bank=bank)
+            for date, description, amount, bank in self.rows
+        ]
+
+    @property
+    def rules(self) -> list[CategoryRule]:
+        return [r for c in self.categories if c.name != "null" for r in c.rules]
+
+    @property
+    def null_rules(self) -> list[CategoryRule]:
+        return [r for c in self.categories if c.name == "null" for r in c.rules]
+
+    @property
+    def tag_rules(self) -> list[TagRule]:
+        return [r for t in self.tags for r in t.rules]
+
+    def csv(self, path: Path, bank: str) -> None:
+        """Writes a bank's rows in the default parsers.yaml format"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("date\tdescription\tvalue date\tamount\n")
+            for date, description, amount, name in self.rows:
+                if name == bank:
+                    f.write(f"{date.isoformat()}\t{description}\t\t{amount}\n")
+
+
+def generate(
+    n: int, years: int = 3, rules: int = 200, seed: int = 0, end: dt.date = dt.date.max
+) -> Ledger:
+    rng = random.Random(seed)
+    if end == dt.date.max:
+        end = dt.date(2023, 12, 31)
+    start = end.replace(year=end.year - years) + dt.timedelta(days=1)
+    days = (end - start).days + 1
+
+    banks = [
+        Bank("checking", "CHECKING", AccountType.checking),
+        Bank("savings", "SAVINGS", AccountType.savings),
+        Bank("visa", "VISA", AccountType.VISA),
+    ]
+    groups = [CategoryGroup(g) for g in CATEGORIES]
+    categories = [Category(c, g) for g, cs in CATEGORIES.items() for c in cs]
+    categories.append(Category("null"))
+    tags = [Tag("subscription"), Tag("fuel"), Tag("big")]
+
+    rows: list[tuple[dt.date, str, Decimal, str]] = []
+
+    def money(mean: float, sd: float) -> Decimal:
+        return Decimal(f"{max(rng.gauss(mean, sd), 0.5):.2f}")
+
+    # recurring transactions
+    month = start.replace(day=1)
+    while month <= end and len(rows) < n:
+        rows.append(
+            (month.replace(day=25), "SALARY ACME CORP", Decimal(2500), "checking")
+        )
+        rows.append(
+            (month.replace(day=1), "DD LANDLORD RENT", Decimal(-900), "checking")
+        )
+        for name, amount in SUBSCRIPTIONS:
+            rows.append((month.replace(day=8), name, Decimal(-amount), "visa"))
+
+        day = month.replace(day=rng.randint(1, 27))
+        rows.append((day, "TRF SAVINGS", Decimal(-300), "checking"))
+        arrival = day + dt.timedelta(days=rng.randint(0, 2))
+        rows.append((arrival, "TRF FROM CHECKING", Decimal(300), "savings"))
+
+        month = (month + dt.timedelta(days=32)).replace(day=1)
+
+    rows = [r for r in rows if start <= r[0] <= end][:n]
+
+    # card purchases, over merchants following a Zipf distribution
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(MERCHANTS))]
+    for merchant, _, mean, sd in rng.choices(MERCHANTS, weights, k=n - len(rows)):
+        date = start + dt.timedelta(days=rng.randrange(days))
+        bank = "visa" if rng.random() < 0.4 else "checking"
+        description = (
+            f"COMPRA {rng.randint(1000, 9999)} {merchant} {rng.choice(CITIES)}"
+        )
+        rows.append((date, description, -money(mean, sd), bank))
+
+    rows.sort(key=lambda r: r[0])
+
+    # rules, in the proportion of a hand-built rule set: mostly merchant regexes, some
+    # exact descriptions and a long tail of rules that rarely, if ever, match
+    bycategory = {c.name: c for c in categories}
+    for merchant, category, _, _ in MERCHANTS:
+        bycategory[category].rules.append(CategoryRule(regex=merchant))
+    bycategory["salary"].rules.append(
+        CategoryRule(description="SALARY ACME CORP", min=Decimal(0))
+    )
+    bycategory["rent"].rules.append(CategoryRule(description="DD LANDLORD RENT"))
+    for name, _ in SUBSCRIPTIONS:
+        bycategory["subscriptions"].rules.append(CategoryRule(description=name))
+    bycategory["null"].rules.append(CategoryRule(regex="^TRF "))
+
+    names = [c.name for c in categories if c.name != "null"]
+    for i in range(max(rules - sum(len(c.rules) for c in categories), 0)):
+        category = bycategory[rng.choice(names)]
+        if i % 3:
+            category.rules.append(CategoryRule(regex=f"MERCHANT {i:04}"))
+        else:
+            category.rules.append(
+                CategoryRule(
+                    description=f"DD COMPANY {i:04}",
+                    bank=rng.choice(banks).name,
+                    max=Decimal(0),
+                )
+            )
+
+    for category in categories:
+        for rule in category.rules:
+            rule.name = category.name
+
+    tags[0].rules = [TagRule(description=name) for name, _ in SUBSCRIPTIONS]
+    tags[1].rules = [TagRule(regex="GALP|BP|REPSOL")]
+    tags[2].rules = [TagRule(max=Decimal(-100))]
+    for tag in tags:
+        for rule in tag.rules:
+            rule.tag = tag.name
+
+    return Ledger(banks, groups, categories, tags, rows)
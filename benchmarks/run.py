@@ -0,0 +1,290 @@
+"""ETL hot path benchmarks over a synthetic ledger
+
+    python benchmarks/run.py [--scale 1k 100k 1M] [--repeat 3] [--output FILE]
+                             [--baseline FILE] [--tolerance 0.2] [--min-delta 0.005]
+                             [--confirm 5]
+
+Each benchmark runs against SQLite, best of --repeat after an untimed warm-up
+run, with its setup left out of the measurement. Results are written as JSON and
+compared with the baseline, if one exists, exiting with an error when any
+benchmark got slower than the tolerance and by more than --min-delta seconds,
+below which timings are mostly noise. A benchmark that looks slower is measured
+again, best of --confirm, before it counts as a regression.
+"""
+
+from __future__ import annotations
+import argparse
+from collections.abc import Callable
+import contextlib
+from dataclasses import dataclass
+import datetime as dt
+import json
+import os
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generator import Ledger, generate  # noqa: E402
+from pfbudget.common.frame import TransactionFrame  # noqa: E402
+from pfbudget.common.types import ExportFormat  # noqa: E402
+from pfbudget.core.command import BackupCommand, ImportBackupCommand  # noqa: E402
+from pfbudget.db.client import Client  # noqa: E402
+from pfbudget.db.model import Base, Transaction  # noqa: E402
+from pfbudget.extract.parsers import parse_data  # noqa: E402
+from pfbudget.transform.cache import RuleCache  # noqa: E402
+from pfbudget.transform.categorizer import Categorizer  # noqa: E402
+from pfbudget.transform.nullifier import Nullifier  # noqa: E402
+from pfbudget.transform.tagger import Tagger  # noqa: E402
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+PARSERS = """\
+Banks:
+  - checking
+
+checking:
+  encoding: utf-8
+  separator: "\\t"
+  date_fmt: "%Y-%m-%d"
+  start: 2
+  debit:
+    date: 0
+    text: 1
+    value: 3
+"""
+
+
+@dataclass
+class Context:
+    ledger: Ledger
+    directory: Path
+    client: Client
+    """database populated with the ledger, for the read only benchmarks"""
+
+    def database(self, name: str) -> Client:
+        path = self.directory / f"{name}.db"
+        path.unlink(missing_ok=True)
+        return database(path)
+
+
+@dataclass
+class Benchmark:
+    setup: Callable[[Context], Any]
+    run: Callable[[Any], Any]
+
+
+def database(path: Path) -> Client:
+    client = Client(
+        f"sqlite:///{path}",
+        execution_options={"schema_translate_map": {"pfbudget": None}},
+    )
+    Base.metadata.create_all(client.engine)
+    return client
+
+
+def populate(client: Client, ledger: Ledger) -> None:
+    client.insert(ledger.banks)
+    client.insert(ledger.groups)
+    client.insert(ledger.categories)
+    client.insert(ledger.tags)
+    client.insert(ledger.transactions())
+
+
+def parse(ctx: Context) -> Path:
+    (ctx.directory / "parsers.yaml").write_text(PARSERS)
+    path = ctx.directory / "checking.csv"
+    ctx.ledger.csv(path, "checking")
+    return path
+
+
+def parse_run(path: Path) -> Any:
+    with contextlib.chdir(path.parent):
+        return parse_data(path, {"bank": ["checking"], "creditcard": None})
+
+
+def backup(ctx: Context) -> tuple[Client, Path]:
+    return ctx.client, ctx.directory / "backup.json"
+
+
+def backup_run(state: tuple[Client, Path]) -> None:
+    BackupCommand(*state, ExportFormat.JSON).execute()
+
+
+def restore(ctx: Context) -> tuple[Client, Path]:
+    path = ctx.directory / "restore.json"
+    if not path.exists():
+        BackupCommand(ctx.client, path, ExportFormat.JSON).execute()
+    return ctx.database("restore"), path
+
+
+def restore_run(state: tuple[Client, Path]) -> None:
+    ImportBackupCommand(*state, ExportFormat.JSON).execute()
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "parse_data": Benchmark(parse, parse_run),
+    "nullifier": Benchmark(
+        lambda ctx: (Nullifier(ctx.ledger.null_rules), ctx.ledger.transactions()),
+        lambda s: s[0].transform_inplace(s[1]),
+    ),
+    "categorizer": Benchmark(
+        lambda ctx: (Categorizer(ctx.ledger.rules), ctx.ledger.transactions()),
+        lambda s: s[0].transform_inplace(s[1]),
+    ),
+    "categorizer_cached": Benchmark(
+        lambda ctx: (
+            Categorizer(ctx.ledger.rules, cache=RuleCache(ctx.ledger.rules)),
+            ctx.ledger.transactions(),
+        ),
+        lambda s: s[0].transform_inplace(s[1]),
+    ),
+    "tagger": Benchmark(
+        lambda ctx: (Tagger(ctx.ledger.tag_rules), ctx.ledger.transactions()),
+        lambda s: s[0].transform_inplace(s[1]),
+    ),
+    "frame_load": Benchmark(lambda ctx: ctx.client, TransactionFrame.load),
+    "frame_nullify": Benchmark(
+        lambda ctx: (TransactionFrame.load(ctx.client), ctx.ledger.null_rules),
+        lambda s: s[0].nullify(s[1]),
+    ),
+    "frame_categorize": Benchmark(
+        lambda ctx: (TransactionFrame.load(ctx.client), ctx.ledger.rules),
+        lambda s: s[0].categorize(s[1]),
+    ),
+    "client_insert": Benchmark(
+        lambda ctx: (ctx.database("insert"), ctx.ledger.transactions()),
+        lambda s: s[0].insert(s[1]),
+    ),
+    "client_select": Benchmark(lambda ctx: ctx.client, lambda c: c.select(Transaction)),
+    "backup": Benchmark(backup, backup_run),
+    "import_backup": Benchmark(restore, restore_run),
+}
+
+
+def processor() -> str:
+    """CPU model, which platform.processor() leaves empty on Linux"""
+    with contextlib.suppress(OSError):
+        for line in Path("/proc/cpuinfo").read_text().splitlines():
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+    return platform.processor()
+
+
+def measure(benchmark: Benchmark, ctx: Context, repeat: int) -> float:
+    # the first run also pays for the regex compilation, SQL statement caching and
+    # lazy imports, which would otherwise be measured when --repeat is 1
+    benchmark.run(benchmark.setup(ctx))
+
+    best = float("inf")
+    for _ in range(repeat):
+        state = benchmark.setup(ctx)
+        start = time.perf_counter()
+        benchmark.run(state)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def regressed(
+    seconds: float, reference: float, tolerance: float, min_delta: float
+) -> bool:
+    return seconds > reference * (1 + tolerance) and seconds - reference > min_delta
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, Any],
+    tolerance: float,
+    min_delta: float = 0.0,
+) -> list[str]:
+    regressions = []
+    for scale, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            reference = baseline["results"].get(scale, {}).get(name)
+            if not reference:
+                continue
+
+            ratio = result["seconds"] / reference["seconds"]
+            print(f"{scale:>5} {name:>18}: {ratio - 1:+.0%} vs baseline")
+            if regressed(result["seconds"], reference["seconds"], tolerance, min_delta):
+                regressions.append(f"{scale} {name}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", nargs="+", choices=SCALES, default=["1k"])
+    parser.add_argument("--benchmark", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--min-delta", type=float, default=0.005)
+    parser.add_argument("--confirm", type=int, default=5)
+    args = parser.parse_args()
+
+    names = args.benchmark if args.benchmark else list(BENCHMARKS)
+    results: dict[str, dict[str, Any]] = {}
+
+    baseline: dict[str, Any] = {"results": {}}
+    if args.baseline.exists() and args.baseline.resolve() != args.output.resolve():
+        baseline = json.loads(args.baseline.read_text())
+
+    for scale in args.scale:
+        n = SCALES[scale]
+        ledger = generate(n, args.years, seed=args.seed)
+        results[scale] = {}
+
+        with tempfile.TemporaryDirectory() as directory:
+            client = database(Path(directory) / "ledger.db")
+            populate(client, ledger)
+            ctx = Context(ledger, Path(directory), client)
+
+            for name in names:
+                benchmark = BENCHMARKS[name]
+                seconds = measure(benchmark, ctx, args.repeat)
+
+                reference = baseline["results"].get(scale, {}).get(name)
+                if reference and regressed(
+                    seconds, reference["seconds"], args.tolerance, args.min_delta
+                ):
+                    seconds = min(seconds, measure(benchmark, ctx, args.confirm))
+
+                results[scale][name] = {"n": n, "seconds": seconds}
+                print(f"{scale:>5} {name:>18}: {seconds:10.4f} s")
+
+            client.engine.dispose()
+
+    output = {
+        "meta": {
+            "date": dt.datetime.now().isoformat(timespec="seconds"),
+            "command": " ".join(["python", "benchmarks/run.py", *sys.argv[1:]]),
+            "machine": platform.machine(),
+            "processor": processor(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "years": args.years,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(output, indent=4) + "\n")
+
+    if regressions := compare(results, baseline, args.tolerance, args.min_delta):
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Import time of the CLI, per subcommand
+
+Runs each subcommand under `python -X importtime` and adds up the cumulative time
+of the top-level imports, along with the number of modules imported. The commands
+run against an empty in-memory SQLite database, so they fail right after their
+imports, which is all that is measured.
+
+Compares the results with the baseline stored in startup.json and exits with an
+error if any subcommand imports more modules than before or got slower than the
+allowed tolerance. Timings are noisy, so the runs are interleaved and the best one
+is kept; the module count is deterministic.
+
+    python benchmarks/startup.py [--runs N] [--tolerance 0.25] [--update]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import re
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "startup.json"
+
+COMMANDS = {
+    "help": ["--help"],
+    "category add": ["category", "add", "benchmark"],
+    "categorize auto": ["categorize", "auto"],
+    "download": ["download", "--all", "--dry-run"],
+    "parse": ["parse", "--bank", "Bank2", "README.md"],
+    "export": ["export", "benchmark.json", "json"],
+}
+
+# import time:       self [us] |  cumulative | imported package
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def importtime(args: list[str]) -> tuple[int, int]:
+    """Total import time, in microseconds, and number of modules imported"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "pfbudget", "-db", "sqlite://"]
+        + args,
+        cwd=ROOT,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+
+    total, modules = 0, 0
+    for line in process.stderr.splitlines():
+        if match := LINE.match(line):
+            modules += 1
+            if not match.group(3):
+                total += int(match.group(2))
+    return total, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="best of N runs")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--update", action="store_true", help="store new baseline")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, int]] = {}
+    for _ in range(args.runs):
+        for name, command in COMMANDS.items():
+            us, modules = importtime(command)
+            if name not in results or us < results[name]["us"]:
+                results[name] = {"us": us, "modules": modules}
+
+    if args.update or not BASELINE.exists():
+        BASELINE.write_text(json.dumps(results, indent=4) + "\n")
+        print(f"Baseline stored in {BASELINE}")
+        return 0
+
+    baseline: dict[str, dict[str, int]] = json.loads(BASELINE.read_text())
+
+    regressions = []
+    for name, result in results.items():
+        us, modules = result["us"], result["modules"]
+        if reference := baseline.get(name):
+            ratio = us / reference["us"]
+            extra = modules - reference["modules"]
+            print(
+                f"{name:>16}: {us / 1000:8.1f} ms ({ratio - 1:+.0%}),"
+                f" {modules} modules ({extra:+})"
+            )
+            if ratio > 1 + args.tolerance or extra > 0:
+                regressions.append(name)
+        else:
+            print(f"{name:>16}: {us / 1000:8.1f} ms, {modules} modules (no baseline)")
+
+    if regressions:
+        print(f"Import time regressed for {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
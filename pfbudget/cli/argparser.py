@@ -1,30 +1,56 @@
 import argparse
 import datetime as dt
 import decimal
-from dotenv import load_dotenv
 import os
 import re
 
 from pfbudget.common.types import Operation
 from pfbudget.db.model import AccountType, SchedulePeriod
 
-load_dotenv()
 
-DEFAULT_DB = os.environ.get("DEFAULT_DB")
+def argparser() -> argparse.ArgumentParser:
+    from dotenv import load_dotenv
 
+    load_dotenv()
 
-def argparser() -> argparse.ArgumentParser:
     universal = argparse.ArgumentParser(add_help=False)
     universal.add_argument(
         "-db",
         "--database",
         nargs="?",
         help="select current database",
-        default=DEFAULT_DB,
+        default=os.environ.get("DEFAULT_DB"),
     )
 
     universal.add_argument("-v", "--verbose", action="count", default=0)
 
+    universal.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time spent on each stage to stderr, also enabled by -vv",
+    )
+    universal.add_argument(
+        "--metrics-out",
+        type=str,
+        help="write the stage timings and counters as .json or Prometheus text",
+        metavar="FILE",
+    )
+
+    universal.add_argument(
+        "--profile-out",
+        type=str,
+        help="run under cProfile, writing the pstats to FILE and the sampled stacks,"
+        " for flamegraphs, to FILE.collapsed",
+        metavar="FILE",
+    )
+
+    universal.add_argument(
+        "--remote",
+        nargs=1,
+        type=str,
+        help="send the operation to the daemon listening on this socket",
+    )
+
     period = argparse.ArgumentParser(add_help=False)
     period_group = period.add_mutually_exclusive_group()
     period_group.add_argument(
@@ -73,6 +99,15 @@ def argparser() -> argparse.ArgumentParser:
     auto = categorize.add_parser("auto")
     auto.set_defaults(op=Operation.Categorize)
     auto.add_argument("--no-nulls", action="store_false")
+    auto.add_argument(
+        "--sql", action="store_true", help="apply the rules inside the database"
+    )
+    auto.add_argument(
+        "--jobs",
+        nargs=1,
+        type=int,
+        help="worker processes evaluating the rules, 0 for one per core",
+    )
 
     categorize.add_parser("manual").set_defaults(op=Operation.ManualCategorization)
 
@@ -106,9 +141,20 @@ def argparser() -> argparse.ArgumentParser:
     # Tag
     tags(subparsers.add_parser("tag"))
 
+    # Rules coverage and cost
+    rule_commands = subparsers.add_parser("rules").add_subparsers(required=True)
+    rule_commands.add_parser("stats").set_defaults(op=Operation.RuleStats)
+
     # Link
     link(subparsers.add_parser("link"))
 
+    # Long-running service
+    daemon = subparsers.add_parser("daemon")
+    daemon.set_defaults(op=Operation.Daemon)
+    daemon.add_argument("--socket", nargs=1, default=["pfbudget.sock"], type=str)
+    daemon.add_argument("--every", nargs=1, type=int, help="sync period in minutes")
+    daemon.add_argument("--banks", nargs="+", type=str)
+
     return parser
 
 def bank(parser: argparse.ArgumentParser):
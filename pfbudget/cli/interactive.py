@@ -1,102 +1,201 @@
+from collections import deque
 import decimal
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import func, select
 
 from ..core.manager import Manager
+from ..db.client import Client
 from ..db.model import (
     Category,
     Note,
     CategorySelector,
     SplitTransaction,
     Tag,
-    Transaction,
-    TransactionCategory,
     TransactionTag,
 )
+from ..db.view import TransactionRow, transactions_view
+
+uncategorized = transactions_view.c.category.is_(None)
+
+
+class Queue:
+    """Uncategorized transactions, in date order, fetched `size` at a time
+
+    Each page continues after the last transaction of the previous one, so the
+    transactions categorized in between, which leave the view, don't shift it, and
+    the skipped ones aren't fetched again.
+    """
+
+    def __init__(self, client: Client, size: int = 100):
+        self.client = client
+        self.size = size
+        self._page: deque[TransactionRow] = deque()
+        self._last: Optional[TransactionRow] = None
+
+    def __len__(self) -> int:
+        """Transactions still uncategorized, counting the skipped ones, but not the
+        ones categorized since they were taken"""
+        stmt = select(func.count()).select_from(transactions_view).where(uncategorized)
+        with self.client.engine.connect() as connection:
+            return connection.execute(stmt).scalar_one()
+
+    def __iter__(self) -> Iterator[TransactionRow]:
+        while self._page or self._fetch():
+            yield self._page.popleft()
+
+    def _fetch(self) -> bool:
+        page = self.client.projection(uncategorized, self._last, self.size)
+        if page:
+            self._last = page[-1]
+            self._page.extend(page)
+        return bool(page)
 
 
 class Interactive:
-    help = "category(:tag)/split/note:/skip/quit"
+    help = "category(:tag)/#suggestion(:tag)/split/note:/skip/quit"
     selector = CategorySelector.manual
 
+    # candidate categories shown for each transaction
+    suggestions = 3
+
     def __init__(self, manager: Manager) -> None:
         self.manager = manager
 
-        self.categories = self.manager.database.select(Category)
-        self.tags = self.manager.database.select(Tag)
+        self.categories = {c.name for c in self.manager.database.select(Category)}
+        self.tags = {t.name for t in self.manager.database.select(Tag)}
+
+        self.rules = self.manager.cache("categories", self.manager.rules.categories)
+
+        # answers not yet written, by transaction id
+        self._categories: list[dict[str, Any]] = []
+        self._tagged: list[TransactionTag] = []
+        self._notes: dict[int, Note] = {}
+        self._changed_notes: dict[int, dict[str, Any]] = {}
 
     def intro(self) -> None:
         print(
-            f"Welcome! Available categories are {[c.name for c in self.categories]} and"
-            f" currently existing tags are {[t.name for t in self.tags]}"
+            f"Welcome! Available categories are {sorted(self.categories)} and"
+            f" currently existing tags are {sorted(self.tags)}"
         )
 
     def start(self) -> None:
         self.intro()
 
-        with self.manager.database.session as session:
-            uncategorized = session.select(
-                Transaction, lambda: ~Transaction.category.has()
-            )
-            list(uncategorized).sort()
-            n = len(uncategorized)
-            print(f"{n} left to categorize")
-
-            i = 0
-            new = []
+        queue = Queue(self.manager.database)
+        print(f"{len(queue)} left to categorize")
+
+        try:
+            for i, row in enumerate(queue, 1):
+                if not self.categorize(row, self.suggest(row)):
+                    break
+
+                # the answers are written a page at a time, rather than reloading
+                # and saving each transaction on its own
+                if i % queue.size == 0:
+                    self.save()
+        finally:
+            self.save()
+            self.rules.save(self.manager.database)
+
+    def save(self) -> None:
+        """Writes the pending categories, tags and notes"""
+        database = self.manager.database
+        database.update_categories(self._categories)
+        if self._tagged or self._notes:
+            database.insert([*self._tagged, *self._notes.values()])
+        if self._changed_notes:
+            database.update(Note, list(self._changed_notes.values()))
+
+        self._categories.clear()
+        self._tagged.clear()
+        self._notes.clear()
+        self._changed_notes.clear()
+
+    def suggest(self, row: TransactionRow) -> list[str]:
+        """Categories of the matching rules, in rule order"""
+        names = dict.fromkeys(rule.name for rule in self.rules.matches(row))
+        return list(names)[: self.suggestions]
+
+    def categorize(self, row: TransactionRow, suggestions: list[str]) -> bool:
+        """Prompts until the transaction is categorized or skipped, False on quit"""
+        current: TransactionRow | SplitTransaction = row
+        new: list[SplitTransaction] = []
 
-            while i < len(uncategorized):
-                current = uncategorized[i] if len(new) == 0 else new.pop()
-                print(current)
-                command = input("$ ")
+        while True:
+            print(current)
+            if suggestions and not new:
+                print(
+                    "Suggestions: "
+                    + ", ".join(f"#{i} {s}" for i, s in enumerate(suggestions, 1))
+                )
+            command = input("$ ")
 
-                match command:
-                    case "help":
-                        print(self.help)
+            match command:
+                case "help":
+                    print(self.help)
 
-                    case "skip":
-                        i += 1
+                case "skip":
+                    return True
 
-                    case "quit":
-                        break
+                case "quit":
+                    return False
 
-                    case "split":
-                        new = self.split(current)
-                        session.insert(new)
+                case "split":
+                    # inserted straight away, for their ids
+                    new = self.split(row)
+                    self.manager.database.insert(new, copy=False)
+                    current = new.pop()
 
-                    case other:
-                        if not other:
-                            print(self.help)
+                case other:
+                    if not other:
+                        print(self.help)
+                        continue
+
+                    if other.startswith("note:"):
+                        # TODO adding notes to a splitted transaction won't allow
+                        # categorization
+                        self.note(current, other[len("note:") :].strip())
+                        continue
+
+                    category, *tags = other.split(":")
+                    if category.startswith("#") and category[1:].isdigit():
+                        if not 0 < int(category[1:]) <= len(suggestions):
+                            print(self.help, suggestions)
                             continue
-
-                        if other.startswith("note:"):
-                            # TODO adding notes to a splitted transaction won't allow
-                            # categorization
-                            current.note = Note(other[len("note:") :].strip())
-                        else:
-                            ct = other.split(":")
-                            if (category := ct[0]) not in [
-                                c.name for c in self.categories
-                            ]:
-                                print(self.help, self.categories)
-                                continue
-
-                            tags = []
-                            if len(ct) > 1:
-                                tags = ct[1:]
-
-                            current.category = TransactionCategory(
-                                category, self.selector
-                            )
-                            for tag in tags:
-                                if tag not in [t.name for t in self.tags]:
-                                    session.insert([Tag(tag)])
-                                    self.tags = session.select(Tag)
-
-                                current.tags.add(TransactionTag(tag))
-
-                            if len(new) == 0:
-                                i += 1
-
-    def split(self, original: Transaction) -> list[SplitTransaction]:
+                        category = suggestions[int(category[1:]) - 1]
+
+                    if category not in self.categories:
+                        print(self.help, sorted(self.categories))
+                        continue
+
+                    self._categories.append(
+                        {"id": current.id, "name": category, "selector": self.selector}
+                    )
+
+                    tagged = current.tags if isinstance(current, TransactionRow) else ()
+                    for tag in dict.fromkeys(tags):
+                        if tag not in self.tags:
+                            self.manager.database.insert([Tag(tag)])
+                            self.tags.add(tag)
+
+                        if tag not in tagged:
+                            transaction_tag = TransactionTag(tag)
+                            transaction_tag.id = current.id
+                            self._tagged.append(transaction_tag)
+
+                    if not new:
+                        return True
+                    current = new.pop()
+
+    def note(self, current: TransactionRow | SplitTransaction, text: str) -> None:
+        if isinstance(current, TransactionRow) and current.note is not None:
+            self._changed_notes[current.id] = {"id": current.id, "note": text}
+        else:
+            note = self._notes[current.id] = Note(text)
+            note.id = current.id
+
+    def split(self, original: TransactionRow) -> list[SplitTransaction]:
         total = original.amount
         new: list[SplitTransaction] = []
 
@@ -0,0 +1,302 @@
+"""Columnar, in-memory, transactions
+
+A TransactionFrame holds each transaction field in its own numpy array: dates as
+int32 days since the epoch, amounts as int64 cents, and banks, categories and
+descriptions as int32 codes into a table of their distinct values, -1 meaning None.
+
+Rules are evaluated over whole columns at once, and regexes only once per distinct
+description, which in a bank extract repeat a lot. Only the transactions'
+category is kept, so tags are out of its scope.
+"""
+
+from __future__ import annotations
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+import datetime as dt
+import decimal
+import re
+import sys
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+from sqlalchemy import select
+
+from pfbudget.db.model import CategoryRule, Rule, Transaction, TransactionCategory
+from pfbudget.transform.exceptions import MoreThanOneMatchError
+from pfbudget.utils.utils import from_cents, to_cents
+
+if TYPE_CHECKING:
+    from pfbudget.db.client import Client
+
+EPOCH = dt.date(1970, 1, 1).toordinal()
+
+
+def days(date: dt.date) -> int:
+    return date.toordinal() - EPOCH
+
+
+@dataclass
+class Codes:
+    """Dictionary encoding of a column"""
+
+    values: list[str] = field(default_factory=list)
+    index: dict[str, int] = field(default_factory=dict)
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if (code := self.index.get(value)) is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def code(self, value: Optional[str]) -> int:
+        """Code of an existing value, or one that matches no row"""
+        if value is None:
+            return -1
+        return self.index.get(value, -2)
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code] if code >= 0 else None
+
+
+@dataclass
+class TransactionFrame:
+    id: npt.NDArray[np.int64]
+    date: npt.NDArray[np.int32]
+    amount: npt.NDArray[np.int64]
+    bank: npt.NDArray[np.int32]
+    category: npt.NDArray[np.int32]
+    description: npt.NDArray[np.int32]
+
+    banks: Codes
+    categories: Codes
+    descriptions: Codes
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> TransactionFrame:
+        """From (id, date, description, amount, bank, category) rows"""
+        banks, categories, descriptions = Codes(), Codes(), Codes()
+
+        columns: tuple[list[int], ...] = ([], [], [], [], [], [])
+        ids, dates, amounts, bank, category, description = columns
+        for id, date, text, amount, b, c in rows:
+            ids.append(id if id is not None else -1)
+            dates.append(days(date))
+            amounts.append(to_cents(decimal.Decimal(amount)))
+            bank.append(banks.encode(b))
+            category.append(categories.encode(c))
+            description.append(descriptions.encode(text))
+
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.array(dates, dtype=np.int32),
+            np.array(amounts, dtype=np.int64),
+            np.array(bank, dtype=np.int32),
+            np.array(category, dtype=np.int32),
+            np.array(description, dtype=np.int32),
+            banks,
+            categories,
+            descriptions,
+        )
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Transaction]) -> TransactionFrame:
+        return cls.from_rows(
+            (
+                t.id,
+                t.date,
+                t.description,
+                t.amount,
+                getattr(t, "bank", None),
+                t.category.name if t.category else None,
+            )
+            for t in transactions
+        )
+
+    @classmethod
+    def load(cls, client: Client, where: Optional[Any] = None) -> TransactionFrame:
+        """Loads the transactions straight from the SQL rows, skipping the ORM"""
+        t = Transaction.__table__
+        c = TransactionCategory.__table__
+
+        stmt = (
+            select(t.c.id, t.c.date, t.c.description, t.c.amount, t.c.bank, c.c.name)
+            .outerjoin(c, t.c.id == c.c.id)
+            .order_by(t.c.date, t.c.id)
+        )
+        if where is not None:
+            stmt = stmt.where(where)
+
+        with client.engine.connect() as connection:
+            return cls.from_rows(connection.execute(stmt))
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the columns, not counting the code tables"""
+        return sum(
+            c.nbytes
+            for c in (
+                self.id,
+                self.date,
+                self.amount,
+                self.bank,
+                self.category,
+                self.description,
+            )
+        )
+
+    def take(self, rows: npt.NDArray[Any]) -> TransactionFrame:
+        """Subset by a boolean mask or indices, sharing the code tables"""
+        return TransactionFrame(
+            self.id[rows],
+            self.date[rows],
+            self.amount[rows],
+            self.bank[rows],
+            self.category[rows],
+            self.description[rows],
+            self.banks,
+            self.categories,
+            self.descriptions,
+        )
+
+    def matches(self, rule: Rule) -> npt.NDArray[np.bool_]:
+        """Vectorized Rule.matches"""
+        mask = np.ones(len(self), dtype=np.bool_)
+
+        if rule.start is not None:
+            mask &= self.date >= days(rule.start)
+        if rule.end is not None:
+            mask &= self.date <= days(rule.end)
+        if rule.description is not None:
+            mask &= self.description == self.descriptions.code(rule.description)
+        if rule.regex:
+            regex = re.compile(rule.regex, re.IGNORECASE)
+            # empty descriptions never match, as in Rule.matches
+            table = np.fromiter(
+                (bool(d and regex.search(d)) for d in self.descriptions.values),
+                dtype=np.bool_,
+                count=len(self.descriptions.values),
+            )
+            # trailing False for the None descriptions, code -1
+            mask &= np.append(table, False)[self.description]
+        if rule.bank is not None:
+            mask &= self.bank == self.banks.code(rule.bank)
+        # amounts have cents precision, so the bounds are rounded inwards
+        if rule.min is not None:
+            mask &= self.amount >= to_cents(
+                decimal.Decimal(rule.min), decimal.ROUND_CEILING
+            )
+        if rule.max is not None:
+            mask &= self.amount <= to_cents(
+                decimal.Decimal(rule.max), decimal.ROUND_FLOOR
+            )
+
+        return mask
+
+    def categorize(self, rules: Iterable[CategoryRule]) -> int:
+        """Categorizes the uncategorized transactions with the first matching rule,
+        in place, returning how many were categorized"""
+        categorized = 0
+        for rule in rules:
+            uncategorized = self.category == -1
+            if not uncategorized.any():
+                break
+
+            matched = uncategorized & self.matches(rule)
+            self.category[matched] = self.categories.encode(rule.name)
+            categorized += int(matched.sum())
+
+        return categorized
+
+    def nullify(
+        self, rules: Sequence[Rule] = (), window: int = 4
+    ) -> list[tuple[int, int]]:
+        """Same as the Nullifier, in place, returning the nullified pairs' rows"""
+        null = self.categories.encode("null")
+
+        ruled = np.zeros(len(self), dtype=np.bool_) if rules else None
+        for rule in rules:
+            assert ruled is not None
+            ruled |= self.matches(rule)
+        if ruled is None:
+            ruled = np.ones(len(self), dtype=np.bool_)
+
+        # by amount and date, so that the candidates to cancel each transaction are
+        # a contiguous range
+        order = np.lexsort((self.date, self.amount))
+        amounts, dates = self.amount[order], self.date[order]
+
+        candidates = ruled & (self.category == -1) & np.isin(-self.amount, amounts)
+
+        pairs: list[tuple[int, int]] = []
+        for row in np.flatnonzero(candidates)[
+            np.argsort(self.date[candidates], kind="stable")
+        ]:
+            if self.category[row] != -1:
+                continue
+
+            lo = np.searchsorted(amounts, -self.amount[row], side="left")
+            hi = np.searchsorted(amounts, -self.amount[row], side="right")
+            first = lo + np.searchsorted(dates[lo:hi], self.date[row], side="left")
+            last = lo + np.searchsorted(
+                dates[lo:hi], self.date[row] + window, side="right"
+            )
+
+            cancels = order[first:last]
+            cancels = cancels[
+                (cancels != row)
+                & (self.bank[cancels] != self.bank[row])
+                & (self.category[cancels] != null)
+                & ruled[cancels]
+            ]
+
+            if len(cancels) > 1:
+                raise MoreThanOneMatchError(f"{self.row(row)} -> {cancels}")
+            if len(cancels) == 1:
+                self.category[row] = self.category[cancels[0]] = null
+                pairs.append((int(row), int(cancels[0])))
+
+        return pairs
+
+    def total(self, mask: Optional[npt.NDArray[np.bool_]] = None) -> decimal.Decimal:
+        amounts = self.amount if mask is None else self.amount[mask]
+        return from_cents(int(amounts.sum()))
+
+    def by(self, column: str) -> dict[Optional[str], decimal.Decimal]:
+        """Sum of the amounts by bank or category"""
+        codes: Codes = getattr(self, f"{column}s")
+        keys, sums = self._sum(getattr(self, column))
+        return {codes.decode(k): from_cents(int(s)) for k, s in zip(keys, sums)}
+
+    def monthly(self) -> dict[dt.date, decimal.Decimal]:
+        """Sum of the amounts by month"""
+        months = self.date.astype("datetime64[D]").astype("datetime64[M]")
+        keys, sums = self._sum(months.astype(np.int64))
+        return {
+            np.datetime64(int(k), "M").astype(dt.date): from_cents(int(s))
+            for k, s in zip(keys, sums)
+        }
+
+    def row(self, i: int) -> tuple[Any, ...]:
+        """Transaction i, decoded"""
+        return (
+            int(self.id[i]),
+            dt.date.fromordinal(int(self.date[i]) + EPOCH),
+            self.descriptions.decode(int(self.description[i])),
+            from_cents(int(self.amount[i])),
+            self.banks.decode(int(self.bank[i])),
+            self.categories.decode(int(self.category[i])),
+        )
+
+    def _sum(
+        self, keys: npt.NDArray[Any]
+    ) -> tuple[npt.NDArray[Any], npt.NDArray[np.int64]]:
+        unique, inverse = np.unique(keys, return_inverse=True)
+        sums = np.zeros(len(unique), dtype=np.int64)
+        np.add.at(sums, inverse, self.amount)
+        return unique, sums
@@ -1,7 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from enum import Enum, auto
+from typing import NamedTuple, Optional, Self
+
+from pfbudget.db.model import (
+    BankTransaction,
+    CategorySelector,
+    TransactionCategory,
+    TransactionTag,
+)
 
 
 class Operation(Enum):
@@ -11,6 +19,7 @@ class Operation(Enum):
     Download = auto()
     Categorize = auto()
     ManualCategorization = auto()
+    Daemon = auto()
     Token = auto()
     RequisitionId = auto()
     CategoryAdd = auto()
@@ -49,6 +58,7 @@ class Operation(Enum):
     ImportCategories = auto()
     ExportCategoryGroups = auto()
     ImportCategoryGroups = auto()
+    RuleStats = auto()
 
 
 class ExportFormat(Enum):
@@ -61,6 +71,20 @@ class TransactionError(Exception):
 
 
 class Transaction:
+    __slots__ = (
+        "date",
+        "description",
+        "bank",
+        "value",
+        "_category",
+        "original",
+        "additional_comment",
+        "year",
+        "month",
+        "day",
+        "modified",
+    )
+
     def __init__(self, *args, file=None):
         self.date = None
         self.description = ""
@@ -97,6 +121,24 @@ class Transaction:
 
         self.modified = False
 
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        """From a database row whose columns were already decoded into their types,
+        skipping the parsing of the constructor"""
+        t = cls.__new__(cls)
+        (
+            t.date,
+            t.description,
+            t.bank,
+            t.value,
+            t._category,
+            t.original,
+            t.additional_comment,
+        ) = row
+        t.year, t.month, t.day = t.date.year, t.date.month, t.date.day
+        t.modified = False
+        return t
+
     def to_list(self):
         return [self.date, self.description, self.bank, self.value, self.category]
 
@@ -158,6 +200,56 @@ class Transaction:
 Transactions = list[Transaction]
 
 
+class RecordCategory(NamedTuple):
+    name: str
+    selector: CategorySelector = CategorySelector.unknown
+
+
+class RecordTag(NamedTuple):
+    tag: str
+
+
+@dataclass(frozen=True, slots=True)
+class TransactionRecord:
+    """Lightweight, immutable, bank transaction
+
+    Used between the extract and transform stages in place of the ORM
+    BankTransaction, which is only built when the record is loaded. The category and
+    tags have the same attributes as their ORM counterparts, so the rules and
+    transformers work on both.
+    """
+
+    date: date
+    description: Optional[str]
+    amount: Decimal
+    bank: Optional[str] = None
+    category: Optional[RecordCategory] = None
+    tags: frozenset[RecordTag] = frozenset()
+
+    def categorized(self, name: str, selector: CategorySelector) -> Self:
+        return replace(self, category=RecordCategory(name, selector))
+
+    def tagged(self, tag: str) -> Self:
+        return replace(self, tags=self.tags | {RecordTag(tag)})
+
+    def orm(self) -> BankTransaction:
+        return BankTransaction(
+            self.date,
+            self.description,
+            self.amount,
+            category=(
+                TransactionCategory(self.category.name, self.category.selector)
+                if self.category
+                else None
+            ),
+            tags={TransactionTag(t.tag) for t in self.tags},
+            bank=self.bank,
+        )
+
+    def __lt__(self, other: Self) -> bool:
+        return self.date < other.date
+
+
 class PrimaryKey(Enum):
     ID = auto()
     NAME = auto()
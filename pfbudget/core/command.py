@@ -14,6 +14,7 @@ from pfbudget.db.model import (
     Tag,
     Transaction,
 )
+from pfbudget.utils.metrics import metrics
 
 # required for the backup import
 import pfbudget.db.model
@@ -43,6 +44,7 @@ class ExportCommand(Command):
             case ExportFormat.JSON:
                 with open(self.fn, "w", newline="") as f:
                     json.dump([e.serialize() for e in values], f, indent=4)
+                    metrics.count("bytes.exported", f.tell())
             case ExportFormat.pickle:
                 raise AttributeError("pickle export not working at the moment!")
                 with open(self.fn, "wb") as f:
@@ -99,6 +101,7 @@ class BackupCommand(Command):
             case ExportFormat.JSON:
                 with open(self.fn, "w", newline="") as f:
                     json.dump([e.serialize() for e in values], f, indent=4)
+                    metrics.count("bytes.exported", f.tell())
             case ExportFormat.pickle:
                 raise AttributeError("pickle export not working at the moment!")
 
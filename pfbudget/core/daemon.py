@@ -0,0 +1,193 @@
+from __future__ import annotations
+import contextlib
+import datetime as dt
+import decimal
+import io
+import json
+import os
+from pathlib import Path
+import socket
+import socketserver
+from typing import TYPE_CHECKING, Any, Optional, Sequence
+
+from sqlalchemy import func, select
+
+from pfbudget.cli.params import parameters
+from pfbudget.common.types import Operation
+from pfbudget.db.model import Bank, BankTransaction
+from pfbudget.load.database import DatabaseLoader
+
+if TYPE_CHECKING:
+    from pfbudget.core.manager import Manager
+
+
+class DaemonError(Exception):
+    pass
+
+
+def encode(o: Any) -> Any:
+    """json default hook for the argument types the argparser produces"""
+    if isinstance(o, dt.date):
+        return {"__date__": o.isoformat()}
+    if isinstance(o, decimal.Decimal):
+        return {"__decimal__": str(o)}
+    raise TypeError(f"{type(o).__name__} is not serializable")
+
+
+def decode(o: dict[str, Any]) -> Any:
+    if "__date__" in o:
+        return dt.date.fromisoformat(o["__date__"])
+    if "__decimal__" in o:
+        return decimal.Decimal(o["__decimal__"])
+    return o
+
+
+def request(path: Path, op: Operation, args: dict[str, Any]) -> str:
+    """Sends an operation to a running daemon and returns its output"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(path))
+        with s.makefile("rwb") as f:
+            f.write(json.dumps({"op": op.name, "args": args}, default=encode).encode())
+            f.write(b"\n")
+            f.flush()
+            response = json.loads(f.readline())
+
+    if not response["ok"]:
+        raise DaemonError(response["error"])
+    return response["output"]
+
+
+class Daemon:
+    """Long-running Manager
+
+    Keeps a single Manager, and with it the database engine, the PSD2 client and the
+    rule set, alive between operations. Operations are received as newline delimited
+    JSON, one {"op": <Operation name>, "args": <parsed CLI args>} per line, over a
+    UNIX socket. Optionally, every `every` the PSD2 banks are synced and the new
+    transactions categorized.
+    """
+
+    # operations that prompt for input can't run without a terminal
+    interactive = {
+        Operation.ManualCategorization,
+        Operation.Daemon,
+        Operation.Parse,
+        Operation.Forge,
+        Operation.Import,
+        Operation.ImportBanks,
+        Operation.ImportCategoryRules,
+        Operation.ImportTagRules,
+        Operation.ImportCategories,
+        Operation.ImportCategoryGroups,
+    }
+
+    # upper bound on how long the loop blocks waiting for a connection
+    poll = dt.timedelta(seconds=1)
+
+    def __init__(
+        self,
+        manager: Manager,
+        path: Path,
+        every: Optional[dt.timedelta] = None,
+        banks: Optional[Sequence[str]] = None,
+    ):
+        self.manager = manager
+        self.path = path
+        self.every = every
+        self.banks = banks
+        self._running = False
+
+    def serve(self) -> None:
+        if self.path.exists():
+            self.path.unlink()
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    response = daemon.handle(line)
+                    self.wfile.write(json.dumps(response, default=str).encode())
+                    self.wfile.write(b"\n")
+
+        self._running = True
+        with socketserver.UnixStreamServer(str(self.path), Handler) as server:
+            os.chmod(self.path, 0o600)
+
+            scheduled = dt.datetime.now() if self.every else dt.datetime.max
+            try:
+                while self._running:
+                    if dt.datetime.now() >= scheduled:
+                        assert self.every
+                        try:
+                            self.sync()
+                        except Exception as e:
+                            print(f"Sync failed, retrying in {self.every}\n{e}")
+                        scheduled = dt.datetime.now() + self.every
+
+                    timeout = min(scheduled - dt.datetime.now(), self.poll)
+                    server.timeout = max(timeout.total_seconds(), 0)
+                    server.handle_request()
+            finally:
+                self.path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        self._running = False
+
+    def handle(self, line: bytes) -> dict[str, Any]:
+        try:
+            request = json.loads(line, object_hook=decode)
+            op = Operation[request["op"]]
+            if op in self.interactive:
+                raise DaemonError(f"{op} needs an interactive terminal")
+
+            # rules may have been changed by another CLI process since the last one
+            self.manager.invalidate()
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                result = self.manager.action(op, parameters(op, request["args"]))
+                if result is not None:
+                    print(result)
+
+            return {"ok": True, "output": output.getvalue()}
+
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def sync(self) -> None:
+        """Downloads the new transactions of every PSD2 bank and categorizes them
+
+        Each bank is downloaded from the date of its latest stored transaction, and
+        the transactions already stored for that date are skipped, so that repeated
+        syncs don't duplicate them.
+        """
+        if self.banks:
+            names = self.banks
+            banks = self.manager.database.select(Bank, lambda: Bank.name.in_(names))
+        else:
+            banks = self.manager.database.select(Bank, Bank.nordigen)
+
+        # rules may have been changed by something other than this daemon
+        self.manager.invalidate()
+
+        from pfbudget.extract.psd2 import PSD2Extractor
+        from pfbudget.extract.unstored import UnstoredExtractor
+
+        extractor = UnstoredExtractor(
+            PSD2Extractor(self.manager.nordigen_client()), self.manager.database
+        )
+        loader = DatabaseLoader(self.manager.database)
+
+        for bank in banks:
+            latest = select(func.max(BankTransaction.date)).where(
+                BankTransaction.bank == bank.name
+            )
+            with self.manager.database.engine.connect() as connection:
+                start = connection.execute(latest).scalar() or dt.date.min
+
+            if new := extractor.extract(bank, start, dt.date.today()):
+                print(f"{len(new)} new transactions from {bank.name}")
+                loader.load(sorted(new))
+
+        self.manager.action(Operation.Categorize, [True])
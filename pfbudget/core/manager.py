@@ -1,8 +1,11 @@
+from __future__ import annotations
+from dataclasses import dataclass
 import json
 from pathlib import Path
 import pickle
-from typing import Optional
-import webbrowser
+from typing import TYPE_CHECKING, Any, Optional
+
+from sqlalchemy import and_
 
 from pfbudget.common.types import Operation
 from pfbudget.db.client import Client
@@ -24,34 +27,81 @@ from pfbudget.db.model import (
     Transaction,
     TransactionCategory,
 )
-from pfbudget.extract.nordigen import NordigenClient, NordigenCredentialsManager
-from pfbudget.extract.parsers import parse_data
-from pfbudget.extract.psd2 import PSD2Extractor
 from pfbudget.load.database import DatabaseLoader
-from pfbudget.transform.categorizer import Categorizer
-from pfbudget.transform.nullifier import Nullifier
-from pfbudget.transform.tagger import Tagger
+from pfbudget.utils.metrics import metrics
+
+# The PSD2 client, the parsers and the transformers pull in heavy dependencies
+# (nordigen, requests, yaml, ...), so they're only imported by the operations that
+# need them, keeping the startup of every other command short.
+if TYPE_CHECKING:
+    from pfbudget.extract.nordigen import NordigenClient
+    from pfbudget.transform.cache import RuleCache
+
+
+@dataclass
+class RuleSet:
+    nulls: list[CategoryRule]
+    categories: list[CategoryRule]
+    tags: list[TagRule]
 
 
 class Manager:
+    # operations after which the cached rule set no longer reflects the database
+    rule_changes = {
+        Operation.CategoryRemove,
+        Operation.RuleAdd,
+        Operation.RuleRemove,
+        Operation.RuleModify,
+        Operation.TagRemove,
+        Operation.TagRuleAdd,
+        Operation.TagRuleRemove,
+        Operation.TagRuleModify,
+        Operation.ImportCategoryRules,
+        Operation.ImportTagRules,
+        Operation.ImportCategories,
+    }
+
     def __init__(self, db: str, verbosity: int = 0):
         self._db = db
         self._database: Optional[Client] = None
+        self._nordigen: Optional[NordigenClient] = None
+        self._rules: Optional[RuleSet] = None
+        self._caches: dict[tuple[str, str], RuleCache] = {}
         self._verbosity = verbosity
 
+    def __enter__(self) -> Manager:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the PSD2 client's HTTP session, if one was opened"""
+        if self._nordigen:
+            self._nordigen.close()
+            self._nordigen = None
+
     def action(self, op: Operation, params=None):
+        with metrics.stage(f"operation.{op.name}"):
+            return self._action(op, params)
+
+    def _action(self, op: Operation, params=None):
         if self._verbosity > 0:
             print(f"op={op}, params={params}")
 
         if params is None:
             params = []
 
+        if op in self.rule_changes:
+            self._rules = None
+            self.invalidate_caches()
+
         match (op):
             case Operation.Init:
                 pass
 
             case Operation.Transactions:
-                return [t.format for t in self.database.select(Transaction)]
+                return [t.format for t in self.database.projection()]
 
             case Operation.Parse:
                 # Adapter for the parse_data method. Can be refactored.
@@ -70,9 +120,11 @@ class Manager:
                     len(transactions) > 0
                     and input(f"{transactions[:5]}\nCommit? (y/n)") == "y"
                 ):
-                    self.database.insert(sorted(transactions))
+                    DatabaseLoader(self.database).load(sorted(transactions))
 
             case Operation.Download:
+                from pfbudget.extract.psd2 import PSD2Extractor
+
                 if params[3]:
                     values = params[3]
                     banks = self.database.select(Bank, lambda: Bank.name.in_(values))
@@ -81,44 +133,86 @@ class Manager:
 
                 extractor = PSD2Extractor(self.nordigen_client())
 
-                transactions = []
-                for bank in banks:
-                    transactions.extend(extractor.extract(bank, params[0], params[1]))
-
                 # dry-run
                 if params[2]:
+                    transactions = []
+                    for bank in banks:
+                        transactions.extend(
+                            extractor.extract(bank, params[0], params[1])
+                        )
                     print(sorted(transactions))
                     return
 
-                loader = DatabaseLoader(self.database)
-                loader.load(sorted(transactions))
+                from pfbudget.core.pipeline import Pipeline
+                from pfbudget.extract.unstored import UnstoredExtractor
+
+                # each bank loads while the next one downloads, and its batches
+                # commit as they load, so a rerun skips those already stored
+                pipeline = Pipeline(
+                    UnstoredExtractor(extractor, self.database),
+                    [],
+                    DatabaseLoader(self.database),
+                )
+                try:
+                    pipeline.run(banks, params[0], params[1])
+                except Exception:
+                    print(
+                        f"Failed after loading {pipeline.loaded.total()} transactions"
+                    )
+                    raise
+                finally:
+                    for bank, n in pipeline.loaded.items():
+                        print(f"{n} new transactions from {bank}")
 
             case Operation.Categorize:
+                rules = self.rules
+                if len(params) > 1 and params[1]:
+                    self.categorize(rules)
+                    return
+
+                from pfbudget.transform.categorizer import Categorizer
+                from pfbudget.transform.nullifier import Nullifier
+                from pfbudget.transform.tagger import Tagger
+
                 with self.database.session as session:
                     uncategorized = session.select(
                         BankTransaction, lambda: ~BankTransaction.category.has()
                     )
-                    categories = session.select(Category)
-                    tags = session.select(Tag)
-
-                    rules = [
-                        rule
-                        for cat in categories
-                        if cat.name == "null"
-                        for rule in cat.rules
-                    ]
-                    Nullifier(rules).transform_inplace(uncategorized)
-
-                    rules = [
-                        rule
-                        for cat in categories
-                        if cat.name != "null"
-                        for rule in cat.rules
-                    ]
-                    Categorizer(rules).transform_inplace(uncategorized)
-
-                    rules = [rule for tag in tags for rule in tag.rules]
-                    Tagger(rules).transform_inplace(uncategorized)
+
+                    jobs = params[2] if len(params) > 2 else 1
+                    categories, tags = None, None
+                    if jobs <= 1:
+                        categories = self.cache("categories", rules.categories)
+                        tags = self.cache("tags", rules.tags)
+
+                    Nullifier(rules.nulls, jobs).transform_inplace(uncategorized)
+                    Categorizer(rules.categories, jobs, categories).transform_inplace(
+                        uncategorized
+                    )
+                    Tagger(rules.tags, jobs, tags).transform_inplace(uncategorized)
+
+                if categories and tags:
+                    from pfbudget.transform.cache import RuleCache
+
+                    categories.save(self.database)
+                    tags.save(self.database)
+                    RuleCache.prune(self.database, {categories.version, tags.version})
+
+            case Operation.RuleStats:
+                from pfbudget.transform.stats import ledger, report, statistics
+
+                rules = self.rules
+                transactions = ledger(self.database)
+
+                categories = statistics(rules.categories, transactions)
+                tags = statistics(rules.tags, transactions)
+                print(
+                    report(
+                        f"category rules, {len(transactions)} transactions", categories
+                    )
+                )
+                print(report("tag rules", tags))
+                return categories, tags
 
             case Operation.BankMod:
                 self.database.update(Bank, params)
@@ -133,6 +227,8 @@ class Manager:
                 self.database.delete(NordigenBank, NordigenBank.name, params)
 
             case Operation.RequisitionId:
+                import webbrowser
+
                 bank_name = params[0]
                 bank = self.database.select(Bank, (lambda: Bank.name == bank_name))[0]
 
@@ -263,7 +359,7 @@ class Manager:
                     session.insert(transactions)
 
             case Operation.Export:
-                self.dump(params[0], params[1], self.database.select(Transaction))
+                self.dump(params[0], params[1], self.database.projection())
 
             case Operation.Import:
                 transactions = []
@@ -363,7 +459,34 @@ class Manager:
                     self.database.insert(groups)
 
     def parse(self, filename: Path, args: dict):
-        return parse_data(filename, args)
+        from pfbudget.extract.parsers import parse_data
+
+        with metrics.stage("extract.parse"):
+            transactions = parse_data(filename, args)
+        metrics.count("rows.parsed", len(transactions))
+        return transactions
+
+    def categorize(self, rules: RuleSet) -> None:
+        """Categorization inside the database, which only loads the candidates to
+        the null rules. The tags go first, as the Tagger only looks at the
+        transactions uncategorized at the start."""
+        from pfbudget.transform.nullifier import Nullifier
+        from pfbudget.transform.sql import (
+            SQLCategorizer,
+            SQLTagger,
+            candidates,
+            uncategorized,
+        )
+
+        SQLTagger(rules.tags).tag(self.database)
+
+        with self.database.session as session:
+            nullable = session.select(
+                BankTransaction, and_(uncategorized(), candidates(rules.nulls))
+            )
+            Nullifier(rules.nulls).transform_inplace(nullable)
+
+        SQLCategorizer(rules.categories).categorize(self.database)
 
     def askcategory(self, transaction: Transaction):
         selector = CategorySelector.manual
@@ -380,9 +503,11 @@ class Manager:
         if format == "pickle":
             with open(fn, "wb") as f:
                 pickle.dump([e.format for e in sequence], f)
+                metrics.count("bytes.exported", f.tell())
         elif format == "json":
             with open(fn, "w", newline="") as f:
                 json.dump([e.format for e in sequence], f, indent=4, default=str)
+                metrics.count("bytes.exported", f.tell())
         else:
             print("format not well specified")
 
@@ -407,5 +532,59 @@ class Manager:
             self._database = Client(self._db, echo=self._verbosity > 2)
         return self._database
 
+    @property
+    def rules(self) -> RuleSet:
+        """Rule set kept in memory until an operation changes it"""
+        if not self._rules:
+            categories = self.database.select(Category)
+            tags = self.database.select(Tag)
+
+            self._rules = RuleSet(
+                [
+                    rule
+                    for cat in categories
+                    if cat.name == "null"
+                    for rule in cat.rules
+                ],
+                [
+                    rule
+                    for cat in categories
+                    if cat.name != "null"
+                    for rule in cat.rules
+                ],
+                [rule for tag in tags for rule in tag.rules],
+            )
+        return self._rules
+
+    def invalidate(self) -> None:
+        self._rules = None
+
+    def cache(self, name: str, rules: list[CategoryRule] | list[TagRule]) -> RuleCache:
+        """Rule match cache of a rule set, kept in memory while its version lasts"""
+        from pfbudget.transform.cache import RuleCache, version
+
+        key = (name, version(rules))
+        if not (cache := self._caches.get(key)):
+            cache = self._caches[key] = RuleCache(rules)
+            cache.load(self.database)
+
+        # the rules may have been reloaded, unchanged
+        cache.rules = rules
+        return cache
+
+    def invalidate_caches(self) -> None:
+        """The stored entries of the old rules are no longer reached, and are pruned
+        by the next categorization"""
+        self._caches.clear()
+
     def nordigen_client(self) -> NordigenClient:
-        return NordigenClient(NordigenCredentialsManager.default, self.database)
+        from pfbudget.extract.nordigen import (
+            NordigenClient,
+            NordigenCredentialsManager,
+        )
+
+        if not self._nordigen:
+            self._nordigen = NordigenClient(
+                NordigenCredentialsManager.default, self.database
+            )
+        return self._nordigen
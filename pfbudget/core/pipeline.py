@@ -0,0 +1,157 @@
+"""Extract, transform and load stages overlapped in a pipeline
+
+Each stage runs in its own thread and hands batches to the next one through a
+bounded queue, so that the next bank downloads while the previous one is
+transformed and loaded, the first batches commit early and, with at most `depth`
+batches waiting between stages, memory stays bounded however much is extracted.
+As each batch commits on its own, `loaded` tells what was, should a later one fail.
+
+Downloads and database writes mostly wait on I/O, releasing the GIL, so the threads
+do overlap. A failure in any stage stops the others and is raised by `run`.
+"""
+
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Sequence
+
+from pfbudget.db.model import Bank, Transaction
+from pfbudget.extract.extract import Extractor
+from pfbudget.load.load import Loader
+from pfbudget.transform.transform import Transformer
+from pfbudget.utils.metrics import metrics
+
+Batch = list[Transaction]
+
+
+class _Done:
+    pass
+
+
+@dataclass
+class _Failure:
+    error: BaseException
+
+
+class _Stopped(Exception):
+    pass
+
+
+class Pipeline:
+    # seconds between checks of the stop flag while waiting on a queue
+    poll = 0.1
+
+    def __init__(
+        self,
+        extractor: Extractor,
+        transformers: Sequence[Transformer],
+        loader: Loader,
+        batch: int = 1000,
+        depth: int = 4,
+    ):
+        assert batch > 0 and depth > 0
+        self.extractor = extractor
+        self.transformers = transformers
+        self.loader = loader
+        self.batch = batch
+        self.depth = depth
+
+        # loaded transactions, by bank
+        self.loaded: Counter[str | None] = Counter()
+        self._stop = threading.Event()
+
+    def run(
+        self, banks: Iterable[Bank], start: date = date.min, end: date = date.max
+    ) -> int:
+        """Extracts the transactions of each bank, sorted, and loads them in batches,
+        returning how many were loaded"""
+        self._stop.clear()
+        self.loaded.clear()
+        extracted: queue.Queue[Any] = queue.Queue(self.depth)
+        transformed: queue.Queue[Any] = queue.Queue(self.depth)
+
+        threads = [
+            threading.Thread(
+                target=self._stage,
+                args=(self._extract(banks, start, end), extracted),
+                name="pipeline.extract",
+            ),
+            threading.Thread(
+                target=self._stage,
+                args=(self._transform(self._drain(extracted)), transformed),
+                name="pipeline.transform",
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for batch in self._drain(transformed):
+                with metrics.stage("pipeline.load"):
+                    self.loader.load(batch)
+                self.loaded.update(getattr(t, "bank", None) for t in batch)
+                metrics.count("pipeline.batches")
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        return self.loaded.total()
+
+    def _extract(
+        self, banks: Iterable[Bank], start: date, end: date
+    ) -> Iterator[Batch]:
+        for bank in banks:
+            with metrics.stage("pipeline.extract"):
+                transactions = sorted(self.extractor.extract(bank, start, end))
+            for i in range(0, len(transactions), self.batch):
+                yield transactions[i : i + self.batch]
+
+    def _transform(self, batches: Iterator[Batch]) -> Iterator[Batch]:
+        """Chains the transformers' batch streams, so that those keeping state
+        across batches see every batch in order. The Nullifier's also need them
+        sorted by date, which only holds within each bank."""
+        for transformer in self.transformers:
+            batches = transformer.batches(batches)
+        return batches
+
+    def _stage(self, source: Iterator[Batch], out: queue.Queue[Any]) -> None:
+        try:
+            for batch in source:
+                self._put(out, batch)
+            self._put(out, _Done())
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                self._put(out, _Failure(e))
+            except _Stopped:
+                pass
+
+    def _put(self, q: queue.Queue[Any], item: Any) -> None:
+        while True:
+            if self._stop.is_set():
+                raise _Stopped
+            try:
+                q.put(item, timeout=self.poll)
+                return
+            except queue.Full:
+                continue
+
+    def _drain(self, q: queue.Queue[Any]) -> Iterator[Batch]:
+        while True:
+            if self._stop.is_set():
+                raise _Stopped
+            try:
+                item = q.get(timeout=self.poll)
+            except queue.Empty:
+                continue
+
+            if isinstance(item, _Done):
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
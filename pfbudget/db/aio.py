@@ -0,0 +1,119 @@
+"""Database client on SQLAlchemy's asyncio engine
+
+Kept apart from pfbudget.db.client, so that only its users import asyncio and
+SQLAlchemy's asyncio extension.
+"""
+
+from collections.abc import Sequence
+from sqlalchemy import delete, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from typing import Any, Mapping, Optional, Type, TypeVar
+
+from pfbudget.db.exceptions import InsertError
+from pfbudget.utils.metrics import metrics
+
+
+class AsyncDatabaseSession:
+    def __init__(self, session: AsyncSession):
+        self.__session = session
+
+    async def __aenter__(self):
+        await self.__session.begin()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any):
+        try:
+            if exc_type:
+                await self.__session.rollback()
+            else:
+                with metrics.stage("db.flush"):
+                    await self.__session.commit()
+        except IntegrityError as e:
+            raise InsertError() from e
+        finally:
+            await self.__session.close()
+
+    async def close(self):
+        await self.__session.close()
+
+    def insert(self, sequence: Sequence[Any]) -> None:
+        self.__session.add_all(sequence)
+
+    T = TypeVar("T")
+
+    async def select(self, what: Type[T], exists: Optional[Any] = None) -> Sequence[T]:
+        if exists is not None:
+            stmt = select(what).filter(exists)
+        else:
+            stmt = select(what)
+
+        return (await self.__session.scalars(stmt)).unique().all()
+
+    async def delete(self, obj: Any) -> None:
+        await self.__session.delete(obj)
+
+
+class AsyncClient:
+    """Client on SQLAlchemy's asyncio engine, e.g. postgresql+asyncpg:// or
+    sqlite+aiosqlite://, so that database writes can overlap downloads and parsing
+    in one event loop
+
+    The relationships are eagerly loaded, since lazy loads can't be awaited, and the
+    objects are not expired on commit, staying readable afterwards.
+    """
+
+    def __init__(self, url: str, **kwargs: Any):
+        assert url, "Database URL is empty!"
+        self._engine = create_async_engine(url, **kwargs)
+        self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any):
+        await self.close()
+
+    async def close(self) -> None:
+        await self._engine.dispose()
+
+    async def insert(self, sequence: Sequence[Any], copy: bool = True) -> None:
+        """Same as Client.insert"""
+        memo: dict[int, Any] = {}
+        new = [
+            e if not copy and inspect(e).transient else e.clone(memo) for e in sequence
+        ]
+        async with self.session as session:
+            session.insert(new)
+
+    T = TypeVar("T")
+
+    async def select(self, what: Type[T], exists: Optional[Any] = None) -> Sequence[T]:
+        session = self.session
+        try:
+            return await session.select(what, exists)
+        finally:
+            await session.close()
+
+    async def update(
+        self, what: Type[Any], values: Sequence[Mapping[str, Any]]
+    ) -> None:
+        async with self._sessionmaker() as session, session.begin():
+            await session.execute(update(what), values)
+
+    async def delete(self, what: Type[Any], column: Any, values: Sequence[Any]) -> None:
+        async with self._sessionmaker() as session, session.begin():
+            await session.execute(delete(what).where(column.in_(values)))
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
+    @property
+    def session(self) -> AsyncDatabaseSession:
+        return AsyncDatabaseSession(self._sessionmaker())
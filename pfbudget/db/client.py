@@ -1,11 +1,43 @@
 from collections.abc import Sequence
-from copy import deepcopy
-from sqlalchemy import Engine, create_engine, delete, select, update
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Engine,
+    MetaData,
+    String,
+    Table,
+    and_,
+    cast,
+    create_engine,
+    delete,
+    exists,
+    insert,
+    inspect,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, sessionmaker
-from typing import Any, Mapping, Optional, Type, TypeVar
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Type, TypeVar
 
 from pfbudget.db.exceptions import InsertError
+from pfbudget.db.model import TransactionCategory
+from pfbudget.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from pfbudget.db.view import TransactionRow
+
+
+# the bulk category updates are staged here and applied with joined statements
+category_updates = Table(
+    "category_updates",
+    MetaData(),
+    Column("id", BigInteger, primary_key=True, autoincrement=False),
+    Column("name", String, nullable=False),
+    Column("selector", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
 
 
 class DatabaseSession:
@@ -21,7 +53,9 @@ class DatabaseSession:
             if exc_type:
                 self.__session.rollback()
             else:
-                self.__session.commit()
+                # the pending changes are flushed on commit
+                with metrics.stage("db.flush"):
+                    self.__session.commit()
         except IntegrityError as e:
             raise InsertError() from e
         finally:
@@ -36,7 +70,7 @@ class DatabaseSession:
     T = TypeVar("T")
 
     def select(self, what: Type[T], exists: Optional[Any] = None) -> Sequence[T]:
-        if exists:
+        if exists is not None:
             stmt = select(what).filter(exists)
         else:
             stmt = select(what)
@@ -51,10 +85,19 @@ class Client:
     def __init__(self, url: str, **kwargs: Any):
         assert url, "Database URL is empty!"
         self._engine = create_engine(url, **kwargs)
-        self._sessionmaker = sessionmaker(self._engine)
-
-    def insert(self, sequence: Sequence[Any]) -> None:
-        new = deepcopy(sequence)
+        self._sessionmaker = sessionmaker(self._engine, expire_on_commit=False)
+
+    def insert(self, sequence: Sequence[Any], copy: bool = True) -> None:
+        """Inserts copies of the objects, leaving the caller's untouched
+
+        Without `copy`, the new objects are inserted themselves, getting their ids
+        and remaining usable after the commit, and only the ones that already belong
+        to a database are copied.
+        """
+        memo: dict[int, Any] = {}
+        new = [
+            e if not copy and inspect(e).transient else e.clone(memo) for e in sequence
+        ]
         with self.session as session:
             session.insert(new)
 
@@ -66,10 +109,86 @@ class Client:
         session.close()
         return result
 
+    def projection(
+        self,
+        where: Optional[Any] = None,
+        after: Optional["TransactionRow"] = None,
+        limit: Optional[int] = None,
+    ) -> list["TransactionRow"]:
+        """Transactions, sorted by date, as read-only rows of the transactions_view,
+        which `where` filters through its columns
+
+        Paged by the key of the last row of the previous page, `after`, rather than
+        an offset, so that rows changed in between don't shift the pages.
+        """
+        # only the reads through the view import it, and its DDL compiler
+        from pfbudget.db.view import TransactionRow, transactions_view
+
+        view = transactions_view.c
+        stmt = select(transactions_view).order_by(view.date, view.id).limit(limit)
+        if where is not None:
+            stmt = stmt.where(where)
+        if after is not None:
+            stmt = stmt.where(
+                or_(
+                    view.date > after.date,
+                    and_(view.date == after.date, view.id > after.id),
+                )
+            )
+
+        with self._engine.connect() as connection:
+            return [TransactionRow.from_row(row) for row in connection.execute(stmt)]
+
     def update(self, what: Type[Any], values: Sequence[Mapping[str, Any]]) -> None:
         with self._sessionmaker() as session, session.begin():
             session.execute(update(what), values)
 
+    def update_categories(self, values: Sequence[Mapping[str, Any]]) -> None:
+        """Sets the categories, {"id", "name", "selector"}, of many transactions with
+        a single joined UPDATE, for those already categorized, and a single INSERT,
+        for the others
+
+        The transactions are only referenced by id, so that their categories can be
+        written without loading them, as the interactive categorization does.
+        """
+        if not values:
+            return
+
+        categorized = TransactionCategory.__table__
+        staged = category_updates.c
+        selector = cast(staged.selector, categorized.c.selector.type)
+
+        rows = [
+            {"id": v["id"], "name": v["name"], "selector": v["selector"].name}
+            for v in values
+        ]
+
+        # the temporary table outlives a failed transaction on SQLite, and would be
+        # left behind on the pooled connection
+        with self._engine.connect() as connection:
+            try:
+                category_updates.create(connection, checkfirst=True)
+                connection.execute(insert(category_updates), rows)
+
+                connection.execute(
+                    update(categorized)
+                    .values(name=staged.name, selector=selector)
+                    .where(categorized.c.id == staged.id)
+                )
+                connection.execute(
+                    insert(categorized).from_select(
+                        ["id", "name", "selector"],
+                        select(staged.id, staged.name, selector).where(
+                            ~exists().where(categorized.c.id == staged.id)
+                        ),
+                    )
+                )
+                connection.commit()
+            finally:
+                connection.rollback()
+                category_updates.drop(connection, checkfirst=True)
+                connection.commit()
+
     def delete(self, what: Type[Any], column: Any, values: Sequence[Any]) -> None:
         with self._sessionmaker() as session, session.begin():
             session.execute(delete(what).where(column.in_(values)))
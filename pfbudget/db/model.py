@@ -16,12 +16,14 @@ from sqlalchemy import (
     Numeric,
     String,
     Text,
+    inspect,
 )
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
     mapped_column,
     MappedAsDataclass,
+    ONETOMANY,
     relationship,
 )
 
@@ -42,6 +44,43 @@ class Base(MappedAsDataclass, DeclarativeBase):
         enum.Enum: Enum(enum.Enum, create_constraint=True, inherit_schema=True),
     }
 
+    def clone(self, memo: Optional[dict[int, Any]] = None) -> Self:
+        """Transient copy of the loaded columns and of the owned, one-to-many,
+        relationships, without the instance state a deepcopy would drag along
+
+        As with deepcopy, objects found more than once through the same memo are
+        only copied once.
+        """
+        if memo is None:
+            memo = {}
+        if id(self) in memo:
+            return memo[id(self)]
+
+        mapper = inspect(type(self))
+        loaded = inspect(self).dict
+        clone = memo[id(self)] = mapper.class_manager.new_instance()
+
+        # the columns go straight into the instance dict, skipping the attribute
+        # events, which only the relationships need to cascade
+        clone.__dict__.update(
+            (c.key, loaded[c.key]) for c in mapper.column_attrs if c.key in loaded
+        )
+
+        for r in mapper.relationships:
+            if r.direction is not ONETOMANY or r.key not in loaded:
+                continue
+
+            value = loaded[r.key]
+            if value is None:
+                setattr(clone, r.key, None)
+            elif r.uselist:
+                collection = r.collection_class or list
+                setattr(clone, r.key, collection(v.clone(memo) for v in value))
+            else:
+                setattr(clone, r.key, value.clone(memo))
+
+        return clone
+
 
 @dataclass
 class Serializable:
@@ -549,3 +588,15 @@ class Nordigen(Base):
     type: Mapped[str] = mapped_column(primary_key=True)
     token: Mapped[str]
     expires: Mapped[dt.datetime]
+
+
+class RuleMatch(Base):
+    """Rules whose description and bank conditions a (description, bank) pair
+    matches, by their position in a rule set version"""
+
+    __tablename__ = "rule_matches"
+
+    version: Mapped[str] = mapped_column(String(16), primary_key=True)
+    description: Mapped[str] = mapped_column(Text, primary_key=True)
+    bank: Mapped[str] = mapped_column(Text, primary_key=True)
+    rules: Mapped[str]
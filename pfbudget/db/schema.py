@@ -1,12 +1,14 @@
 from dataclasses import dataclass
 from decimal import Decimal
 
+# the date and cents declared types select the converters of the columns, the
+# values being stored as ISO dates and integer cents
 CREATE_TRANSACTIONS_TABLE = """
 CREATE TABLE IF NOT EXISTS "transactions" (
-    "date" TEXT NOT NULL,
+    "date" DATE NOT NULL,
     "description" TEXT,
     "bank" TEXT NOT NULL,
-    "value" REAL NOT NULL,
+    "value" CENTS NOT NULL,
     "category" TEXT,
     "original" TEXT,
     "additional comments" TEXT
@@ -90,6 +92,41 @@ SET category = (?)
 WHERE date = (?) AND description = (?) AND bank = (?) AND value = (?)
 """
 
+CREATE_TRANSACTIONS_NATURAL_KEY_INDEX = """
+CREATE INDEX IF NOT EXISTS transactions_natural_key
+ON transactions (date, description, bank, value)
+"""
+
+# category updates are staged here and applied by a single joined UPDATE
+CREATE_CATEGORY_UPDATES_TABLE = """
+CREATE TEMP TABLE IF NOT EXISTS category_updates (
+    category TEXT,
+    date DATE NOT NULL,
+    description TEXT,
+    bank TEXT NOT NULL,
+    value CENTS NOT NULL
+)
+"""
+
+STAGE_CATEGORY_UPDATE = """
+INSERT INTO category_updates (category, date, description, bank, value)
+values (?,?,?,?,?)
+"""
+
+UPDATE_STAGED_CATEGORIES = """
+UPDATE transactions
+SET category = u.category
+FROM category_updates AS u
+WHERE transactions.date = u.date
+AND transactions.description = u.description
+AND transactions.bank = u.bank
+AND transactions.value = u.value
+"""
+
+CLEAR_CATEGORY_UPDATES = """
+DELETE FROM category_updates
+"""
+
 DUPLICATED_TRANSACTIONS = """
 SELECT COUNT(*), date, description, bank, value
 FROM transactions
@@ -160,3 +197,22 @@ SELECT_BANKS = """
 SELECT *
 FROM banks
 """
+
+SELECT_TRANSACTIONS_VALUE_TYPE = """
+SELECT type
+FROM pragma_table_info('transactions')
+WHERE name = 'value'
+"""
+
+# from the REAL values and TEXT dates, rounding the floats to the nearest cent
+MIGRATE_TRANSACTIONS_TO_CENTS = (
+    "ALTER TABLE transactions RENAME TO transactions_real",
+    CREATE_TRANSACTIONS_TABLE,
+    """
+    INSERT INTO transactions
+    SELECT date, description, bank, CAST(ROUND(value * 100) AS INTEGER), category,
+        original, "additional comments"
+    FROM transactions_real
+    """,
+    "DROP TABLE transactions_real",
+)
@@ -1,4 +1,6 @@
 from __future__ import annotations
+from collections.abc import Iterable, Iterator
+import contextlib
 from decimal import Decimal
 import csv
 import datetime
@@ -9,6 +11,7 @@ import sqlite3
 
 from pfbudget.common.types import Transaction
 import pfbudget.db.schema as Q
+from pfbudget.utils.utils import from_cents, to_cents
 
 
 if not pathlib.Path("logs").is_dir():
@@ -16,26 +19,137 @@ if not pathlib.Path("logs").is_dir():
 logging.config.fileConfig("logging.conf")
 logger = logging.getLogger("pfbudget.transactions")
 
-sqlite3.register_adapter(Decimal, lambda d: float(d))
+# amounts are stored as integer cents and dates as ISO strings, decoded back by the
+# converters of the columns declared types, which only apply to the connections
+# opened with detect_types
+sqlite3.register_converter("cents", lambda b: from_cents(int(b)))
+sqlite3.register_converter("date", lambda b: datetime.date.fromisoformat(b.decode()))
 
 __DB_NAME = "data.db"
 
 
+def adapt(params: Iterable) -> tuple:
+    """Query parameters, with the amounts in integer cents and the dates as ISO
+    strings, converted here rather than by adapters, which sqlite3 registers for
+    every connection of the process, SQLAlchemy's included"""
+    adapted = []
+    for p in params:
+        if isinstance(p, Decimal):
+            p = to_cents(p)
+        elif isinstance(p, datetime.date):
+            # as sqlite3's default adapters, for both dates and datetimes
+            p = str(p)
+        adapted.append(p)
+    return tuple(adapted)
+
+
 class DatabaseClient:
-    """SQLite DB connection manager"""
+    """SQLite DB connection manager
+
+    A single connection is opened on first use and kept until close, so that
+    repeated queries reuse it, along with its page cache and its cache of prepared
+    statements, keyed by the query text.
+
+    The connection is in autocommit mode, with the transactions begun explicitly,
+    as pysqlite's implicit ones leave the schema changes out of them.
+    """
 
     __EXPORT_DIR = "export"
+    __CACHED_STATEMENTS = 256
+
+    # WAL lets readers run alongside a writer, and with it synchronous=NORMAL is
+    # still safe from corruption. Negative cache sizes are in KiB.
+    __PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -65536",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA temp_store = MEMORY",
+    )
 
     def __init__(self, db: str):
         self.db = db
+        self.__connection: sqlite3.Connection | None = None
+
+    def __enter__(self) -> DatabaseClient:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if not self.__connection:
+            logger.debug(f"Connecting to {self.db}")
+            connection = sqlite3.connect(
+                self.db,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                cached_statements=self.__CACHED_STATEMENTS,
+                isolation_level=None,
+            )
+            try:
+                for pragma in self.__PRAGMAS:
+                    connection.execute(pragma)
+                self.__migrate(connection)
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self.__connection = connection
+        return self.__connection
+
+    @staticmethod
+    @contextlib.contextmanager
+    def __transaction(con: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+        """Commits the statements run inside, or rolls them all back on error"""
+        con.execute("BEGIN")
+        try:
+            yield con
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        con.execute("COMMIT")
+
+    def __migrate(self, con: sqlite3.Connection) -> None:
+        """Converts a transactions table from before the integer cents, as a whole or
+        not at all, so that a failed migration is retried on the next connection.
+        The database is first backed up into <db>.bak."""
+        declared = con.execute(Q.SELECT_TRANSACTIONS_VALUE_TYPE).fetchone()
+        if declared and declared[0].upper() != "CENTS":
+            if self.db != ":memory:":
+                logger.info(f"Backing up {self.db} into {self.db}.bak")
+                with contextlib.closing(sqlite3.connect(f"{self.db}.bak")) as backup:
+                    con.backup(backup)
+
+            logger.info(f"Migrating {self.db} transactions to integer cents")
+            with self.__transaction(con):
+                for query in Q.MIGRATE_TRANSACTIONS_TO_CENTS:
+                    con.execute(query)
+        if declared:
+            con.execute(Q.CREATE_TRANSACTIONS_NATURAL_KEY_INDEX)
+
+    def __transactions(self, query: str, params: tuple = ()) -> list[Transaction]:
+        """Transactions built straight from the typed rows"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.row_factory = lambda _, row: Transaction.from_row(row)
+            transactions = cursor.execute(query, adapt(params)).fetchall()
+            logger.debug(f"[{self.db}] < {query}{params}")
+            return transactions
+        except sqlite3.Error:
+            logger.exception(f"Error while executing [{self.db}] < {query}")
+            return []
+
+    def close(self) -> None:
+        if self.__connection:
+            self.__connection.close()
+            self.__connection = None
 
     def __execute(self, query: str, params: tuple = None) -> list | None:
         ret = None
         try:
-            con = sqlite3.connect(self.db)
-            with con:
+            with self.__transaction(self.connection) as con:
                 if params:
-                    ret = con.execute(query, params).fetchall()
+                    ret = con.execute(query, adapt(params)).fetchall()
                     logger.debug(f"[{self.db}] < {query}{params}")
                 else:
                     ret = con.execute(query).fetchall()
@@ -45,24 +159,21 @@ class DatabaseClient:
                     logger.debug(f"[{self.db}] > {ret}")
         except sqlite3.Error:
             logger.exception(f"Error while executing [{self.db}] < {query}")
-        finally:
-            con.close()
 
         return ret
 
     def __executemany(self, query: str, list_of_params: list[tuple]) -> list | None:
         ret = None
         try:
-            con = sqlite3.connect(self.db)
-            with con:
-                ret = con.executemany(query, list_of_params).fetchall()
+            with self.__transaction(self.connection) as con:
+                ret = con.executemany(
+                    query, [adapt(params) for params in list_of_params]
+                ).fetchall()
                 logger.debug(f"[{self.db}] < {query}{list_of_params}")
         except sqlite3.Error:
             logger.exception(
                 f"Error while executing [{self.db}] < {query} {list_of_params}"
             )
-        finally:
-            con.close()
 
         return ret
 
@@ -80,15 +191,14 @@ class DatabaseClient:
                 ("banks", Q.CREATE_BANKS_TABLE),
             )
         )
+        self.__execute(Q.CREATE_TRANSACTIONS_NATURAL_KEY_INDEX)
 
     """Transaction table methods"""
 
     def select_all(self) -> list[Transaction] | None:
         logger.info(f"Reading all transactions from {self.db}")
-        transactions = self.__execute("SELECT * FROM transactions")
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        transactions = self.__transactions("SELECT * FROM transactions")
+        return transactions if transactions else None
 
     def insert_transaction(self, transaction: Transaction):
         logger.info(f"Adding {transaction} into {self.db}")
@@ -103,11 +213,24 @@ class DatabaseClient:
         self.__execute(Q.UPDATE_CATEGORY, transaction.update_category())
 
     def update_categories(self, transactions: list[Transaction]):
+        """Stages the updates in a temporary table and applies them with a single
+        UPDATE, joined on the natural key index, instead of one UPDATE each"""
         logger.info(f"Update {len(transactions)} transactions' categories")
-        self.__executemany(
-            Q.UPDATE_CATEGORY,
-            [transaction.update_category() for transaction in transactions],
-        )
+
+        # the last update of a transaction wins, as when updating one at a time
+        updates = {}
+        for transaction in transactions:
+            update = adapt(transaction.update_category())
+            updates[update[1:]] = update
+
+        try:
+            with self.__transaction(self.connection) as con:
+                con.execute(Q.CREATE_CATEGORY_UPDATES_TABLE)
+                con.executemany(Q.STAGE_CATEGORY_UPDATE, updates.values())
+                con.execute(Q.UPDATE_STAGED_CATEGORIES)
+                con.execute(Q.CLEAR_CATEGORY_UPDATES)
+        except sqlite3.Error:
+            logger.exception(f"Error while updating the categories of [{self.db}]")
 
     def get_duplicated_transactions(self) -> list[Transaction] | None:
         logger.info("Get duplicated transactions")
@@ -118,24 +241,20 @@ class DatabaseClient:
 
     def get_sorted_transactions(self) -> list[Transaction] | None:
         logger.info("Get transactions sorted by date")
-        transactions = self.__execute(Q.SORTED_TRANSACTIONS)
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        transactions = self.__transactions(Q.SORTED_TRANSACTIONS)
+        return transactions if transactions else None
 
     def get_daterange(self, start: datetime, end: datetime) -> list[Transaction] | None:
         logger.info(f"Get transactions from {start} to {end}")
-        transactions = self.__execute(Q.SELECT_TRANSACTIONS_BETWEEN_DATES, (start, end))
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        transactions = self.__transactions(
+            Q.SELECT_TRANSACTIONS_BETWEEN_DATES, (start, end)
+        )
+        return transactions if transactions else None
 
     def get_category(self, value: str) -> list[Transaction] | None:
         logger.info(f"Get transactions where category = {value}")
-        transactions = self.__execute(Q.SELECT_TRANSACTIONS_BY_CATEGORY, (value,))
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        transactions = self.__transactions(Q.SELECT_TRANSACTIONS_BY_CATEGORY, (value,))
+        return transactions if transactions else None
 
     def get_daterange_category(
         self, start: datetime, end: datetime, category: str
@@ -143,12 +262,10 @@ class DatabaseClient:
         logger.info(
             f"Get transactions from {start} to {end} where category = {category}"
         )
-        transactions = self.__execute(
+        transactions = self.__transactions(
             Q.SELECT_TRANSACTIONS_BETWEEN_DATES_WITH_CATEGORY, (start, end, category)
         )
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        return transactions if transactions else None
 
     def get_by_period(self, period: str) -> list[Transaction] | None:
         logger.info(f"Get transactions by {period}")
@@ -172,10 +289,8 @@ class DatabaseClient:
         query = Q.SELECT_TRANSACTIONS_BETWEEN_DATES_WITHOUT_CATEGORIES.format(
             "(" + ", ".join("?" for _ in categories) + ")"
         )
-        transactions = self.__execute(query, (start, end, *categories))
-        if transactions:
-            return [Transaction(t) for t in transactions]
-        return None
+        transactions = self.__transactions(query, (start, end, *categories))
+        return transactions if transactions else None
 
     def export(self):
         filename = pathlib.Path(
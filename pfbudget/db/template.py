@@ -0,0 +1,134 @@
+"""Ready-made databases, cloned instead of built
+
+Creating the schema, from the metadata or by replaying the migrations, is most of
+the cost of setting up a new database, so it's done once, into a template, which
+new databases are then cloned from: on SQLite by copying the template's pages, into
+memory or a file, and on Postgres with CREATE DATABASE ... TEMPLATE, a file-level
+copy done by the server.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import Select, Table, create_engine, event, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import ExecutableDDLElement
+
+from pfbudget.db.model import Base
+from pfbudget.db.view import definition, transactions_view
+
+translate = {"pfbudget": None}
+
+
+# the views are created along with the tables, here rather than with the view,
+# which the reads import without needing its DDL
+class CreateView(ExecutableDDLElement):
+    def __init__(self, table: Table, selectable: Select):
+        self.table = table
+        self.selectable = selectable
+
+
+class DropView(ExecutableDDLElement):
+    def __init__(self, table: Table):
+        self.table = table
+
+
+@compiles(CreateView)
+def _create_view(element: CreateView, compiler: Any, **kw: Any) -> str:
+    return (
+        f"CREATE VIEW {compiler.preparer.format_table(element.table)} AS "
+        f"{compiler.sql_compiler.process(element.selectable, literal_binds=True)}"
+    )
+
+
+@compiles(DropView)
+def _drop_view(element: DropView, compiler: Any, **kw: Any) -> str:
+    return f"DROP VIEW IF EXISTS {compiler.preparer.format_table(element.table)}"
+
+
+event.listen(Base.metadata, "after_create", CreateView(transactions_view, definition()))
+event.listen(Base.metadata, "before_drop", DropView(transactions_view))
+
+
+class SQLiteTemplate:
+    """SQLite database with the schema, built from the metadata on first use, in
+    memory or in `path`, if it doesn't exist yet
+
+    SQLite has no schemas, so the pfbudget schema is translated away, as the engines
+    of the clones must also do.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._template: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """New in-memory database, cloned from the template"""
+        connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self._backup(connection)
+        return connection
+
+    def copy(self, path: Path) -> None:
+        """Clones the template into a database file"""
+        connection = sqlite3.connect(path)
+        try:
+            self._backup(connection)
+        finally:
+            connection.close()
+
+    def options(self, path: Optional[Path] = None) -> dict:
+        """create_engine arguments for a clone, in `path`, or in memory and shared by
+        the engine's connections, for the URL sqlite:///path or sqlite://"""
+        options: dict = {"execution_options": {"schema_translate_map": translate}}
+        if path:
+            self.copy(path)
+        else:
+            options |= {"creator": self.connect, "poolclass": StaticPool}
+        return options
+
+    def _backup(self, target: sqlite3.Connection) -> None:
+        with self._lock:
+            if not self._template:
+                self._template = self._build()
+            self._template.backup(target)
+
+    def _build(self) -> sqlite3.Connection:
+        built = self.path is not None and self.path.exists()
+        template = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+        if not built:
+            engine = create_engine(
+                "sqlite://",
+                creator=lambda: template,
+                poolclass=StaticPool,
+                execution_options={"schema_translate_map": translate},
+            )
+            Base.metadata.create_all(engine)
+        return template
+
+
+def postgres_template(url: str, template: str) -> None:
+    """Marks a database, e.g. freshly migrated, as a template, which only its owner or
+    a superuser can then clone. `url` is of another database in the same server, as
+    a database can't be cloned while there are connections to it."""
+    _postgres(url, "ALTER DATABASE {} WITH IS_TEMPLATE true", template)
+
+
+def postgres_clone(url: str, template: str, name: str) -> None:
+    """Creates the database `name` as a copy of `template`, with its schema and
+    data"""
+    _postgres(url, "CREATE DATABASE {} TEMPLATE {}", name, template)
+
+
+def _postgres(url: str, statement: str, *names: str) -> None:
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        quote = engine.dialect.identifier_preparer.quote
+        with engine.connect() as connection:
+            connection.execute(text(statement.format(*map(quote, names))))
+    finally:
+        engine.dispose()
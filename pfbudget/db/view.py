@@ -0,0 +1,131 @@
+"""Read-only projection of the transactions, one row per transaction
+
+Loading ORM transactions joins the categorized, tagged and notes tables, with a row
+per tag, and builds the objects and their relationships. Paths that only read go
+through the transactions_view instead, with the category, its selector, the tags
+and the note inline, into plain TransactionRows.
+
+It's a plain view, always current, rather than a materialized one, which every
+write would have to refresh. On SQLite the template creates it along with the
+tables, on Postgres a migration does.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import datetime as dt
+import decimal
+from typing import Any, Optional
+
+from sqlalchemy import (
+    Column,
+    MetaData,
+    Select,
+    Table,
+    func,
+    literal_column,
+    select,
+)
+
+from pfbudget.db.model import (
+    CategorySelector,
+    Note,
+    Transaction,
+    TransactionCategory,
+    TransactionTag,
+)
+
+# tags can't have colons, which separate them in the interactive categorization
+TAGS_SEPARATOR = ":"
+
+
+def definition() -> Select:
+    t = Transaction.__table__.c
+    c = TransactionCategory.__table__.c
+    n = Note.__table__.c
+    tagged = TransactionTag.__table__
+    tags = (
+        select(
+            tagged.c.id,
+            func.aggregate_strings(
+                tagged.c.tag, literal_column(f"'{TAGS_SEPARATOR}'")
+            ).label("tags"),
+        )
+        .group_by(tagged.c.id)
+        .subquery("tags")
+    )
+
+    return select(
+        t.id,
+        t.date,
+        t.description,
+        t.amount,
+        t.type,
+        t.bank,
+        t.original,
+        t.split,
+        c.name.label("category"),
+        c.selector,
+        tags.c.tags,
+        n.note,
+    ).select_from(
+        Transaction.__table__.outerjoin(TransactionCategory.__table__, c.id == t.id)
+        .outerjoin(tags, tags.c.id == t.id)
+        .outerjoin(Note.__table__, n.id == t.id)
+    )
+
+
+# outside of the metadata, which would otherwise create it as a table
+transactions_view = Table(
+    "transactions_view",
+    MetaData(schema="pfbudget"),
+    *(Column(c.name, c.type) for c in definition().selected_columns),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TransactionRow:
+    id: int
+    date: dt.date
+    description: Optional[str]
+    amount: decimal.Decimal
+    type: str
+    bank: Optional[str]
+    original: Optional[int]
+    split: bool
+    category: Optional[str]
+    selector: Optional[CategorySelector]
+    tags: frozenset[str]
+    note: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: Any) -> TransactionRow:
+        *columns, tags, note = row
+        return cls(
+            *columns,
+            frozenset(tags.split(TAGS_SEPARATOR)) if tags else frozenset(),
+            note,
+        )
+
+    @property
+    def format(self) -> dict[str, Any]:
+        """Exported mapping, in the shape the import reads"""
+        return dict(
+            id=self.id,
+            date=self.date,
+            description=self.description,
+            amount=self.amount,
+            type=self.type,
+            bank=self.bank,
+            original=self.original,
+            split=self.split,
+            category=(
+                {"name": self.category, "selector": {"selector": self.selector}}
+                if self.category
+                else None
+            ),
+            tags=sorted(self.tags),
+            note=self.note,
+        )
+
+    def __lt__(self, other: TransactionRow) -> bool:
+        return (self.date, self.id) < (other.date, other.id)
@@ -3,8 +3,10 @@ import datetime as dt
 import dotenv
 import json
 import nordigen
+from nordigen.types.http_enums import HTTPMethod
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import time
 from typing import Any, Optional, Sequence, Tuple
 import uuid
@@ -26,19 +28,106 @@ class NordigenCredentials:
         return len(self.id) != 0 and len(self.key) != 0
 
 
+class SessionNordigenClient(nordigen.NordigenClient):
+    """nordigen.NordigenClient issuing its requests through a shared session
+
+    The upstream client calls the module level requests functions, which open a new
+    connection (and TLS handshake) for every request. Routing them through a
+    requests.Session keeps the connections alive in its pool.
+    """
+
+    def __init__(self, session: requests.Session, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.session = session
+
+    def request(
+        self,
+        method: HTTPMethod,
+        endpoint: str,
+        data: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        request_meta = {
+            "url": f"{self.base_url}/{endpoint}",
+            "headers": headers if headers else self._headers,
+            "timeout": self._timeout,
+        }
+
+        data = self.data_filter.filter_payload(data)
+
+        match method:
+            case HTTPMethod.GET:
+                response = self.session.get(**request_meta, params=data)
+            case HTTPMethod.POST:
+                response = self.session.post(**request_meta, data=json.dumps(data))
+            case HTTPMethod.PUT:
+                response = self.session.put(**request_meta, data=json.dumps(data))
+            case HTTPMethod.DELETE:
+                response = self.session.delete(**request_meta, params=data)
+            case _:
+                raise ValueError(f'Method "{method}" is not supported')
+
+        if response.ok:
+            return response.json()
+
+        raise requests.HTTPError(
+            {"response": response.json(), "status": response.status_code},
+            response=response,
+        )
+
+
 class NordigenClient:
     redirect_url = "https://murta.dev"
 
-    def __init__(self, credentials: NordigenCredentials, client: Client):
+    # renew the access token a bit before it expires, so that it doesn't expire
+    # mid-download
+    token_margin = dt.timedelta(seconds=60)
+
+    def __init__(
+        self,
+        credentials: NordigenCredentials,
+        client: Client,
+        timeout: int = 5,
+        pool_size: int = 10,
+    ):
         if not credentials.valid():
             raise CredentialsError
 
-        self.__client = nordigen.NordigenClient(
-            secret_key=credentials.key, secret_id=credentials.id, timeout=5
+        self.__session = requests.Session()
+        self.__session.mount(
+            "https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        )
+
+        self.__client = SessionNordigenClient(
+            self.__session,
+            secret_key=credentials.key,
+            secret_id=credentials.id,
+            timeout=timeout,
         )
-        self.__client.token = self.__token(client)
+
+        self.__database = client
+        self.__expires = dt.datetime.min
+        self.__refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_: Any):
+        self.close()
+
+    def close(self):
+        self.__session.close()
+
+    def __refresh(self) -> None:
+        """Only goes to the database once the cached access token is about to expire"""
+        if dt.datetime.now() + self.token_margin < self.__expires:
+            return
+
+        self.__client.token, self.__expires = self.__token(self.__database)
 
     def download(self, requisition_id) -> Sequence[dict[str, Any]]:
+        self.__refresh()
+
         try:
             requisition = self.__client.requisition.get_requisition_by_id(
                 requisition_id
@@ -81,12 +170,7 @@ class NordigenClient:
                 print(f"Couldn't download transactions for {account.get_metadata()}")
                 continue
 
-            with open(
-                f"logs/{dt.datetime.now().isoformat()}_{requisition_id}.json",
-                "w",
-                encoding="utf-8",
-            ) as f:
-                json.dump(downloaded, f, ensure_ascii=False, indent=4)
+            self.dump(requisition_id, downloaded)
 
             if (
                 "transactions" not in downloaded
@@ -99,9 +183,14 @@ class NordigenClient:
 
         return transactions
 
-    def dump(self, bank, downloaded):
-        # @TODO log received JSON
-        pass
+    def dump(self, requisition_id: str, downloaded: dict[str, Any]) -> None:
+        """Logs the received JSON"""
+        with open(
+            f"logs/{dt.datetime.now().isoformat()}_{requisition_id}.json",
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(downloaded, f, ensure_ascii=False, indent=4)
 
     def new_requisition(
         self,
@@ -115,15 +204,17 @@ class NordigenClient:
         }
         kwargs = {k: v for k, v in kwargs.items() if v is not None}
 
+        self.__refresh()
         req = self.__client.initialize_session(
             self.redirect_url, institution_id, str(uuid.uuid4()), **kwargs
         )
         return req.link, req.requisition_id
 
     def country_banks(self, country: str):
+        self.__refresh()
         return self.__client.institution.get_institutions(country)
 
-    def __token(self, client: Client) -> str:
+    def __token(self, client: Client) -> Tuple[str, dt.datetime]:
         with client.session as session:
             token = session.select(Nordigen)
 
@@ -148,13 +239,15 @@ class NordigenClient:
                     ]
                 )
 
-                return new["access"]
+                return new["access"], datetime(new["access_expires"])
 
             else:
                 access = next(t for t in token if t.type == "access")
                 refresh = next(t for t in token if t.type == "refresh")
 
-                if access.expires > dt.datetime.now():
+                # a stored token about to expire is renewed now, rather than read
+                # again from the database on every call until it does
+                if access.expires > dt.datetime.now() + self.token_margin:
                     pass
                 elif refresh.expires > dt.datetime.now():
                     new = self.__client.exchange_token(refresh.token)
@@ -167,7 +260,7 @@ class NordigenClient:
                     refresh.token = new["refresh"]
                     refresh.expires = datetime(new["refresh_expires"])
 
-                return access.token
+                return access.token, access.expires
 
 
 class NordigenCredentialsManager:
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from dataclasses import replace
 from decimal import Decimal
 from importlib import import_module
 from pathlib import Path
@@ -6,8 +7,7 @@ import datetime as dt
 from typing import Any, Callable, NamedTuple, Optional
 import yaml
 
-from pfbudget.common.types import NoBankSelected
-from pfbudget.db.model import BankTransaction
+from pfbudget.common.types import NoBankSelected, TransactionRecord
 from pfbudget.utils import utils
 
 
@@ -32,7 +32,7 @@ class Options(NamedTuple):
     AmericanExpress: Optional[Options] = None
 
 
-def parse_data(filename: Path, args: dict[str, Any]) -> list[BankTransaction]:
+def parse_data(filename: Path, args: dict[str, Any]) -> list[TransactionRecord]:
     cfg: dict[str, Any] = yaml.safe_load(open("parsers.yaml"))
     assert (
         "Banks" in cfg
@@ -81,10 +81,10 @@ class Parser:
 
         self.options = Options(**options)
 
-    def func(self, transaction: BankTransaction):
-        pass
+    def func(self, transaction: TransactionRecord) -> TransactionRecord:
+        return transaction
 
-    def parse(self) -> list[BankTransaction]:
+    def parse(self) -> list[TransactionRecord]:
         transactions = [
             Parser.transaction(line, self.bank, self.options, self.func)
             for line in list(open(self.filename, encoding=self.options.encoding))[
@@ -127,8 +127,11 @@ class Parser:
 
     @staticmethod
     def transaction(
-        line_: str, bank: str, options: Options, func: Callable[[BankTransaction], None]
-    ) -> BankTransaction:
+        line_: str,
+        bank: str,
+        options: Options,
+        func: Callable[[TransactionRecord], TransactionRecord],
+    ) -> TransactionRecord:
         line = line_.rstrip().split(options.separator)
         index = Parser.index(line, options)
 
@@ -142,10 +145,10 @@ class Parser:
             if index.negate:
                 value = -value
 
-            transaction = BankTransaction(date, text, value, bank=bank)
+            transaction = TransactionRecord(date, text, value, bank)
 
             if options.additional_parser:
-                func(transaction)
+                transaction = func(transaction)
 
             return transaction
 
@@ -159,21 +162,24 @@ class Bank1(Parser):
         self.transfers: list[dt.date] = []
         self.transaction_cost = -Decimal("1")
 
-    def func(self, transaction: BankTransaction):
+    def func(self, transaction: TransactionRecord) -> TransactionRecord:
         if (
             transaction.description
             and "transf" in transaction.description.lower()
             and transaction.amount < 0
         ):
-            transaction.amount -= self.transaction_cost
             self.transfers.append(transaction.date)
+            return replace(
+                transaction, amount=transaction.amount - self.transaction_cost
+            )
+        return transaction
 
-    def parse(self) -> list[BankTransaction]:
+    def parse(self) -> list[TransactionRecord]:
         transactions = super().parse()
         for date in self.transfers:
             transactions.append(
-                BankTransaction(
-                    date, "Transaction cost", self.transaction_cost, bank=self.bank
+                TransactionRecord(
+                    date, "Transaction cost", self.transaction_cost, self.bank
                 )
             )
         return transactions
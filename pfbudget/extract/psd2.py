@@ -2,7 +2,8 @@ from datetime import date
 from typing import Sequence
 
 from pfbudget.db.model import Bank, BankTransaction
-from pfbudget.utils.converters import convert
+from pfbudget.utils.converters import convert_transactions
+from pfbudget.utils.metrics import metrics
 
 from .exceptions import BankError, DownloadError, ExtractError
 from .extract import Extractor
@@ -21,18 +22,16 @@ class PSD2Extractor(Extractor):
 
         try:
             print(f"Downloading from {bank}...")
-            downloaded = self.__client.download(bank.nordigen.requisition_id)
+            with metrics.stage("extract.download"):
+                downloaded = self.__client.download(bank.nordigen.requisition_id)
         except DownloadError as e:
             print(f"There was an issue downloading from {bank.name}\n{e}")
             raise ExtractError(e)
 
-        self.__client.dump(bank, downloaded)
-
-        return [
-            t
-            for t in self.convert(bank, downloaded, start, end)
-            if start <= t.date <= end
-        ]
+        with metrics.stage("extract.convert"):
+            transactions = self.convert(bank, downloaded, start, end)
+        metrics.count("rows.downloaded", len(transactions))
+        return transactions
 
     def convert(self, bank, downloaded, start, end):
-        return [convert(t, bank) for t in downloaded]
+        return convert_transactions(downloaded, bank, start, end)
@@ -0,0 +1,49 @@
+from collections import Counter
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import select
+
+from pfbudget.db.client import Client
+from pfbudget.db.model import Bank, BankTransaction, Transaction
+from pfbudget.utils.metrics import metrics
+
+from .extract import Extractor
+
+
+class UnstoredExtractor(Extractor):
+    """Extracts only the transactions that aren't stored yet
+
+    The transactions already stored for the bank between the same dates are
+    skipped, so that a rerun after a partial load, or over overlapping dates, doesn't
+    duplicate them. They're counted by date, description and amount, so that
+    identical transactions of the same day are each matched once, and a new one is
+    still added.
+    """
+
+    def __init__(self, extractor: Extractor, client: Client):
+        self.extractor = extractor
+        self.client = client
+
+    def extract(
+        self, bank: Bank, start: date = date.min, end: date = date.max
+    ) -> Sequence[Transaction]:
+        transactions = self.extractor.extract(bank, start, end)
+
+        t = BankTransaction
+        stmt = select(t.date, t.description, t.amount).where(
+            t.bank == bank.name, t.date.between(start, end)
+        )
+        with self.client.engine.connect() as connection:
+            known = Counter(tuple(row) for row in connection.execute(stmt))
+
+        new = []
+        for transaction in transactions:
+            key = (transaction.date, transaction.description, transaction.amount)
+            if known[key]:
+                known[key] -= 1
+            else:
+                new.append(transaction)
+
+        metrics.count("rows.skipped", len(transactions) - len(new))
+        return new
@@ -1,7 +1,9 @@
 from typing import Sequence
 
+from pfbudget.common.types import TransactionRecord
 from pfbudget.db.client import Client
 from pfbudget.db.model import Transaction
+from pfbudget.utils.metrics import metrics
 
 from .load import Loader
 
@@ -10,5 +12,15 @@ class DatabaseLoader(Loader):
     def __init__(self, client: Client) -> None:
         self.client = client
 
-    def load(self, transactions: Sequence[Transaction]) -> None:
-        self.client.insert(transactions)
+    def load(self, transactions: Sequence[Transaction | TransactionRecord]) -> None:
+        """Records are only turned into ORM transactions here. The ORM transactions
+        are inserted as they are, without copies, and get their ids"""
+        with metrics.stage("load"):
+            self.client.insert(
+                [
+                    t.orm() if isinstance(t, TransactionRecord) else t
+                    for t in transactions
+                ],
+                copy=False,
+            )
+        metrics.count("rows.loaded", len(transactions))
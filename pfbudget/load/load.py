@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
 from typing import Sequence
 
+from pfbudget.common.types import TransactionRecord
 from pfbudget.db.model import Transaction
 
 
 class Loader(ABC):
     @abstractmethod
-    def load(self, transactions: Sequence[Transaction]) -> None:
+    def load(self, transactions: Sequence[Transaction | TransactionRecord]) -> None:
         raise NotImplementedError
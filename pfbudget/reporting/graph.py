@@ -3,7 +3,6 @@ from calendar import monthrange
 from dateutil.rrule import rrule, MONTHLY
 from typing import TYPE_CHECKING
 import datetime as dt
-import matplotlib.pyplot as plt
 
 import pfbudget.core.categories
 
@@ -18,6 +17,9 @@ groups = pfbudget.core.categories.cfg["Groups"]
 def monthly(
     db: DatabaseClient, args: dict, start: dt.date = dt.date.min, end: dt.date = dt.date.max
 ):
+    # pyplot is slow to import, only pay for it when a graph is drawn
+    import matplotlib.pyplot as plt
+
     transactions = db.get_daterange(start, end)
     start, end = transactions[0].date, transactions[-1].date
     monthly_transactions = tuple(
@@ -98,6 +100,8 @@ def monthly(
 def discrete(
     db: DatabaseClient, args: dict, start: dt.date = dt.date.min, end: dt.date = dt.date.max
 ):
+    import matplotlib.pyplot as plt
+
     transactions = db.get_daterange(start, end)
     start, end = transactions[0].date, transactions[-1].date
     monthly_transactions = tuple(
@@ -182,6 +186,8 @@ def discrete(
 def networth(
     db: DatabaseClient, args: dict, start: dt.date = dt.date.min, end: dt.date = dt.date.max
 ):
+    import matplotlib.pyplot as plt
+
     transactions = db.get_daterange(start, end)
     start, end = transactions[0].date, transactions[-1].date
 
@@ -0,0 +1,211 @@
+"""Memo of the rules matched by each bank description
+
+Bank descriptions repeat month after month, so which rules' description, regex and
+bank conditions a (description, bank) pair matches is memoized, in memory with LRU
+eviction and in the rule_matches table between runs. Only the date and amount
+conditions, which are cheap, are then checked for each transaction.
+
+Entries are keyed on a version of the rule set, a digest of its rules in order, so
+that they never outlive the rules they were computed for: a changed rule set no
+longer reaches the old entries, which are pruned later on. The memo is only an
+optimization, so a database without the rule_matches table just goes without it.
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+import hashlib
+import re
+import datetime as dt
+import decimal
+from typing import TYPE_CHECKING, Any, Collection, Optional, Protocol, Sequence
+
+from sqlalchemy import Connection, delete, inspect, select
+
+from pfbudget.db.model import CategoryRule, Rule, RuleMatch, TagRule
+from pfbudget.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from pfbudget.db.client import Client
+
+Key = tuple[str, str]
+
+
+class Matchable(Protocol):
+    """What the rules match, e.g. a Transaction, a TransactionRecord or a row of the
+    transactions_view, with an optional bank"""
+
+    @property
+    def date(self) -> dt.date:
+        ...
+
+    @property
+    def description(self) -> Optional[str]:
+        ...
+
+    @property
+    def amount(self) -> decimal.Decimal:
+        ...
+
+
+def version(rules: Sequence[Rule]) -> str:
+    digest = hashlib.sha1()
+    for rule in rules:
+        name = rule.name if isinstance(rule, CategoryRule) else None
+        tag = rule.tag if isinstance(rule, TagRule) else None
+        digest.update(
+            repr(
+                (
+                    name,
+                    tag,
+                    rule.start,
+                    rule.end,
+                    rule.description,
+                    rule.regex,
+                    rule.bank,
+                    str(rule.min),
+                    str(rule.max),
+                )
+            ).encode()
+        )
+    return digest.hexdigest()[:16]
+
+
+def available(client: Client) -> bool:
+    """Whether the rule_matches table exists, which it doesn't on a database not yet
+    migrated"""
+    table = RuleMatch.__table__
+    with client.engine.connect() as connection:
+        translate = connection.get_execution_options().get("schema_translate_map", {})
+        schema = translate.get(table.schema, table.schema)
+        if inspect(connection).has_table(table.name, schema=schema):
+            return True
+
+    metrics.count("rule_cache.unavailable")
+    return False
+
+
+def insert(connection: Connection) -> Any:
+    """Insert of the dialect, which skips the entries already stored, as they are
+    by a concurrent run of the same rules"""
+    match connection.dialect.name:
+        case "postgresql":
+            from sqlalchemy.dialects import postgresql
+
+            return postgresql.insert(RuleMatch).on_conflict_do_nothing()
+        case "sqlite":
+            from sqlalchemy.dialects import sqlite
+
+            return sqlite.insert(RuleMatch).on_conflict_do_nothing()
+        case other:
+            raise NotImplementedError(other)
+
+
+class RuleCache:
+    def __init__(self, rules: Sequence[Rule], maxsize: int = 10_000):
+        self.rules = rules
+        self.version = version(rules)
+        self.maxsize = maxsize
+
+        self._regexes = [
+            re.compile(r.regex, re.IGNORECASE) if r.regex else None for r in rules
+        ]
+        self._memo: OrderedDict[Key, tuple[int, ...]] = OrderedDict()
+        self._new: dict[Key, tuple[int, ...]] = {}
+        self._available: Optional[bool] = None
+
+    def matches(self, transaction: Matchable) -> list[Rule]:
+        """Same as the rules' matches, in rule order"""
+        return [
+            self.rules[i]
+            for i in self._text(
+                transaction.description, getattr(transaction, "bank", None)
+            )
+            if self._rest(self.rules[i], transaction)
+        ]
+
+    def load(self, client: Client) -> None:
+        if not self._stored(client):
+            return
+
+        stmt = (
+            select(RuleMatch.description, RuleMatch.bank, RuleMatch.rules)
+            .where(RuleMatch.version == self.version)
+            .limit(self.maxsize)
+        )
+        with client.engine.connect() as connection:
+            for description, bank, rules in connection.execute(stmt):
+                self._memo[description, bank] = tuple(map(int, rules.split()))
+
+    def save(self, client: Client) -> None:
+        """Stores the entries computed since the load"""
+        if not self._new or not self._stored(client):
+            self._new.clear()
+            return
+
+        rows = [
+            {
+                "version": self.version,
+                "description": description,
+                "bank": bank,
+                "rules": " ".join(map(str, rules)),
+            }
+            for (description, bank), rules in self._new.items()
+        ]
+        with client.engine.begin() as connection:
+            connection.execute(insert(connection), rows)
+        self._new.clear()
+
+    @staticmethod
+    def prune(client: Client, versions: Collection[str]) -> None:
+        """Drops the stored entries of every rule set version but `versions`"""
+        if not available(client):
+            return
+
+        with client.engine.begin() as connection:
+            connection.execute(
+                delete(RuleMatch).where(RuleMatch.version.not_in(versions))
+            )
+
+    def _stored(self, client: Client) -> bool:
+        """Whether the entries can be stored, checked once"""
+        if self._available is None:
+            self._available = available(client)
+        return self._available
+
+    def _text(self, description: Optional[str], bank: Optional[str]) -> tuple[int, ...]:
+        """Rules whose description, regex and bank conditions match. Pairs with no
+        description or bank are cheap to match and left out of the memo."""
+        if description is None or bank is None:
+            return self._evaluate(description, bank)
+
+        key = (description, bank)
+        if (rules := self._memo.get(key)) is not None:
+            metrics.count("rule_cache.hits")
+            self._memo.move_to_end(key)
+            return rules
+
+        metrics.count("rule_cache.misses")
+        rules = self._memo[key] = self._new[key] = self._evaluate(description, bank)
+        if len(self._memo) > self.maxsize:
+            self._memo.popitem(last=False)
+        return rules
+
+    def _evaluate(
+        self, description: Optional[str], bank: Optional[str]
+    ) -> tuple[int, ...]:
+        return tuple(
+            i
+            for i, (rule, regex) in enumerate(zip(self.rules, self._regexes))
+            if (rule.description is None or rule.description == description)
+            and (regex is None or (bool(description) and regex.search(description)))
+            and (rule.bank is None or rule.bank == bank)
+        )
+
+    @staticmethod
+    def _rest(rule: Rule, t: Matchable) -> bool:
+        return (
+            (rule.start is None or t.date >= rule.start)
+            and (rule.end is None or t.date <= rule.end)
+            and (rule.min is None or t.amount >= rule.min)
+            and (rule.max is None or t.amount <= rule.max)
+        )
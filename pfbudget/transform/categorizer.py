@@ -1,38 +1,64 @@
-from copy import deepcopy
-from typing import Iterable, Sequence
+from typing import Iterable, Optional, Sequence
 
-from pfbudget.db.model import (
-    CategoryRule,
-    CategorySelector,
-    Transaction,
-    TransactionCategory,
-    TransactionTag,
-)
-from .transform import Transformer
+from pfbudget.db.model import CategoryRule, CategorySelector
+from pfbudget.utils.metrics import metrics
+from .cache import RuleCache, version
+from .transform import ChangeSet, T, Transformer
 
 
 class Categorizer(Transformer):
-    def __init__(self, rules: Iterable[CategoryRule]):
+    def __init__(
+        self,
+        rules: Iterable[CategoryRule],
+        jobs: int = 1,
+        cache: Optional[RuleCache] = None,
+    ):
+        """The cache, which takes precedence over the jobs, must be of these rules"""
+        assert cache is None or cache.version == version(list(rules))
         self.rules = rules
+        self.jobs = jobs
+        self.cache = cache
 
-    def transform(self, transactions: Sequence[Transaction]) -> Sequence[Transaction]:
-        result = deepcopy(transactions)
-        self.transform_inplace(result)
-
-        return result
-
-    def transform_inplace(self, transactions: Sequence[Transaction]) -> None:
-        for rule in self.rules:
-            for transaction in transactions:
-                if not rule.matches(transaction):
-                    continue
-
-                if not transaction.category:
-                    transaction.category = TransactionCategory(
-                        rule.name, CategorySelector.rules
-                    )
-                else:
-                    if not transaction.tags:
-                        transaction.tags = {TransactionTag(rule.name)}
-                    else:
-                        transaction.tags.add(TransactionTag(rule.name))
+    def changes(self, transactions: Sequence[T]) -> ChangeSet:
+        changes = ChangeSet()
+        with metrics.stage("transform.categorize"):
+            if self.cache:
+                for i, transaction in enumerate(transactions):
+                    for rule in self.cache.matches(transaction):
+                        metrics.count("rules.matched")
+                        self._matched(changes, i, transaction, rule.name)
+                return changes
+
+            if self.jobs > 1:
+                self._parallel(transactions, changes)
+                return changes
+
+            for rule in self.rules:
+                metrics.count("rules.evaluated", len(transactions))
+                for i, transaction in enumerate(transactions):
+                    if not rule.matches(transaction):
+                        continue
+
+                    metrics.count("rules.matched")
+                    self._matched(changes, i, transaction, rule.name)
+
+        return changes
+
+    def _parallel(self, transactions: Sequence[T], changes: ChangeSet) -> None:
+        """Same result, as each transaction's matches keep the rule order"""
+        from . import parallel
+
+        rules = [parallel.CompiledRule.compile(r, r.name) for r in self.rules]
+        metrics.count("rules.evaluated", len(rules) * len(transactions))
+
+        for i, names in parallel.matches(rules, transactions, self.jobs).items():
+            metrics.count("rules.matched", len(names))
+            for name in names:
+                self._matched(changes, i, transactions[i], name)
+
+    @staticmethod
+    def _matched(changes: ChangeSet, i: int, transaction: T, name: str) -> None:
+        if not changes.category(i, transaction):
+            changes.categorize(i, name, CategorySelector.rules)
+        else:
+            changes.tag(i, name)
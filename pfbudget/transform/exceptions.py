@@ -1,2 +1,6 @@
 class MoreThanOneMatchError(Exception):
     pass
+
+
+class UnsortedError(Exception):
+    pass
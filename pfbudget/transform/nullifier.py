@@ -1,23 +1,23 @@
-from copy import deepcopy
+import bisect
+from collections import defaultdict
 import datetime as dt
-from typing import Iterable, Sequence
+from typing import Callable, Iterable, Iterator, Sequence
 
-from .exceptions import MoreThanOneMatchError
-from .transform import Transformer
-from pfbudget.db.model import (
-    CategorySelector,
-    Transaction,
-    TransactionCategory,
-)
+from .exceptions import MoreThanOneMatchError, UnsortedError
+from .transform import ChangeSet, T, Transformer
+from pfbudget.utils.metrics import metrics
+from pfbudget.utils.utils import to_cents
+from pfbudget.db.model import CategorySelector
 
 
 class Nullifier(Transformer):
     NULL_DAYS = 4
 
-    def __init__(self, rules=None):
+    def __init__(self, rules=None, jobs: int = 1):
         self.rules = rules if rules else []
+        self.jobs = jobs
 
-    def transform(self, transactions: Iterable[Transaction]) -> Sequence[Transaction]:
+    def transform(self, transactions: Sequence[T]) -> Sequence[T]:
         """transform
 
         Find transactions that nullify each others, e.g. transfers between banks or
@@ -30,67 +30,129 @@ class Nullifier(Transformer):
             MoreThanOneMatchError: if there is more than a match for a single transation
 
         Returns:
-            Sequence[Transaction]: nullified sequence of transactions
+            Sequence[Transaction]: nullified sequence of transactions, sorted by date
         """
 
-        result = sorted(deepcopy(transactions))
+        result = sorted(transactions)
+        return self._changes(result, later=True).applied(result)
 
-        for i, transaction in enumerate(result[:-1]):
-            if matches := [t for t in result[i + 1 :] if self._cancels(transaction, t)]:
-                if len(matches) > 1:
-                    raise MoreThanOneMatchError(f"{transaction} -> {matches}")
+    def batches(self, batches: Iterable[Sequence[T]]) -> Iterator[list[T]]:
+        """Nullifies over a window of the latest NULL_DAYS, so that pairs split
+        across batches are still found
 
-                match = matches[0]
+        The transactions must come sorted by date, and each is held back until no
+        later one can cancel it. The result is the same as transform's, except that a
+        transaction with more than one match may go undetected, if they don't arrive
+        together.
 
-                transaction = self._nullify(transaction)
-                match = self._nullify(match)
+        Raises:
+            UnsortedError: if a transaction comes before an earlier dated one
+        """
+        window: list[T] = []
+        for batch in batches:
+            for transaction in batch:
+                if window and transaction.date < window[-1].date:
+                    raise UnsortedError(f"{transaction} after {window[-1]}")
+                window.append(transaction)
+
+            if not window:
+                continue
 
-        return result
+            window = self._changes(window, later=True).applied(window)
 
-    def transform_inplace(self, transactions: Iterable[Transaction]) -> None:
-        """transform_inplace
+            last = window[-1].date - dt.timedelta(days=self.NULL_DAYS)
+            if done := bisect.bisect_left(window, last, key=lambda t: t.date):
+                yield window[:done]
+                window = window[done:]
+
+        if window:
+            yield window
+
+    def changes(self, transactions: Sequence[T]) -> ChangeSet:
+        """changes
 
         Find transactions that nullify each others, e.g. transfers between banks or
         between bank and credit cards.
 
         Args:
-            transactions (Sequence[Transaction]): sequence of transactions that will be
-            modified inplace
+            transactions (Sequence[Transaction]): sequence of transactions
 
         Raises:
             MoreThanOneMatchError: if there is more than a match for a single transation
-        """
-
-        for transaction in sorted(transactions):
-            if matches := [t for t in transactions if self._cancels(transaction, t)]:
-                if len(matches) > 1:
-                    raise MoreThanOneMatchError(f"{transaction} -> {matches}")
-
-                match = matches[0]
 
-                self._nullify(transaction)
-                self._nullify(match)
+        Returns:
+            ChangeSet: the nullified transactions, by position
+        """
 
-    def _cancels(self, transaction: Transaction, cancel: Transaction):
+        return self._changes(transactions)
+
+    def _changes(self, transactions: Sequence[T], later: bool = False) -> ChangeSet:
+        """Nullifies in date order and, if `later`, only with the transactions that
+        follow in the sequence"""
+        changes = ChangeSet()
+        with metrics.stage("transform.nullify"):
+            amounts = self._amounts(transactions)
+            ruled = self._ruled(transactions)
+
+            for i in sorted(
+                range(len(transactions)), key=lambda i: transactions[i].date
+            ):
+                transaction = transactions[i]
+                # even though this class receives uncategorized transactions, they may
+                # have already been nullified before reaching here
+                if changes.category(i, transaction):
+                    continue
+
+                candidates = amounts.get(-to_cents(transaction.amount), [])
+                if matches := [
+                    j
+                    for j in candidates
+                    if (not later or j > i)
+                    and changes.category(j, transactions[j]) != "null"
+                    and self._cancels(transaction, transactions[j])
+                    and ruled(i)
+                    and ruled(j)
+                ]:
+                    if len(matches) > 1:
+                        raise MoreThanOneMatchError(
+                            f"{transaction} -> {[transactions[j] for j in matches]}"
+                        )
+
+                    changes.categorize(i, "null", CategorySelector.nullifier)
+                    changes.categorize(matches[0], "null", CategorySelector.nullifier)
+                    metrics.count("nullified", 2)
+
+        return changes
+
+    def _cancels(self, transaction: T, cancel: T):
         return (
             transaction.date
             <= cancel.date
             <= transaction.date + dt.timedelta(days=self.NULL_DAYS)
             and cancel != transaction
             and cancel.bank != transaction.bank
-            and cancel.amount == -transaction.amount
-            # even though this class receives uncategorized transactions, they may have
-            # already been nullified before reaching here
-            and not transaction.category
-            and (not cancel.category or cancel.category.name != "null")
-            and (
-                any(r.matches(transaction) for r in self.rules) if self.rules else True
-            )
-            and (any(r.matches(cancel) for r in self.rules) if self.rules else True)
         )
 
-    def _nullify(self, transaction: Transaction) -> Transaction:
-        transaction.category = TransactionCategory(
-            "null", selector=CategorySelector.nullifier
-        )
-        return transaction
+    def _ruled(self, transactions: Sequence[T]) -> Callable[[int], bool]:
+        """Whether the transaction in a position matches any of the rules, evaluated
+        upfront by the worker processes or on demand, for the few candidates"""
+        if not self.rules:
+            return lambda _: True
+
+        if self.jobs > 1:
+            from . import parallel
+
+            rules = [parallel.CompiledRule.compile(r, "null") for r in self.rules]
+            metrics.count("rules.evaluated", len(rules) * len(transactions))
+            return parallel.matches(rules, transactions, self.jobs).__contains__
+
+        return lambda i: any(r.matches(transactions[i]) for r in self.rules)
+
+    @staticmethod
+    def _amounts(transactions: Sequence[T]) -> dict[int, list[int]]:
+        """Positions of the transactions by amount, in cents, so that each transaction
+        is only checked against those with the symmetric amount"""
+        amounts: dict[int, list[int]] = defaultdict(list)
+        for i, transaction in enumerate(transactions):
+            amounts[to_cents(transaction.amount)].append(i)
+        return amounts
@@ -0,0 +1,129 @@
+"""Rule evaluation across worker processes
+
+Matching rules is CPU-bound Python, mostly regexes, so large sequences of
+transactions are split into shards evaluated by a pool of processes. The rules are
+compiled once, into picklable CompiledRules sent once to each worker, and the
+transactions are sent as compact rows. Workers only return, for each transaction
+with any match, the names of the rules it matched, in rule order, leaving the
+transformers to turn them into categories and tags.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import datetime as dt
+import decimal
+import re
+from typing import Iterable, Optional, Sequence
+
+from pfbudget.common.types import TransactionRecord
+from pfbudget.db.model import Rule, Transaction
+from pfbudget.utils.utils import to_cents
+
+# date, description, amount in cents and bank
+Row = tuple[dt.date, Optional[str], int, Optional[str]]
+Matches = dict[int, tuple[str, ...]]
+
+SHARDS_PER_JOB = 4
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    """Rule.matches with the regex compiled and the amounts in cents"""
+
+    name: str
+    start: Optional[dt.date] = None
+    end: Optional[dt.date] = None
+    description: Optional[str] = None
+    regex: Optional[re.Pattern[str]] = None
+    bank: Optional[str] = None
+    min: Optional[int] = None
+    max: Optional[int] = None
+
+    @classmethod
+    def compile(cls, rule: Rule, name: str) -> CompiledRule:
+        # amounts have cents precision, so the bounds are rounded inwards
+        return cls(
+            name,
+            rule.start,
+            rule.end,
+            rule.description,
+            re.compile(rule.regex, re.IGNORECASE) if rule.regex else None,
+            rule.bank,
+            (
+                to_cents(decimal.Decimal(rule.min), decimal.ROUND_CEILING)
+                if rule.min is not None
+                else None
+            ),
+            (
+                to_cents(decimal.Decimal(rule.max), decimal.ROUND_FLOOR)
+                if rule.max is not None
+                else None
+            ),
+        )
+
+    def matches(self, row: Row) -> bool:
+        date, description, amount, bank = row
+        return (
+            (self.start is None or date >= self.start)
+            and (self.end is None or date <= self.end)
+            and (self.description is None or description == self.description)
+            and (
+                self.regex is None
+                or (bool(description) and bool(self.regex.search(description)))
+            )
+            and (self.bank is None or bank == self.bank)
+            and (self.min is None or amount >= self.min)
+            and (self.max is None or amount <= self.max)
+        )
+
+
+def row(transaction: Transaction | TransactionRecord) -> Row:
+    return (
+        transaction.date,
+        transaction.description,
+        to_cents(transaction.amount),
+        getattr(transaction, "bank", None),
+    )
+
+
+_rules: Sequence[CompiledRule] = ()
+
+
+def _initialize(rules: Sequence[CompiledRule]) -> None:
+    global _rules
+    _rules = rules
+
+
+def _matches(shard: Sequence[tuple[int, Row]]) -> list[tuple[int, tuple[str, ...]]]:
+    result = []
+    for i, r in shard:
+        if names := tuple(rule.name for rule in _rules if rule.matches(r)):
+            result.append((i, names))
+    return result
+
+
+def matches(
+    rules: Iterable[CompiledRule],
+    transactions: Sequence[Transaction | TransactionRecord],
+    jobs: int,
+) -> Matches:
+    """Names of the rules each transaction matches, by position, evaluated by `jobs`
+    processes, or in this one if there's a single job"""
+    rows = [(i, row(t)) for i, t in enumerate(transactions)]
+    rules = list(rules)
+
+    if jobs <= 1 or len(rows) < jobs:
+        _initialize(rules)
+        try:
+            return dict(_matches(rows))
+        finally:
+            _initialize(())
+
+    # multiprocessing is only imported when there are workers to start
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = -(-len(rows) // (jobs * SHARDS_PER_JOB))
+    shards = [rows[i : i + size] for i in range(0, len(rows), size)]
+
+    with ProcessPoolExecutor(jobs, initializer=_initialize, initargs=(rules,)) as pool:
+        return {i: names for shard in pool.map(_matches, shards) for i, names in shard}
@@ -0,0 +1,185 @@
+"""Rules applied inside the database
+
+Instead of loading the transactions to match them against each rule, the rules are
+translated into INSERT ... SELECT statements, so that the transactions never leave
+the database. Rules are applied one at a time, in their priority order, each only
+to the transactions that are still uncategorized, which keeps the first match
+semantics of the Categorizer.
+
+Python's regexes have no portable SQL equivalent, so regex rules still select their
+candidates in SQL, by every other condition, and only those candidates' descriptions
+are matched in Python.
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import re
+from typing import TYPE_CHECKING, Any, Iterable, Sequence
+
+from sqlalchemy import (
+    Connection,
+    Table,
+    and_,
+    exists,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy.sql.elements import ColumnElement
+
+from pfbudget.db.model import (
+    CategoryRule,
+    CategorySelector,
+    Rule,
+    TagRule,
+    Transaction,
+    TransactionCategory,
+    TransactionTag,
+)
+from pfbudget.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from pfbudget.db.client import Client
+
+transactions = Transaction.__table__
+categorized = TransactionCategory.__table__
+tagged = TransactionTag.__table__
+
+
+def conditions(rule: Rule) -> ColumnElement[bool]:
+    """Rule.matches in SQL, except for the regex"""
+    t = transactions.c
+    clauses = [t.type == "bank"]
+
+    if rule.start is not None:
+        clauses.append(t.date >= rule.start)
+    if rule.end is not None:
+        clauses.append(t.date <= rule.end)
+    if rule.description is not None:
+        clauses.append(t.description == rule.description)
+    if rule.bank is not None:
+        clauses.append(t.bank == rule.bank)
+    if rule.min is not None:
+        clauses.append(t.amount >= rule.min)
+    if rule.max is not None:
+        clauses.append(t.amount <= rule.max)
+
+    return and_(*clauses)
+
+
+def candidates(rules: Sequence[Rule]) -> ColumnElement[bool]:
+    """Superset of the transactions matched by any of the rules, or all of them if
+    there are no rules"""
+    if not rules:
+        return true()
+    return or_(*(conditions(rule) for rule in rules))
+
+
+def uncategorized() -> ColumnElement[bool]:
+    return ~exists().where(categorized.c.id == transactions.c.id)
+
+
+class SQLRules(ABC):
+    table: Table
+    counter: str
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = rules
+
+    def apply(self, client: Client) -> int:
+        """Applies the rules in a single database transaction, returning how many
+        rows were inserted"""
+        inserted = 0
+        with client.engine.begin() as connection:
+            for rule in self.rules:
+                inserted += self._apply(connection, rule)
+        return inserted
+
+    @abstractmethod
+    def target(self, rule: Any) -> ColumnElement[bool]:
+        """Transactions the rule can still apply to"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def values(self, rule: Any) -> dict[str, Any]:
+        """Values of the inserted rows, other than the transaction id"""
+        raise NotImplementedError
+
+    def _apply(self, connection: Connection, rule: Rule) -> int:
+        metrics.count(f"{self.counter}.evaluated")
+        where = and_(conditions(rule), self.target(rule))
+        values = self.values(rule)
+
+        if not rule.regex:
+            columns = [
+                literal(v, self.table.c[k].type).label(k) for k, v in values.items()
+            ]
+            count = connection.execute(
+                insert(self.table).from_select(
+                    ["id", *values], select(transactions.c.id, *columns).where(where)
+                )
+            ).rowcount
+        else:
+            regex = re.compile(rule.regex, re.IGNORECASE)
+            rows = connection.execute(
+                select(transactions.c.id, transactions.c.description).where(where)
+            )
+            ids = [id for id, text in rows if text and regex.search(text)]
+            if ids:
+                connection.execute(
+                    insert(self.table), [{"id": id} | values for id in ids]
+                )
+            count = len(ids)
+
+        metrics.count(f"{self.counter}.matched", count)
+        return count
+
+
+class SQLCategorizer(SQLRules):
+    """Categorizes the uncategorized bank transactions with the first matching rule
+
+    Unlike the Categorizer, the further matches of a categorized transaction aren't
+    added as tags, as category names aren't tags.
+    """
+
+    table = categorized
+    counter = "rules"
+
+    def __init__(self, rules: Iterable[CategoryRule]):
+        super().__init__(rules)
+
+    def categorize(self, client: Client) -> int:
+        with metrics.stage("transform.categorize"):
+            return self.apply(client)
+
+    def target(self, rule: CategoryRule) -> ColumnElement[bool]:
+        return uncategorized()
+
+    def values(self, rule: CategoryRule) -> dict[str, Any]:
+        return {"name": rule.name, "selector": CategorySelector.rules}
+
+
+class SQLTagger(SQLRules):
+    """Tags the uncategorized bank transactions matching each rule, so it must run
+    before any categorization"""
+
+    table = tagged
+    counter = "tag_rules"
+
+    def __init__(self, rules: Iterable[TagRule]):
+        super().__init__(rules)
+
+    def tag(self, client: Client) -> int:
+        with metrics.stage("transform.tag"):
+            return self.apply(client)
+
+    def target(self, rule: TagRule) -> ColumnElement[bool]:
+        return and_(
+            uncategorized(),
+            ~exists().where(tagged.c.id == transactions.c.id, tagged.c.tag == rule.tag),
+        )
+
+    def values(self, rule: TagRule) -> dict[str, Any]:
+        return {"tag": rule.tag}
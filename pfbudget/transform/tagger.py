@@ -1,30 +1,62 @@
-from copy import deepcopy
-from typing import Iterable, Sequence
+from typing import Iterable, Optional, Sequence
 
-from pfbudget.db.model import TagRule, Transaction, TransactionTag
-from .transform import Transformer
+from pfbudget.db.model import TagRule
+from pfbudget.utils.metrics import metrics
+from .cache import RuleCache, version
+from .transform import ChangeSet, T, Transformer
 
 
 class Tagger(Transformer):
-    def __init__(self, rules: Iterable[TagRule]):
+    def __init__(
+        self,
+        rules: Iterable[TagRule],
+        jobs: int = 1,
+        cache: Optional[RuleCache] = None,
+    ):
+        """The cache, which takes precedence over the jobs, must be of these rules"""
+        assert cache is None or cache.version == version(list(rules))
         self.rules = rules
-
-    def transform(self, transactions: Sequence[Transaction]) -> Sequence[Transaction]:
-        result = deepcopy(transactions)
-        self.transform_inplace(result)
-
-        return result
-
-    def transform_inplace(self, transactions: Sequence[Transaction]) -> None:
-        for rule in self.rules:
-            for transaction in transactions:
-                if rule.tag in [tag.tag for tag in transaction.tags]:
-                    continue
-
-                if not rule.matches(transaction):
-                    continue
-
-                if not transaction.tags:
-                    transaction.tags = {TransactionTag(rule.tag)}
-                else:
-                    transaction.tags.add(TransactionTag(rule.tag))
+        self.jobs = jobs
+        self.cache = cache
+
+    def changes(self, transactions: Sequence[T]) -> ChangeSet:
+        changes = ChangeSet()
+        with metrics.stage("transform.tag"):
+            if self.cache:
+                for i, transaction in enumerate(transactions):
+                    for rule in self.cache.matches(transaction):
+                        assert isinstance(rule, TagRule)
+                        if rule.tag not in changes.tags(i, transaction):
+                            metrics.count("tag_rules.matched")
+                            changes.tag(i, rule.tag)
+                return changes
+
+            if self.jobs > 1:
+                self._parallel(transactions, changes)
+                return changes
+
+            for rule in self.rules:
+                metrics.count("tag_rules.evaluated", len(transactions))
+                for i, transaction in enumerate(transactions):
+                    if rule.tag in changes.tags(i, transaction):
+                        continue
+
+                    if not rule.matches(transaction):
+                        continue
+
+                    metrics.count("tag_rules.matched")
+                    changes.tag(i, rule.tag)
+
+        return changes
+
+    def _parallel(self, transactions: Sequence[T], changes: ChangeSet) -> None:
+        from . import parallel
+
+        rules = [parallel.CompiledRule.compile(r, r.tag) for r in self.rules]
+        metrics.count("tag_rules.evaluated", len(rules) * len(transactions))
+
+        for i, tags in parallel.matches(rules, transactions, self.jobs).items():
+            for tag in tags:
+                if tag not in changes.tags(i, transactions[i]):
+                    metrics.count("tag_rules.matched")
+                    changes.tag(i, tag)
@@ -1,14 +1,132 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Sequence
+from dataclasses import dataclass, field
+import itertools
+from typing import Iterable, Iterator, Optional, Sequence, TypeVar
 
-from pfbudget.db.model import Transaction
+from pfbudget.common.types import TransactionRecord
+from pfbudget.db.model import (
+    CategorySelector,
+    Transaction,
+    TransactionCategory,
+    TransactionTag,
+)
+
+T = TypeVar("T", Transaction, TransactionRecord)
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    assert size > 0
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+@dataclass
+class Change:
+    category: Optional[tuple[str, CategorySelector]] = None
+    tags: set[str] = field(default_factory=set)
+
+
+class ChangeSet(dict[int, Change]):
+    """Categories and tags to add to transactions, by their position in the sequence
+
+    A change set can be inspected and then applied, either to the transactions
+    themselves or to copies of only the changed ones, or simply discarded.
+    """
+
+    def categorize(self, i: int, name: str, selector: CategorySelector) -> None:
+        self.setdefault(i, Change()).category = (name, selector)
+
+    def tag(self, i: int, tag: str) -> None:
+        self.setdefault(i, Change()).tags.add(tag)
+
+    def category(
+        self, i: int, transaction: Transaction | TransactionRecord
+    ) -> Optional[str]:
+        """Category of the transaction, once the changes are applied"""
+        if (change := self.get(i)) and change.category:
+            return change.category[0]
+        return transaction.category.name if transaction.category else None
+
+    def tags(self, i: int, transaction: Transaction | TransactionRecord) -> set[str]:
+        """Tags of the transaction, once the changes are applied"""
+        tags = {t.tag for t in transaction.tags} if transaction.tags else set()
+        if change := self.get(i):
+            tags |= change.tags
+        return tags
+
+    def apply(self, transactions: Sequence[T]) -> None:
+        """Updates the ORM transactions themselves, while the immutable records are
+        replaced in the sequence, which must then be mutable"""
+        for i, change in self.items():
+            transactions[i] = self._applied(transactions[i], change)  # type: ignore
+
+    def applied(self, transactions: Sequence[T]) -> list[T]:
+        """New sequence, sharing the unchanged transactions and holding copies of the
+        changed ones"""
+        result = list(transactions)
+        for i, change in self.items():
+            transaction = result[i]
+            if not isinstance(transaction, TransactionRecord):
+                transaction = transaction.clone()
+            result[i] = self._applied(transaction, change)
+        return result
+
+    @staticmethod
+    def _applied(transaction: T, change: Change) -> T:
+        if change.category:
+            transaction = Transformer.categorized(transaction, *change.category)
+        for tag in sorted(change.tags):
+            transaction = Transformer.tagged(transaction, tag)
+        return transaction
 
 
 class Transformer(ABC):
     @abstractmethod
-    def transform(self, transactions: Sequence[Transaction]) -> Sequence[Transaction]:
+    def changes(self, transactions: Sequence[T]) -> ChangeSet:
+        """Changes to the transactions, which are left untouched"""
         raise NotImplementedError
 
-    @abstractmethod
-    def transform_inplace(self, transactions: Sequence[Transaction]) -> None:
-        raise NotImplementedError
+    def transform(self, transactions: Sequence[T]) -> Sequence[T]:
+        return self.changes(transactions).applied(transactions)
+
+    def transform_inplace(self, transactions: Sequence[T]) -> None:
+        """Updates the ORM transactions themselves, while the immutable records are
+        replaced in the sequence, which must then be mutable"""
+        self.changes(transactions).apply(transactions)
+
+    def batches(self, batches: Iterable[Sequence[T]]) -> Iterator[list[T]]:
+        """Transforms the batches lazily, as they're consumed, as `transform` does
+
+        Each batch is transformed on its own, unless the transformer keeps state
+        across batches, in which case it may hold transactions back and yield
+        batches that don't line up with the input ones.
+        """
+        for batch in batches:
+            yield list(self.transform(batch))
+
+    def stream(self, transactions: Iterable[T], size: int = 1000) -> Iterator[T]:
+        """Transforms the transactions lazily, `size` at a time, so that chained
+        streams go over arbitrarily large inputs in bounded memory"""
+        for batch in self.batches(batched(transactions, size)):
+            yield from batch
+
+    @staticmethod
+    def categorized(transaction: T, name: str, selector: CategorySelector) -> T:
+        if isinstance(transaction, TransactionRecord):
+            return transaction.categorized(name, selector)
+
+        transaction.category = TransactionCategory(name, selector)
+        return transaction
+
+    @staticmethod
+    def tagged(transaction: T, tag: str) -> T:
+        if isinstance(transaction, TransactionRecord):
+            return transaction.tagged(tag)
+
+        if not transaction.tags:
+            transaction.tags = {TransactionTag(tag)}
+        else:
+            transaction.tags.add(TransactionTag(tag))
+        return transaction
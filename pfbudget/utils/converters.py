@@ -1,3 +1,4 @@
+from collections.abc import Iterable
 import datetime as dt
 import functools
 from typing import Any
@@ -29,3 +30,29 @@ def _(json: dict, bank: t.Bank) -> t.BankTransaction | None:
 
     except TransactionError:
         print(f"{json} is in the wrong format")
+
+
+def convert_transactions(
+    downloaded: Iterable[dict[str, Any]],
+    bank: t.Bank,
+    start: dt.date = dt.date.min,
+    end: dt.date = dt.date.max,
+) -> list[t.BankTransaction]:
+    """Batch version of the dict converter, restricted to the [start, end] interval
+
+    The ISO formatted bookingDate sorts like the date itself, so rows outside the
+    interval are discarded by string comparison, before any parsing or ORM object
+    creation happens. The ones left go through the dict converter, which skips the
+    malformed ones.
+    """
+    first, last = start.isoformat(), end.isoformat()
+
+    transactions = []
+    for json in downloaded:
+        if not first <= json["bookingDate"] <= last:
+            continue
+
+        if transaction := convert(json, bank):
+            transactions.append(transaction)
+
+    return transactions
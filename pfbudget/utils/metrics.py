@@ -0,0 +1,95 @@
+"""Per-stage timings and counters of the extract, transform and load stages
+
+The instrumented code reports to the module-level `metrics`, which is disabled by
+default, leaving only a flag check on the hot paths. Counters are updated once per
+batch or per match, never per rule evaluation.
+"""
+
+from __future__ import annotations
+from collections import Counter, defaultdict
+import contextlib
+import json
+from pathlib import Path
+import re
+import sys
+from typing import Iterator, Optional
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.timers: defaultdict[str, list[float]] = defaultdict(list)
+        self.counters: Counter[str] = Counter()
+
+    def reset(self) -> None:
+        self.timers.clear()
+        self.counters.clear()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        from codetiming import Timer
+
+        timer = Timer(logger=None)
+        timer.start()
+        try:
+            yield
+        finally:
+            self.timers[name].append(timer.stop())
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += n
+
+    def summary(self) -> str:
+        lines = [
+            f"{name:<32} {sum(t):10.4f} s  {len(t):>6} calls"
+            for name, t in self.timers.items()
+        ]
+        lines.extend(f"{name:<32} {n:>12}" for name, n in self.counters.items())
+        return "\n".join(lines)
+
+    def json(self) -> str:
+        return json.dumps(
+            {
+                "stages": {
+                    name: {"seconds": sum(t), "calls": len(t), "max": max(t)}
+                    for name, t in self.timers.items()
+                },
+                "counters": dict(self.counters),
+            },
+            indent=4,
+        )
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format, e.g. for the node exporter"""
+        lines = [
+            "# HELP pfbudget_stage_seconds Time spent on each stage",
+            "# TYPE pfbudget_stage_seconds summary",
+        ]
+        for name, t in self.timers.items():
+            lines.append(f'pfbudget_stage_seconds_sum{{stage="{name}"}} {sum(t)}')
+            lines.append(f'pfbudget_stage_seconds_count{{stage="{name}"}} {len(t)}')
+
+        for name, n in self.counters.items():
+            metric = f"pfbudget_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {n}")
+
+        return "\n".join(lines) + "\n"
+
+    def report(self, path: Optional[Path] = None) -> None:
+        """Prints the summary or, given a path, writes it as JSON or Prometheus
+        text, depending on the extension (.json or anything else)"""
+        if not path:
+            print(self.summary(), file=sys.stderr)
+        elif path.suffix == ".json":
+            path.write_text(self.json() + "\n")
+        else:
+            path.write_text(self.prometheus())
+
+
+metrics = Metrics()
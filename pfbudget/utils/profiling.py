@@ -0,0 +1,71 @@
+"""Profiling of a single operation, without code changes
+
+The operation runs under cProfile, whose stats are written to the given file, to be
+read with pstats or snakeviz. cProfile only keeps caller/callee pairs, so the full
+stacks are sampled alongside, by a thread that periodically looks at the profiled
+thread's frame, and written in the collapsed format that flamegraph.pl, speedscope
+and inferno read, one `frame;frame;frame count` line per distinct stack.
+"""
+
+from __future__ import annotations
+from collections import Counter
+import contextlib
+import cProfile
+from pathlib import Path
+import sys
+import threading
+from types import FrameType
+from typing import Iterator, Optional
+
+
+class Sampler(threading.Thread):
+    def __init__(self, thread: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread = thread
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            if frame := sys._current_frames().get(self.thread):
+                self.stacks[self.collapse(frame)] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+    @staticmethod
+    def collapse(frame: Optional[FrameType]) -> str:
+        stack = []
+        while frame:
+            code = frame.f_code
+            stack.append(
+                f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def dump(self, path: Path) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.items():
+                f.write(f"{stack} {count}\n")
+
+
+@contextlib.contextmanager
+def profiling(path: Path, interval: float = 0.001) -> Iterator[None]:
+    """Profiles the block, writing the pstats to `path` and the sampled stacks to
+    `path` with a .collapsed suffix appended"""
+    sampler = Sampler(threading.get_ident(), interval)
+    profiler = cProfile.Profile()
+
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        profiler.dump_stats(path)
+        sampler.dump(path.with_name(path.name + ".collapsed"))
@@ -1,5 +1,5 @@
 from datetime import date, datetime, timedelta
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
 from pathlib import Path
 
 
@@ -17,9 +17,8 @@ class CreditCardNotAvailableError(Exception):
 
 def parse_decimal(s: str) -> Decimal:
     try:
-        float(s)
         return Decimal(s)
-    except ValueError:
+    except InvalidOperation:
         pass
     try:
         d = s.strip().replace("\xa0", "").replace(" ", "")
@@ -35,6 +34,19 @@ def parse_decimal(s: str) -> Decimal:
         raise InvalidOperation(f"{s} -> {d}")
 
 
+def to_cents(amount: Decimal, rounding: str = ROUND_HALF_UP) -> int:
+    """Amount in integer cents, rounded the way a Numeric(16, 2) column stores it
+
+    Amounts are compared and summed as cents in the hot paths, which is exact at the
+    database precision, and only turned back into Decimals at the boundaries.
+    """
+    return int(amount.scaleb(2).to_integral_value(rounding))
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
 def find_credit_institution(fn, banks, creditcards):
     name = Path(fn).stem.split("_")
     bank, cc = None, None
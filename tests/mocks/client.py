@@ -1,18 +1,24 @@
 import datetime as dt
+from pathlib import Path
+from typing import Optional
 
+from pfbudget.db.aio import AsyncClient
 from pfbudget.db.client import Client
 from pfbudget.db.model import Base, Nordigen
+from pfbudget.db.template import SQLiteTemplate
+
+# the schema is only built once, every client gets a copy
+template = SQLiteTemplate()
 
 
 class MockClient(Client):
     now = dt.datetime.now()
 
-    def __init__(self):
-        url = "sqlite://"
+    def __init__(self, path: Optional[Path] = None):
+        """In memory or in the database file `path`"""
         super().__init__(
-            url, execution_options={"schema_translate_map": {"pfbudget": None}}
+            f"sqlite:///{path}" if path else "sqlite://", **template.options(path)
         )
-        Base.metadata.create_all(self.engine)
 
         self.insert(
             [
@@ -20,3 +26,14 @@ class MockClient(Client):
                 Nordigen("refresh", "token#2", self.now + dt.timedelta(days=30)),
             ]
         )
+
+
+class MockAsyncClient(AsyncClient):
+    def __init__(self, url: str = "sqlite+aiosqlite://"):
+        super().__init__(
+            url, execution_options={"schema_translate_map": {"pfbudget": None}}
+        )
+
+    async def create(self) -> None:
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
@@ -0,0 +1,166 @@
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+import random
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from mocks.client import MockClient
+
+from pfbudget.common.types import Operation
+from pfbudget.core.manager import Manager
+from pfbudget.db.client import Client
+from pfbudget.db.model import (
+    BankTransaction,
+    Category,
+    CategoryRule,
+    RuleMatch,
+    TagRule,
+)
+from pfbudget.transform.cache import RuleCache, insert, version
+from pfbudget.transform.categorizer import Categorizer
+from pfbudget.transform.tagger import Tagger
+
+
+def rule(name: str, **kwargs) -> CategoryRule:
+    r = CategoryRule(**kwargs)
+    r.name = name
+    return r
+
+
+def tag(name: str, **kwargs) -> TagRule:
+    r = TagRule(**kwargs)
+    r.tag = name
+    return r
+
+
+rules = [
+    rule("groceries", regex="continente|lidl", max=Decimal("-0.01")),
+    rule("salary", description="SALARY", min=Decimal("10")),
+    rule("january", start=date(2023, 1, 10), end=date(2023, 1, 12), bank="bank#1"),
+    rule("other", description="COMPRA LIDL"),
+]
+
+
+@pytest.fixture
+def transactions() -> list[BankTransaction]:
+    rng = random.Random(0)
+    descriptions = ["COMPRA CONTINENTE", "COMPRA LIDL", "TRF SAVINGS", "SALARY", None]
+    return [
+        BankTransaction(
+            date(2023, 1, 1 + rng.randrange(28)),
+            rng.choice(descriptions),
+            Decimal(rng.randint(-5000, 5000)).scaleb(-2),
+            bank=rng.choice(["bank#1", "bank#2", None]),
+        )
+        for _ in range(200)
+    ]
+
+
+class TestRuleCache:
+    def test_matches(self, transactions: list[BankTransaction]):
+        cache = RuleCache(rules)
+        for t in transactions:
+            assert cache.matches(t) == [r for r in rules if r.matches(t)]
+
+    def test_transformers(self, transactions: list[BankTransaction]):
+        tags = [tag("tag#1", regex="^trf"), tag("tag#2", bank="bank#2")]
+
+        expected = Tagger(tags).transform(Categorizer(rules).transform(transactions))
+        result = Tagger(tags, cache=RuleCache(tags)).transform(
+            Categorizer(rules, cache=RuleCache(rules)).transform(transactions)
+        )
+
+        assert result == expected
+
+    def test_lru(self, transactions: list[BankTransaction]):
+        cache = RuleCache(rules, maxsize=2)
+        for t in transactions:
+            cache.matches(t)
+
+        assert len(cache._memo) == 2
+
+    def test_persistence(self, transactions: list[BankTransaction]):
+        client = MockClient()
+        cache = RuleCache(rules)
+        for t in transactions:
+            cache.matches(t)
+        cache.save(client)
+        cache.save(client)
+
+        stored = client.select(RuleMatch)
+        assert {(m.description, m.bank) for m in stored} == {
+            (t.description, t.bank) for t in transactions if t.description and t.bank
+        }
+        assert all(m.version == version(rules) for m in stored)
+
+        loaded = RuleCache(rules)
+        loaded.load(client)
+        assert dict(loaded._memo) == dict(cache._memo)
+
+        # another rule set doesn't see them
+        changed = RuleCache(rules[:-1])
+        changed.load(client)
+        assert not changed._memo
+
+        RuleCache.prune(client, {version(rules[:-1])})
+        assert not client.select(RuleMatch)
+
+    def test_prune(self, transactions: list[BankTransaction]):
+        client = MockClient()
+        caches = [RuleCache(rules), RuleCache(rules[:-1]), RuleCache(rules[1:])]
+        for cache in caches:
+            for t in transactions:
+                cache.matches(t)
+            cache.save(client)
+
+        RuleCache.prune(client, {caches[0].version, caches[2].version})
+        assert {m.version for m in client.select(RuleMatch)} == {
+            caches[0].version,
+            caches[2].version,
+        }
+
+    def test_unavailable(self, transactions: list[BankTransaction]):
+        client = MockClient()
+        RuleMatch.__table__.drop(client.engine)
+
+        # a database without the table goes without the stored entries
+        cache = RuleCache(rules)
+        cache.load(client)
+        for t in transactions:
+            cache.matches(t)
+        cache.save(client)
+        RuleCache.prune(client, {cache.version})
+
+        manager = Manager("sqlite://")
+        manager._database = client
+        manager.action(Operation.CategoryAdd, [Category("cat")])
+        r = CategoryRule(description="desc")
+        r.name = "cat"
+        manager.action(Operation.RuleAdd, [r])
+        manager.action(Operation.Categorize, [False])
+        assert len(manager.cache("categories", manager.rules.categories).rules) == 1
+
+    def test_concurrent_save(self):
+        client = MockClient()
+        row = {"version": version(rules), "description": "A", "bank": "b", "rules": ""}
+
+        # as stored by another run between this one's load and save
+        with client.engine.begin() as connection:
+            connection.execute(insert(connection), [row])
+            connection.execute(insert(connection), [row, row | {"description": "B"}])
+
+        assert len(client.select(RuleMatch)) == 2
+
+    def test_errors(self, tmp_path: Path):
+        # only a missing table is tolerated
+        client = Client(f"sqlite:///{tmp_path / 'missing' / 'data.db'}")
+        with pytest.raises(OperationalError):
+            RuleCache(rules).load(client)
+
+    def test_empty_description(self):
+        empty = [rule("any", regex=".*"), rule("none", regex="^$")]
+        cache = RuleCache(empty)
+        for description in ("", "A", None):
+            t = BankTransaction(date(2023, 1, 1), description, Decimal("-1"), bank="b")
+            assert cache.matches(t) == [r for r in empty if r.matches(t)]
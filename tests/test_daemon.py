@@ -0,0 +1,146 @@
+import datetime as dt
+from decimal import Decimal
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterator
+import pytest
+
+from mocks.client import MockClient
+
+from pfbudget.common.types import Operation
+from pfbudget.core.daemon import Daemon, DaemonError, request
+from pfbudget.core.manager import Manager
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    Category,
+    CategoryRule,
+    NordigenBank,
+)
+
+
+@pytest.fixture
+def manager() -> Manager:
+    manager = Manager("sqlite://")
+    manager._database = MockClient()
+    return manager
+
+
+@pytest.fixture
+def daemon(tmp_path: Path) -> Iterator[Daemon]:
+    # the daemon runs on its own thread, which wouldn't see an in-memory database
+    manager = Manager("sqlite://")
+    manager._database = MockClient(tmp_path / "test.db")
+
+    daemon = Daemon(manager, tmp_path / "pfbudget.sock")
+    daemon.poll = dt.timedelta(milliseconds=10)
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+
+    deadline = time.monotonic() + 5
+    while not daemon.path.exists():
+        if not thread.is_alive() or time.monotonic() > deadline:
+            daemon.shutdown()
+            thread.join(1)
+            pytest.fail("daemon didn't start")
+        time.sleep(0.01)
+
+    yield daemon
+
+    daemon.shutdown()
+    thread.join()
+
+
+class TestDaemon:
+    def test_category_add(self, daemon: Daemon):
+        args = {"category": ["cat#1", "cat#2"], "group": None}
+        request(daemon.path, Operation.CategoryAdd, args)
+
+        categories = daemon.manager.database.select(Category)
+        assert [c.name for c in categories] == ["cat#1", "cat#2"]
+
+    def test_typed_args(self, daemon: Daemon):
+        request(
+            daemon.path, Operation.CategoryAdd, {"category": ["cat"], "group": None}
+        )
+
+        args: dict[str, Any] = {
+            "category": ["cat"],
+            "start": [dt.date(2023, 1, 1)],
+            "end": None,
+            "description": None,
+            "regex": ["desc"],
+            "bank": None,
+            "min": [Decimal("-10.5")],
+            "max": None,
+        }
+        request(daemon.path, Operation.RuleAdd, args)
+
+        rules = daemon.manager.database.select(CategoryRule)
+        assert len(rules) == 1
+        assert rules[0].start == dt.date(2023, 1, 1)
+        assert rules[0].min == Decimal("-10.5")
+
+    def test_interactive(self, daemon: Daemon):
+        with pytest.raises(DaemonError):
+            request(daemon.path, Operation.ManualCategorization, {})
+
+    def test_error(self, daemon: Daemon):
+        with pytest.raises(DaemonError):
+            request(daemon.path, Operation.CategoryAdd, {})
+
+    def test_rules_invalidated(self, manager: Manager):
+        manager.action(Operation.CategoryAdd, [Category("cat")])
+        assert not manager.rules.categories
+
+        rule = CategoryRule(description="desc")
+        rule.name = "cat"
+        manager.action(Operation.RuleAdd, [rule])
+        assert len(manager.rules.categories) == 1
+
+    def test_rules_reloaded(self, tmp_path: Path, manager: Manager):
+        assert not manager.rules.categories
+
+        # by another process, which the daemon isn't told about
+        category = Category("cat", rules=[CategoryRule(description="desc")])
+        manager.database.insert([category])
+
+        daemon = Daemon(manager, tmp_path / "pfbudget.sock")
+        assert daemon.handle(b'{"op": "Transactions", "args": {}}')["ok"]
+        assert len(manager.rules.categories) == 1
+
+    def test_sync(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path, manager: Manager
+    ):
+        bank = Bank("bank", "BANK", AccountType.checking, NordigenBank("id", "req"))
+        manager.database.insert([bank])
+        manager.database.insert(
+            [
+                BankTransaction(dt.date(2023, 1, 1), "a", Decimal("-1"), bank="bank"),
+                BankTransaction(dt.date(2023, 1, 2), "b", Decimal("-2"), bank="bank"),
+            ]
+        )
+
+        downloaded = [
+            BankTransaction(dt.date(2023, 1, 2), "b", Decimal("-2"), bank="bank"),
+            BankTransaction(dt.date(2023, 1, 2), "c", Decimal("-3"), bank="bank"),
+            BankTransaction(dt.date(2023, 1, 3), "d", Decimal("-4"), bank="bank"),
+            BankTransaction(dt.date(2023, 1, 3), "d", Decimal("-4"), bank="bank"),
+        ]
+        starts: list[dt.date] = []
+
+        def extract(_, bank: Bank, start: dt.date, end: dt.date):
+            starts.append(start)
+            return [t for t in downloaded if start <= t.date <= end]
+
+        monkeypatch.setattr(Manager, "nordigen_client", lambda _: None)
+        monkeypatch.setattr("pfbudget.extract.psd2.PSD2Extractor.extract", extract)
+
+        Daemon(manager, tmp_path / "pfbudget.sock").sync()
+        Daemon(manager, tmp_path / "pfbudget.sock").sync()
+
+        assert starts == [dt.date(2023, 1, 2), dt.date(2023, 1, 3)]
+        stored = manager.database.select(BankTransaction)
+        assert sorted(t.description for t in stored) == ["a", "b", "c", "d", "d"]
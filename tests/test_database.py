@@ -1,17 +1,24 @@
+import asyncio
 from datetime import date
 from decimal import Decimal
+from pathlib import Path
 import pytest
+from sqlalchemy.exc import IntegrityError
 
-from mocks.client import MockClient
+from mocks.client import MockAsyncClient, MockClient
 
+from pfbudget.db.aio import AsyncClient
 from pfbudget.db.client import Client
+from pfbudget.db.view import transactions_view
 from pfbudget.db.model import (
     AccountType,
     Bank,
     NordigenBank,
+    Note,
     CategorySelector,
     Transaction,
     TransactionCategory,
+    TransactionTag,
 )
 
 
@@ -78,6 +85,79 @@ class TestDatabase:
         result = client.select(Transaction)
         assert result == transactions
 
+    def test_projection(self, client: Client, transactions: list[Transaction]):
+        with client.session as session:
+            [transaction, _] = session.select(Transaction)
+            transaction.tags |= {TransactionTag("tag#1"), TransactionTag("tag#2")}
+            transaction.note = Note("note")
+
+        rows = client.projection()
+        assert [(r.id, r.date, r.amount, r.type) for r in rows] == [
+            (1, date(2023, 1, 1), Decimal("-10"), "transaction"),
+            (2, date(2023, 1, 2), Decimal("-50"), "transaction"),
+        ]
+        assert (rows[0].category, rows[0].selector) == (
+            "category",
+            CategorySelector.algorithm,
+        )
+        assert rows[0].tags == {"tag#1", "tag#2"}
+        assert rows[0].note == "note"
+        assert rows[0].format["category"] == {
+            "name": "category",
+            "selector": {"selector": CategorySelector.algorithm},
+        }
+        assert rows[0].format["tags"] == ["tag#1", "tag#2"]
+
+        [row] = client.projection(transactions_view.c.category.is_(None))
+        assert (row.id, row.category, row.tags, row.note) == (2, None, set(), None)
+
+    def test_insert_copies(self, client: Client):
+        transaction = Transaction(
+            date(2023, 1, 1),
+            "",
+            Decimal("-10"),
+            category=TransactionCategory("category", CategorySelector.algorithm),
+        )
+
+        client.insert([transaction])
+        assert transaction.id is None and transaction.category.id is None
+
+        client.insert([transaction], copy=False)
+        assert transaction.id == 2 and transaction.category.id == 2
+        assert len(client.select(Transaction)) == 2
+
+    def test_update_categories(self, client: Client, transactions: list[Transaction]):
+        client.update_categories(
+            [
+                {"id": 1, "name": "other", "selector": CategorySelector.manual},
+                {"id": 2, "name": "category", "selector": CategorySelector.rules},
+            ]
+        )
+        client.update_categories([])
+
+        assert [
+            (c.id, c.name, c.selector) for c in client.select(TransactionCategory)
+        ] == [
+            (1, "other", CategorySelector.manual),
+            (2, "category", CategorySelector.rules),
+        ]
+
+    def test_update_categories_failure(
+        self, client: Client, transactions: list[Transaction]
+    ):
+        with pytest.raises(AttributeError):
+            client.update_categories([{"id": 1, "name": "other", "selector": "manual"}])
+
+        # the same transaction staged twice
+        duplicated = {"id": 1, "name": "other", "selector": CategorySelector.manual}
+        with pytest.raises(IntegrityError):
+            client.update_categories([duplicated, duplicated])
+
+        client.update_categories([duplicated])
+        assert [(c.id, c.name) for c in client.select(TransactionCategory)] == [
+            (1, "other")
+        ]
+
     def test_select_transactions_without_category(
         self, client: Client, transactions: list[Transaction]
     ):
@@ -151,3 +231,58 @@ class TestDatabase:
         client.delete(Bank, Bank.name, names)
         result = client.select(Bank)
         assert len(result) == 0
+
+
+class TestAsyncDatabase:
+    def test_insert_select(self, tmp_path: Path):
+        async def run(client: AsyncClient) -> None:
+            await client.create()
+            banks = [
+                Bank("bank", "BANK", AccountType.checking),
+                Bank("broker", "BROKER", AccountType.investment),
+            ]
+            transactions = [
+                Transaction(
+                    date(2023, 1, 1),
+                    "",
+                    Decimal("-10"),
+                    category=TransactionCategory("category", CategorySelector.manual),
+                ),
+                Transaction(date(2023, 1, 2), "", Decimal("-50")),
+            ]
+
+            await asyncio.gather(
+                client.insert(banks), client.insert(transactions, copy=False)
+            )
+
+            assert [t.id for t in transactions] == [1, 2]
+            result = await client.select(Transaction)
+            assert [(t.amount, t.category and t.category.name) for t in result] == [
+                (Decimal("-10"), "category"),
+                (Decimal("-50"), None),
+            ]
+            assert len(await client.select(Bank, lambda: Bank.name == "bank")) == 1
+
+        async def main() -> None:
+            # concurrent writers need their own connections, so a file database
+            async with MockAsyncClient(f"sqlite+aiosqlite:///{tmp_path}/db") as client:
+                await run(client)
+
+        asyncio.run(main())
+
+    def test_update_delete(self):
+        async def run() -> None:
+            async with MockAsyncClient() as client:
+                await client.create()
+                await client.insert([Bank("bank", "BANK", AccountType.checking)])
+
+                await client.update(
+                    Bank, [{"name": "bank", "type": AccountType.savings}]
+                )
+                result = await client.select(Bank)
+                assert result[0].type == AccountType.savings
+
+                await client.delete(Bank, Bank.name, ["bank"])
+                assert not await client.select(Bank)
+
+        asyncio.run(run())
@@ -0,0 +1,164 @@
+from datetime import date
+from decimal import Decimal
+import random
+import pytest
+
+from mocks.client import MockClient
+
+from pfbudget.common.frame import TransactionFrame
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    Category,
+    CategoryRule,
+    CategorySelector,
+    TransactionCategory,
+)
+from pfbudget.transform.categorizer import Categorizer
+from pfbudget.transform.exceptions import MoreThanOneMatchError
+from pfbudget.transform.nullifier import Nullifier
+
+
+def rule(name: str, **kwargs) -> CategoryRule:
+    r = CategoryRule(**kwargs)
+    r.name = name
+    return r
+
+
+@pytest.fixture
+def transactions() -> list[BankTransaction]:
+    rng = random.Random(0)
+    descriptions = ["COMPRA CONTINENTE", "COMPRA LIDL", "TRF SAVINGS", "SALARY", None]
+    return [
+        BankTransaction(
+            date(2023, 1, 1 + rng.randrange(28)),
+            rng.choice(descriptions),
+            Decimal(rng.randint(-5000, 5000)).scaleb(-2),
+            bank=rng.choice(["bank#1", "bank#2", None]),
+        )
+        for _ in range(200)
+    ]
+
+
+rules = [
+    rule("groceries", regex="continente|lidl", max=Decimal("-0.005")),
+    rule("salary", description="SALARY", min=Decimal("10.001")),
+    rule("january", start=date(2023, 1, 10), end=date(2023, 1, 12), bank="bank#1"),
+    rule("other", description="COMPRA LIDL"),
+]
+
+
+class TestFrame:
+    def test_roundtrip(self, transactions: list[BankTransaction]):
+        frame = TransactionFrame.from_transactions(transactions)
+
+        assert len(frame) == len(transactions)
+        for i, t in enumerate(transactions):
+            assert frame.row(i)[1:] == (t.date, t.description, t.amount, t.bank, None)
+
+    def test_matches(self, transactions: list[BankTransaction]):
+        frame = TransactionFrame.from_transactions(transactions)
+        for r in rules:
+            assert frame.matches(r).tolist() == [r.matches(t) for t in transactions]
+
+    def test_matches_empty(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), d, Decimal("-1")) for d in ["", "A", None]
+        ]
+        frame = TransactionFrame.from_transactions(transactions)
+        for r in [rule("any", regex=".*"), rule("empty", regex="^$")]:
+            assert frame.matches(r).tolist() == [r.matches(t) for t in transactions]
+
+    def test_categorize(self, transactions: list[BankTransaction]):
+        frame = TransactionFrame.from_transactions(transactions)
+        Categorizer(rules).transform_inplace(transactions)
+
+        assert frame.categorize(rules) == sum(1 for t in transactions if t.category)
+        assert [frame.row(i)[5] for i in range(len(frame))] == [
+            t.category.name if t.category else None for t in transactions
+        ]
+
+    def test_nullify(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 2), "A2", Decimal("500"), bank="Bank#2"),
+            BankTransaction(date(2023, 1, 2), "B1", Decimal("-500"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 1), "A1", Decimal("-500"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 6), "B2", Decimal("500"), bank="Bank#2"),
+            BankTransaction(date(2023, 1, 2), "C", Decimal("-20"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 9), "C", Decimal("20"), bank="Bank#2"),
+        ]
+        frame = TransactionFrame.from_transactions(transactions)
+        Nullifier().transform_inplace(transactions)
+
+        assert frame.nullify() == [(2, 0), (1, 3)]
+        assert [frame.row(i)[5] for i in range(len(frame))] == [
+            t.category.name if t.category else None for t in transactions
+        ]
+
+    def test_nullify_rules(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "TRF", Decimal("-10"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 2), "TRF", Decimal("10"), bank="Bank#2"),
+            BankTransaction(date(2023, 1, 1), "X", Decimal("-20"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 2), "X", Decimal("20"), bank="Bank#2"),
+        ]
+        frame = TransactionFrame.from_transactions(transactions)
+
+        assert frame.nullify([rule("null", description="TRF")]) == [(0, 1)]
+
+    def test_nullify_ambiguous(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "", Decimal("-10"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 2), "", Decimal("10"), bank="Bank#2"),
+            BankTransaction(date(2023, 1, 3), "", Decimal("10"), bank="Bank#3"),
+        ]
+
+        with pytest.raises(MoreThanOneMatchError):
+            TransactionFrame.from_transactions(transactions).nullify()
+
+    def test_sums(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "", Decimal("-10.10"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 31), "", Decimal("0.20"), bank="Bank#2"),
+            BankTransaction(date(2023, 2, 1), "", Decimal("-0.01"), bank="Bank#1"),
+        ]
+        frame = TransactionFrame.from_transactions(transactions)
+
+        assert frame.total() == Decimal("-9.91")
+        assert frame.total(frame.amount < 0) == Decimal("-10.11")
+        assert frame.by("bank") == {
+            "Bank#1": Decimal("-10.11"),
+            "Bank#2": Decimal("0.2"),
+        }
+        assert frame.monthly() == {
+            date(2023, 1, 1): Decimal("-9.90"),
+            date(2023, 2, 1): Decimal("-0.01"),
+        }
+
+    def test_load(self):
+        client = MockClient()
+        client.insert([Bank("bank", "BANK", AccountType.checking), Category("cat")])
+        client.insert(
+            [
+                BankTransaction(date(2023, 1, 2), "b", Decimal("-1.5"), bank="bank"),
+                BankTransaction(
+                    date(2023, 1, 1),
+                    "a",
+                    Decimal("2"),
+                    bank="bank",
+                    category=TransactionCategory("cat", CategorySelector.manual),
+                ),
+            ]
+        )
+
+        frame = TransactionFrame.load(client)
+
+        assert frame.row(0)[1:] == (date(2023, 1, 1), "a", Decimal("2"), "bank", "cat")
+        assert frame.row(1)[1:] == (
+            date(2023, 1, 2),
+            "b",
+            Decimal("-1.5"),
+            "bank",
+            None,
+        )
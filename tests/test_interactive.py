@@ -0,0 +1,116 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from pytest_mock import MockerFixture
+
+from mocks.client import MockClient
+
+from pfbudget.cli.interactive import Interactive, Queue
+from pfbudget.core.manager import Manager
+from pfbudget.db.client import Client, DatabaseSession
+from pfbudget.db.model import (
+    Category,
+    CategoryRule,
+    CategorySelector,
+    Note,
+    SplitTransaction,
+    Tag,
+    Transaction,
+    TransactionCategory,
+)
+
+
+@pytest.fixture
+def manager() -> Manager:
+    manager = Manager("sqlite://")
+    manager._database = MockClient()
+
+    categories = [
+        Category("groceries", rules=[CategoryRule(regex="lidl")]),
+        Category("shopping", rules=[CategoryRule(regex="compra")]),
+        Category("salary"),
+    ]
+    manager.database.insert(categories)
+
+    descriptions = ["COMPRA LIDL", "SALARY", "COMPRA ZARA"]
+    transactions = [
+        Transaction(date(2023, 1, 5 - i), descriptions[i % 3], Decimal(-i))
+        for i in range(5)
+    ]
+    transactions[3].category = TransactionCategory("salary", CategorySelector.manual)
+    manager.database.insert(transactions)
+    return manager
+
+
+class TestQueue:
+    def test_pages(self, manager: Manager):
+        client = manager.database
+        queue = Queue(client, size=2)
+        assert len(queue) == 4
+
+        rows = iter(queue)
+        first = next(rows)
+        assert (first.date, first.description) == (date(2023, 1, 1), "SALARY")
+
+        # categorizing the taken transactions doesn't shift the following pages
+        client.update_categories(
+            [{"id": first.id, "name": "groceries", "selector": CategorySelector.manual}]
+        )
+        assert [r.date for r in rows] == [
+            date(2023, 1, 3),
+            date(2023, 1, 4),
+            date(2023, 1, 5),
+        ]
+        assert len(queue) == 3
+
+
+class TestInteractive:
+    def test_start(self, monkeypatch: pytest.MonkeyPatch, manager: Manager):
+        commands = iter(["salary:weekly", "#3", "#1", "skip", "quit"])
+        monkeypatch.setattr("builtins.input", lambda _: next(commands))
+
+        interactive = Interactive(manager)
+        suggestions = [interactive.suggest(r) for r in Queue(manager.database)]
+        assert suggestions == [[], ["shopping"], [], ["groceries", "shopping"]]
+
+        interactive.start()
+
+        categorized = {
+            t.date.day: (t.category.name if t.category else None, t.tags)
+            for t in manager.database.select(Transaction)
+        }
+        assert categorized[1][0] == "salary"
+        assert {t.tag for t in categorized[1][1]} == {"weekly"}
+        assert categorized[3][0] == "shopping"
+        assert categorized[4][0] is None
+        assert categorized[5][0] is None
+        assert {t.name for t in manager.database.select(Tag)} == {"weekly"}
+
+    def test_split(
+        self, monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture, manager: Manager
+    ):
+        commands = iter(
+            ["note: rent", "split", "-3", "-1", "salary", "groceries:food", "quit"]
+        )
+        monkeypatch.setattr("builtins.input", lambda _: next(commands))
+        select = mocker.spy(DatabaseSession, "select")
+        update = mocker.spy(Client, "update_categories")
+
+        Interactive(manager).start()
+
+        # the answers are written together, without reloading the transactions
+        assert not any(
+            issubclass(call.args[1], Transaction) for call in select.call_args_list
+        )
+        update.assert_called_once()
+
+        splits = {t.amount: t for t in manager.database.select(SplitTransaction)}
+        assert splits.keys() == {Decimal(-3), Decimal(-1)}
+        assert splits[Decimal(-1)].category.name == "salary"
+        assert splits[Decimal(-3)].category.name == "groceries"
+        assert {t.tag for t in splits[Decimal(-3)].tags} == {"food"}
+
+        [note] = manager.database.select(Note)
+        assert note.note == "rent"
+        [original] = manager.database.select(Transaction, Transaction.note.has())
+        assert (original.date, original.category) == (date(2023, 1, 1), None)
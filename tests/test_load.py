@@ -13,7 +13,7 @@ class FakeDatabaseClient(Client):
     def __init__(self, url: str) -> None:
         super().__init__(url)
 
-    def insert(self, transactions: Sequence[Transaction]) -> None:
+    def insert(self, transactions: Sequence[Transaction], copy: bool = True) -> None:
         pass
 
 
@@ -0,0 +1,69 @@
+from datetime import date
+from decimal import Decimal
+import json
+from pathlib import Path
+from typing import Iterator
+import pytest
+
+import mocks.categories as mock
+
+from pfbudget.db.model import BankTransaction
+from pfbudget.transform.categorizer import Categorizer
+from pfbudget.utils.metrics import Metrics, metrics
+
+
+@pytest.fixture
+def enabled() -> Iterator[Metrics]:
+    metrics.reset()
+    metrics.enabled = True
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+class TestMetrics:
+    def test_disabled(self):
+        m = Metrics()
+        with m.stage("stage"):
+            m.count("counter")
+
+        assert not m.timers
+        assert not m.counters
+
+    def test_stage(self):
+        m = Metrics()
+        m.enabled = True
+        for _ in range(2):
+            with m.stage("stage"):
+                m.count("counter", 3)
+
+        assert len(m.timers["stage"]) == 2
+        assert m.counters["counter"] == 6
+
+    def test_export(self, tmp_path: Path):
+        m = Metrics()
+        m.enabled = True
+        with m.stage("transform.categorize"):
+            m.count("rules.matched")
+
+        m.report(tmp_path / "metrics.json")
+        exported = json.loads((tmp_path / "metrics.json").read_text())
+        assert exported["stages"]["transform.categorize"]["calls"] == 1
+        assert exported["counters"] == {"rules.matched": 1}
+
+        m.report(tmp_path / "metrics.prom")
+        lines = (tmp_path / "metrics.prom").read_text().splitlines()
+        assert 'pfbudget_stage_seconds_count{stage="transform.categorize"} 1' in lines
+        assert "pfbudget_rules_matched_total 1" in lines
+
+    def test_categorizer(self, enabled: Metrics):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "desc#1", Decimal("-1"), bank="bank"),
+            BankTransaction(date(2023, 1, 2), "desc#2", Decimal("-1"), bank="bank"),
+        ]
+
+        Categorizer(mock.category1.rules).transform_inplace(transactions)
+
+        assert len(enabled.timers["transform.categorize"]) == 1
+        assert enabled.counters["rules.evaluated"] == 2
+        assert enabled.counters["rules.matched"] == 1
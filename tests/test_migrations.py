@@ -0,0 +1,174 @@
+import os
+from pathlib import Path
+import pytest
+from sqlalchemy import Connection, Engine, create_engine, text
+
+from alembic import command
+from alembic.config import Config
+
+from pfbudget.db.model import Base
+
+# e.g. PFBUDGET_TEST_POSTGRES=postgresql://postgres@/pfbudget?host=/tmp
+# its pfbudget schema is dropped and recreated
+url = os.environ.get("PFBUDGET_TEST_POSTGRES")
+
+pytestmark = pytest.mark.skipif(
+    url is None, reason="needs a Postgres database on PFBUDGET_TEST_POSTGRES"
+)
+
+root = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def engine() -> Engine:
+    assert url
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA IF EXISTS pfbudget CASCADE"))
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        connection.execute(text("CREATE SCHEMA pfbudget"))
+        Base.metadata.create_all(connection)
+        # created by the following revision
+        connection.execute(text("DROP VIEW IF EXISTS pfbudget.transactions_view"))
+
+        connection.execute(
+            text(
+                """
+                INSERT INTO pfbudget.banks VALUES ('bank', 'BANK', 'checking');
+                INSERT INTO pfbudget.categories VALUES ('groceries', NULL);
+                INSERT INTO pfbudget.tags VALUES ('lidl');
+                INSERT INTO pfbudget.transactions
+                    (id, date, description, amount, split, type, bank, original)
+                VALUES
+                    (1, '2023-12-31', 'lidl', -10, true, 'bank', 'bank', NULL),
+                    (2, '2024-01-02', 'refund', 10, false, 'bank', 'bank', NULL),
+                    (3, '2023-12-31', 'lidl', -4, false, 'split', NULL, 1);
+                SELECT setval('pfbudget.transactions_id_seq', 3);
+                INSERT INTO pfbudget.transactions_categorized
+                    VALUES (1, 'groceries', 'manual');
+                INSERT INTO pfbudget.transactions_tagged VALUES (1, 'lidl');
+                INSERT INTO pfbudget.notes VALUES (1, 'new year');
+                INSERT INTO pfbudget.links VALUES (1, 2);
+                """
+            )
+        )
+    yield engine
+    engine.dispose()
+
+
+def migrate(operation: str, revision: str, *x: str) -> None:
+    # without the ini file, which would reconfigure the logging
+    config = Config()
+    config.set_main_option("script_location", str(root / "alembic"))
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    config.cmd_opts = type("Options", (), {"x": list(x)})()
+    getattr(command, operation)(config, revision)
+
+
+def partitioned(connection: Connection) -> bool:
+    return bool(
+        connection.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = 'pfbudget.transactions'::regclass"
+            )
+        ).first()
+    )
+
+
+def related(connection: Connection) -> tuple[int, ...]:
+    return tuple(
+        connection.execute(text(f"SELECT count(*) FROM pfbudget.{table}")).scalar_one()
+        for table in (
+            "transactions_categorized",
+            "transactions_tagged",
+            "notes",
+            "links",
+        )
+    )
+
+
+class TestPartition:
+    def test_default(self, engine: Engine):
+        migrate("stamp", "8a1e0c5d2f47")
+        migrate("upgrade", "c4d9e2b7a1f3")
+
+        with engine.connect() as connection:
+            assert not partitioned(connection)
+
+    def test_partition(self, engine: Engine):
+        migrate("stamp", "8a1e0c5d2f47")
+        migrate("upgrade", "c4d9e2b7a1f3", "partition=year")
+
+        with engine.begin() as connection:
+            assert partitioned(connection)
+            assert (
+                connection.execute(
+                    text("SELECT count(*) FROM pfbudget.transactions_2023")
+                ).scalar_one()
+                == 2
+            )
+            assert related(connection) == (1, 1, 1, 1)
+
+            # moved to the 2024 partition, and keeps everything related to it
+            connection.execute(
+                text(
+                    "UPDATE pfbudget.transactions SET date = '2024-01-01' WHERE id = 1"
+                )
+            )
+            assert related(connection) == (1, 1, 1, 1)
+            assert (
+                connection.execute(
+                    text("SELECT count(*) FROM pfbudget.transactions_2024")
+                ).scalar_one()
+                == 2
+            )
+
+            new = connection.execute(
+                text(
+                    "INSERT INTO pfbudget.transactions (date, amount, split, type) "
+                    "VALUES ('2100-01-01', 1, false, 'bank') RETURNING id"
+                )
+            ).scalar_one()
+            assert new == 4
+
+        migrate("downgrade", "8a1e0c5d2f47")
+
+        with engine.begin() as connection:
+            assert not partitioned(connection)
+            assert related(connection) == (1, 1, 1, 1)
+            assert (
+                connection.execute(
+                    text("SELECT date FROM pfbudget.transactions WHERE id = 1")
+                )
+                .scalar_one()
+                .isoformat()
+                == "2024-01-01"
+            )
+
+            connection.execute(text("DELETE FROM pfbudget.transactions WHERE id = 1"))
+            assert related(connection) == (0, 0, 0, 0)
+            assert (
+                connection.execute(
+                    text("SELECT count(*) FROM pfbudget.transactions")
+                ).scalar_one()
+                == 2
+            )
+
+    def test_delete(self, engine: Engine):
+        migrate("stamp", "8a1e0c5d2f47")
+        migrate("upgrade", "c4d9e2b7a1f3", "partition=year")
+
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM pfbudget.transactions WHERE id = 2"))
+            assert related(connection) == (1, 1, 1, 0)
+
+            # along with its split
+            connection.execute(text("DELETE FROM pfbudget.transactions WHERE id = 1"))
+            assert related(connection) == (0, 0, 0, 0)
+            assert (
+                connection.execute(
+                    text("SELECT count(*) FROM pfbudget.transactions")
+                ).scalar_one()
+                == 0
+            )
@@ -0,0 +1,142 @@
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+import threading
+import time
+from typing import Sequence
+import pytest
+
+from mocks.client import MockClient
+
+from pfbudget.core.pipeline import Pipeline
+from pfbudget.db.model import AccountType, Bank, BankTransaction, CategoryRule
+from pfbudget.extract.exceptions import ExtractError
+from pfbudget.extract.extract import Extractor
+from pfbudget.extract.unstored import UnstoredExtractor
+from pfbudget.load.database import DatabaseLoader
+from pfbudget.load.load import Loader
+from pfbudget.transform.categorizer import Categorizer
+
+banks = [Bank(f"bank#{i}", f"BANK{i}", AccountType.checking) for i in range(3)]
+
+
+class FakeExtractor(Extractor):
+    def __init__(self, n: int, fail: bool = False):
+        self.n = n
+        self.fail = fail
+        self.extracted = 0
+
+    def extract(
+        self, bank: Bank, start: date = date.min, end: date = date.max
+    ) -> Sequence[BankTransaction]:
+        if self.fail and bank is banks[-1]:
+            raise ExtractError("download failed")
+
+        self.extracted += self.n
+        return [
+            BankTransaction(
+                date(2023, 1, 1 + i % 28),
+                "COMPRA LIDL" if i % 2 else "SALARY",
+                Decimal(-i),
+                bank=bank.name,
+            )
+            for i in range(self.n)
+        ]
+
+
+class FakeLoader(Loader):
+    def __init__(self, extractor: FakeExtractor, fail: bool = False):
+        self.extractor = extractor
+        self.fail = fail
+        self.batches: list[list[BankTransaction]] = []
+        self.pending: list[int] = []
+        self.thread: list[threading.Thread] = []
+
+    def load(self, transactions: Sequence[BankTransaction]) -> None:
+        if self.fail:
+            raise RuntimeError("load failed")
+
+        self.thread.append(threading.current_thread())
+        self.batches.append(list(transactions))
+        time.sleep(0.01)
+        loaded = sum(len(b) for b in self.batches)
+        self.pending.append(self.extractor.extracted - loaded)
+
+
+def rule(name: str, **kwargs) -> CategoryRule:
+    r = CategoryRule(**kwargs)
+    r.name = name
+    return r
+
+
+class TestPipeline:
+    def test_run(self):
+        extractor = FakeExtractor(25)
+        loader = FakeLoader(extractor)
+        categorizer = Categorizer([rule("groceries", regex="lidl")])
+
+        pipeline = Pipeline(extractor, [categorizer], loader, batch=10, depth=1)
+        assert pipeline.run(banks) == 75
+
+        assert [len(b) for b in loader.batches] == [10, 10, 5] * 3
+        transactions = [t for batch in loader.batches for t in batch]
+        assert [t.bank for t in transactions] == [
+            b.name for b in banks for _ in range(25)
+        ]
+        assert transactions[:25] == sorted(transactions[:25])
+        assert all(
+            (t.category.name if t.category else None)
+            == ("groceries" if t.description == "COMPRA LIDL" else None)
+            for t in transactions
+        )
+        assert loader.thread == [threading.main_thread()] * 9
+
+    def test_bounded(self):
+        extractor = FakeExtractor(100)
+        loader = FakeLoader(extractor)
+
+        Pipeline(extractor, [], loader, batch=5, depth=2).run(banks)
+
+        # besides the bank being extracted, the queued batches and one in each stage
+        assert max(loader.pending) <= 100 + (2 * 2 + 3) * 5
+        assert len(loader.batches) == 60
+
+    def test_extract_failure(self):
+        extractor = FakeExtractor(10, fail=True)
+        loader = FakeLoader(extractor)
+
+        with pytest.raises(ExtractError):
+            Pipeline(extractor, [], loader, batch=5).run(banks)
+
+        # the banks extracted before the failure were loaded
+        assert sum(len(b) for b in loader.batches) == 20
+
+    def test_rerun(self, tmp_path: Path):
+        # the in-memory database's single connection can't be shared by the stages
+        client = MockClient(tmp_path / "test.db")
+        client.insert(banks)
+        loader = DatabaseLoader(client)
+
+        pipeline = Pipeline(
+            UnstoredExtractor(FakeExtractor(10, fail=True), client), [], loader, batch=5
+        )
+        with pytest.raises(ExtractError):
+            pipeline.run(banks)
+        assert pipeline.loaded == {"bank#0": 10, "bank#1": 10}
+
+        # only the bank that failed is loaded again
+        pipeline = Pipeline(UnstoredExtractor(FakeExtractor(10), client), [], loader)
+        assert pipeline.run(banks) == 10
+        assert pipeline.loaded == {"bank#2": 10}
+        assert len(client.select(BankTransaction)) == 30
+
+    def test_load_failure(self):
+        extractor = FakeExtractor(100)
+        threads = threading.active_count()
+
+        with pytest.raises(RuntimeError):
+            Pipeline(extractor, [], FakeLoader(extractor, fail=True), batch=5).run(
+                banks
+            )
+
+        assert threading.active_count() == threads
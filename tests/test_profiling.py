@@ -0,0 +1,28 @@
+from pathlib import Path
+import pstats
+import time
+
+from pfbudget.utils.profiling import profiling
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiling:
+    def test_profiling(self, tmp_path: Path):
+        path = tmp_path / "out.prof"
+        with profiling(path):
+            busy(0.1)
+
+        stats = pstats.Stats(str(path))
+        assert any(name == "busy" for _, _, name in stats.stats)  # type: ignore
+
+        lines = (tmp_path / "out.prof.collapsed").read_text().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+        assert any("busy" in line.split(";")[-1] for line in lines)
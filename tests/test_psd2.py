@@ -2,16 +2,30 @@ import datetime as dt
 from decimal import Decimal
 from typing import Any, Optional
 import pytest
+from pytest_mock import MockerFixture
 import requests
 
 from mocks.client import MockClient
 import mocks.nordigen as mock
 
-from pfbudget.db.model import AccountType, Bank, BankTransaction, NordigenBank
+from pfbudget.db.client import DatabaseSession
+from pfbudget.core.manager import Manager
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    Nordigen,
+    NordigenBank,
+)
 from pfbudget.extract.exceptions import BankError, CredentialsError
 from pfbudget.extract.extract import Extractor
-from pfbudget.extract.nordigen import NordigenClient, NordigenCredentials
+from pfbudget.extract.nordigen import (
+    NordigenClient,
+    NordigenCredentials,
+    SessionNordigenClient,
+)
 from pfbudget.extract.psd2 import PSD2Extractor
+from pfbudget.utils.converters import convert, convert_transactions
 
 
 class MockGet:
@@ -51,10 +65,18 @@ class MockGet:
 
 @pytest.fixture(autouse=True)
 def mock_requests(monkeypatch: pytest.MonkeyPatch):
-    monkeypatch.setattr("requests.get", MockGet())
-    monkeypatch.delattr("requests.post")
-    monkeypatch.delattr("requests.put")
-    monkeypatch.delattr("requests.delete")
+    monkeypatch.setattr("requests.Session.get", MockGet())
+    monkeypatch.delattr("requests.Session.post")
+    monkeypatch.delattr("requests.Session.put")
+    monkeypatch.delattr("requests.Session.delete")
+
+
+@pytest.fixture(autouse=True)
+def no_dump(monkeypatch: pytest.MonkeyPatch):
+    """Keeps the downloaded JSON out of the working tree's logs/"""
+    monkeypatch.setattr(
+        "pfbudget.extract.nordigen.NordigenClient.dump", lambda *args: None
+    )
 
 
 @pytest.fixture
@@ -83,17 +105,12 @@ class TestExtractPSD2:
         self, monkeypatch: pytest.MonkeyPatch, extractor: Extractor, bank: Bank
     ):
         monkeypatch.setattr(
-            "requests.get", MockGet(mock_exception=requests.ReadTimeout())
+            "requests.Session.get", MockGet(mock_exception=requests.ReadTimeout())
         )
         with pytest.raises(requests.Timeout):
             extractor.extract(bank)
 
-    def test_extract(
-        self, monkeypatch: pytest.MonkeyPatch, extractor: Extractor, bank: Bank
-    ):
-        monkeypatch.setattr(
-            "pfbudget.extract.nordigen.NordigenClient.dump", lambda *args: None
-        )
+    def test_extract(self, extractor: Extractor, bank: Bank):
         assert extractor.extract(bank) == [
             BankTransaction(
                 dt.date(2023, 1, 14), "string", Decimal("328.18"), bank="Bank#1"
@@ -102,3 +119,84 @@ class TestExtractPSD2:
                 dt.date(2023, 2, 14), "string", Decimal("947.26"), bank="Bank#1"
             ),
         ]
+
+    def test_dump(self, mocker: MockerFixture, extractor: Extractor, bank: Bank):
+        dump = mocker.patch.object(NordigenClient, "dump")
+        extractor.extract(bank)
+
+        # once for each account, with its whole response
+        assert dump.call_count == len(mock.requisitions_id["accounts"])
+        for call in dump.call_args_list:
+            assert call.args[0] == mock.id
+            assert "transactions" in call.args[1]
+
+    def test_token_cached(self, mocker: MockerFixture, bank: Bank):
+        client = NordigenClient(mock.credentials, MockClient())
+        extractor = PSD2Extractor(client)
+
+        select = mocker.spy(DatabaseSession, "select")
+        extractor.extract(bank)
+        extractor.extract(bank)
+        assert select.call_count == 0
+
+    def test_token_margin(self, mocker: MockerFixture):
+        database = MockClient()
+        database.update(
+            Nordigen,
+            [
+                {
+                    "type": "access",
+                    "expires": dt.datetime.now() + dt.timedelta(seconds=30),
+                }
+            ],
+        )
+        exchange = mocker.patch.object(
+            SessionNordigenClient,
+            "exchange_token",
+            return_value={"access": "token#3", "access_expires": 86400},
+        )
+
+        NordigenClient(mock.credentials, database)
+
+        # the stored token, about to expire, was renewed and stored
+        exchange.assert_called_once_with("token#2")
+        access = next(t for t in database.select(Nordigen) if t.type == "access")
+        assert access.token == "token#3"
+        assert access.expires > dt.datetime.now() + dt.timedelta(hours=1)
+
+    def test_manager_closes_session(
+        self, monkeypatch: pytest.MonkeyPatch, mocker: MockerFixture
+    ):
+        monkeypatch.setattr(
+            "pfbudget.extract.nordigen.NordigenCredentialsManager.default",
+            mock.credentials,
+        )
+        close = mocker.spy(requests.Session, "close")
+        with Manager("sqlite://") as manager:
+            manager._database = MockClient()
+            manager.nordigen_client()
+        assert close.call_count == 1
+        assert not manager._nordigen
+
+    def test_session_reused(self, mocker: MockerFixture, bank: Bank):
+        client = NordigenClient(mock.credentials, MockClient())
+
+        session = mocker.spy(requests.Session, "__init__")
+        client.download(mock.id)
+        client.country_banks("PT")
+        assert session.call_count == 0
+
+    def test_extract_interval(self, extractor: Extractor, bank: Bank):
+        assert extractor.extract(bank, dt.date(2023, 2, 1), dt.date(2023, 2, 14)) == [
+            BankTransaction(
+                dt.date(2023, 2, 14), "string", Decimal("947.26"), bank="Bank#1"
+            ),
+        ]
+        assert not extractor.extract(bank, dt.date(2023, 3, 1))
+
+    def test_convert_transactions(self, bank: Bank):
+        booked = mock.accounts_id_transactions["transactions"]["booked"]
+        assert convert_transactions(booked, bank) == [convert(b, bank) for b in booked]
+        assert convert_transactions(booked, bank, dt.date(2023, 2, 1)) == [
+            convert(booked[1], bank)
+        ]
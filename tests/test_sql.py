@@ -0,0 +1,106 @@
+from datetime import date
+from decimal import Decimal
+import random
+import pytest
+
+from mocks.client import MockClient
+
+from pfbudget.db.client import Client
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    Category,
+    CategoryRule,
+    CategorySelector,
+    Tag,
+    TagRule,
+    Transaction,
+    TransactionCategory,
+)
+from pfbudget.transform.categorizer import Categorizer
+from pfbudget.transform.sql import SQLCategorizer, SQLTagger
+from pfbudget.transform.tagger import Tagger
+
+
+def rule(name: str, **kwargs) -> CategoryRule:
+    r = CategoryRule(**kwargs)
+    r.name = name
+    return r
+
+
+def tag_rule(tag: str, **kwargs) -> TagRule:
+    r = TagRule(**kwargs)
+    r.tag = tag
+    return r
+
+
+def category(t: Transaction):
+    return (t.category.name, t.category.selector) if t.category else None
+
+
+rules = [
+    rule("groceries", regex="continente|lidl", max=Decimal("-0.01")),
+    rule("salary", description="SALARY", min=Decimal("10")),
+    rule("january", start=date(2023, 1, 10), end=date(2023, 1, 12), bank="bank#1"),
+    rule("other", description="COMPRA LIDL"),
+]
+
+
+@pytest.fixture
+def transactions() -> list[BankTransaction]:
+    rng = random.Random(0)
+    descriptions = ["COMPRA CONTINENTE", "COMPRA LIDL", "TRF SAVINGS", "SALARY", None]
+    return [
+        BankTransaction(
+            date(2023, 1, 1 + rng.randrange(28)),
+            rng.choice(descriptions),
+            Decimal(rng.randint(-5000, 5000)).scaleb(-2),
+            bank=rng.choice(["bank#1", "bank#2"]),
+        )
+        for _ in range(200)
+    ]
+
+
+@pytest.fixture
+def client(transactions: list[BankTransaction]) -> Client:
+    client = MockClient()
+    client.insert(
+        [
+            Bank("bank#1", "BANK1", AccountType.checking),
+            Bank("bank#2", "BANK2", AccountType.checking),
+        ]
+        + [Category(r.name) for r in rules]
+        + [Tag("tag")]
+    )
+
+    # one of them already categorized
+    transactions[0].category = TransactionCategory("other", CategorySelector.manual)
+    client.insert(transactions)
+    return client
+
+
+class TestSQL:
+    def test_categorize(self, client: Client, transactions: list[BankTransaction]):
+        expected = Categorizer(rules).transform(transactions[1:])
+
+        assert SQLCategorizer(rules).categorize(client) == sum(
+            1 for t in expected if t.category
+        )
+
+        result = client.select(Transaction)
+        assert result[0].category.name == "other"
+        assert [category(t) for t in result[1:]] == [category(t) for t in expected]
+
+    def test_tag(self, client: Client, transactions: list[BankTransaction]):
+        tags = [tag_rule("tag", regex="lidl"), tag_rule("tag", max=Decimal("-40"))]
+        expected = Tagger(tags).transform(transactions[1:])
+
+        SQLTagger(tags).tag(client)
+        SQLTagger(tags).tag(client)
+
+        result = client.select(Transaction)
+        assert not result[0].tags
+        assert [{t.tag for t in r.tags} for r in result[1:]] == [
+            {t.tag for t in e.tags} for e in expected
+        ]
@@ -0,0 +1,162 @@
+import datetime as dt
+from decimal import Decimal
+from pathlib import Path
+import sqlite3
+from typing import Iterator
+import pytest
+from pytest_mock import MockerFixture
+
+from pfbudget.common.types import Transaction
+from pfbudget.db.schema import DbTransaction
+from pfbudget.db.sqlite import DatabaseClient
+
+# from before the integer cents, with the values stored as floats
+CREATE_REAL_TRANSACTIONS_TABLE = """
+CREATE TABLE "transactions" (
+    "date" TEXT NOT NULL,
+    "description" TEXT,
+    "bank" TEXT,
+    "value" REAL NOT NULL,
+    "category" TEXT,
+    "original" TEXT,
+    "additional comments" TEXT
+)
+"""
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> Iterator[DatabaseClient]:
+    with DatabaseClient(str(tmp_path / "data.db")) as client:
+        client.init()
+        yield client
+
+
+@pytest.fixture
+def transactions(client: DatabaseClient) -> list[DbTransaction]:
+    transactions = [
+        DbTransaction(
+            dt.date(2023, 1, 1), "A", "bank", Decimal("-10.25"), None, "", ""
+        ),
+        DbTransaction(dt.date(2023, 1, 2), "B", "bank", Decimal("3.10"), "cat", "", ""),
+        DbTransaction(dt.date(2023, 1, 2), "B", "other", Decimal("3.10"), None, "", ""),
+    ]
+    client.insert_transactions(transactions)
+    return transactions
+
+
+def legacy(path: Path, *rows: tuple) -> None:
+    con = sqlite3.connect(path)
+    with con:
+        con.execute(CREATE_REAL_TRANSACTIONS_TABLE)
+        con.executemany(
+            "INSERT INTO transactions (date, description, bank, value) "
+            "VALUES (?,?,?,?)",
+            rows,
+        )
+    con.close()
+
+
+def schema(path: Path) -> list[tuple[str, str]]:
+    con = sqlite3.connect(path)
+    tables = con.execute(
+        "SELECT name, type FROM pragma_table_info('transactions') WHERE name = 'value'"
+        " UNION ALL SELECT name, type FROM sqlite_master WHERE type = 'table'"
+    ).fetchall()
+    con.close()
+    return tables
+
+
+class TestDatabaseClient:
+    def test_connection_reused(
+        self,
+        mocker: MockerFixture,
+        client: DatabaseClient,
+        transactions: list[DbTransaction],
+    ):
+        connect = mocker.spy(sqlite3, "connect")
+
+        connection = client.connection
+        client.select_all()
+        client.get_banks()
+        client.get_category("cat")
+        assert client.connection is connection
+        assert connect.call_count == 0
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+        client.close()
+        client.select_all()
+        assert connect.call_count == 1
+
+    def test_from_row(self, client: DatabaseClient, transactions: list[DbTransaction]):
+        result = client.select_all()
+
+        assert [
+            (t.date, t.description, t.bank, t.value, t.category) for t in result
+        ] == [
+            (t.date, t.description, t.bank, t.value, t.category) for t in transactions
+        ]
+        assert all(isinstance(t, Transaction) and not t.modified for t in result)
+        assert (result[0].year, result[0].month, result[0].day) == (2023, 1, 1)
+
+    def test_update_categories(
+        self, client: DatabaseClient, transactions: list[DbTransaction]
+    ):
+        first, second, third = client.select_all()
+        first.category = "groceries"
+        third.category = "other"
+        third.category = "salary"
+
+        client.update_categories([first, third, third])
+
+        assert [t.category for t in client.select_all()] == [
+            "groceries",
+            "cat",
+            "salary",
+        ]
+
+    def test_adapters(self, client: DatabaseClient, transactions: list[DbTransaction]):
+        assert client.get_daterange(dt.date(2023, 1, 2), dt.date(2023, 1, 2))
+
+        # the other sqlite3 connections, SQLAlchemy's included, aren't affected
+        assert (Decimal, sqlite3.PrepareProtocol) not in sqlite3.adapters
+        connection = sqlite3.connect(":memory:")
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT ?", (Decimal("12.34"),))
+        connection.close()
+
+
+class TestMigration:
+    def test_cents(self, tmp_path: Path):
+        path = tmp_path / "data.db"
+        legacy(
+            path, ("2023-01-01", "A", "bank", -10.25), ("2023-01-02", "B", "bank", 3.1)
+        )
+
+        with DatabaseClient(str(path)) as client:
+            transactions = client.select_all()
+
+        assert [(t.date, t.value) for t in transactions] == [
+            (dt.date(2023, 1, 1), Decimal("-10.25")),
+            (dt.date(2023, 1, 2), Decimal("3.10")),
+        ]
+        assert ("value", "CENTS") in schema(path)
+        assert ("transactions_real", "table") not in schema(path)
+
+        # backed up before migrating
+        assert ("value", "REAL") in schema(tmp_path / "data.db.bak")
+
+    def test_failure(self, tmp_path: Path):
+        path = tmp_path / "data.db"
+        # the bank became NOT NULL, so the copy fails
+        legacy(path, ("2023-01-01", "A", "bank", -10.25), ("2023-01-02", "B", None, 1))
+
+        client = DatabaseClient(str(path))
+        with pytest.raises(sqlite3.IntegrityError):
+            client.connection
+
+        # rolled back as a whole, to be retried on the next connection
+        assert ("value", "REAL") in schema(path)
+        assert ("transactions_real", "table") not in schema(path)
+        con = sqlite3.connect(path)
+        assert con.execute("SELECT count(*) FROM transactions").fetchone() == (2,)
+        con.close()
@@ -0,0 +1,20 @@
+import subprocess
+import sys
+import pytest
+
+
+# modules that only some operations need and so shouldn't be imported upfront
+lazy = ["nordigen", "requests", "yaml", "matplotlib", "pfbudget.transform.categorizer"]
+
+
+class TestStartup:
+    @pytest.mark.parametrize(
+        "module", ["pfbudget.__main__", "pfbudget.core.manager", "pfbudget.cli.params"]
+    )
+    def test_lazy_imports(self, module: str):
+        code = f"import sys, {module}; print(*sys.modules)"
+        imported = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout.split()
+
+        assert not [m for m in lazy if m in imported]
@@ -0,0 +1,141 @@
+from datetime import date
+from decimal import Decimal
+
+from mocks.client import MockClient
+
+from pfbudget.common.frame import TransactionFrame
+from pfbudget.common.types import TransactionRecord
+from pfbudget.db.model import (
+    AccountType,
+    Bank,
+    BankTransaction,
+    CategoryRule,
+    MoneyTransaction,
+    TagRule,
+)
+from pfbudget.transform.stats import ledger, report, statistics
+
+
+def rule(name: str, **kwargs) -> CategoryRule:
+    r = CategoryRule(**kwargs)
+    r.name = name
+    return r
+
+
+def tag(name: str, **kwargs) -> TagRule:
+    r = TagRule(**kwargs)
+    r.tag = name
+    return r
+
+
+records = [
+    TransactionRecord(date(2023, 1, 1), "COMPRA LIDL", Decimal("-10"), "bank"),
+    TransactionRecord(date(2023, 1, 2), "COMPRA LIDL", Decimal("-20"), "bank"),
+    TransactionRecord(date(2023, 1, 3), "SALARY", Decimal("1000"), "bank"),
+]
+transactions = TransactionFrame.from_rows(
+    (None, r.date, r.description, r.amount, r.bank, None) for r in records
+)
+
+
+class TestStats:
+    def test_categories(self):
+        rules = [
+            rule("groceries", regex="lidl"),
+            rule("cheap", max=Decimal("-15")),
+            rule("lidl", description="COMPRA LIDL"),
+            rule("never", description="NEVER"),
+            rule("salary", min=Decimal("0")),
+        ]
+
+        stats = statistics(rules, transactions)
+
+        assert [(s.matches, s.wins) for s in stats] == [
+            (2, 2),
+            (1, 0),
+            (2, 0),
+            (0, 0),
+            (1, 1),
+        ]
+        assert stats[0].overlaps == {1: 1, 2: 2}
+        assert [s.name for s in stats if s.shadowed] == ["cheap", "lidl"]
+        assert [s.name for s in stats if s.dead] == ["never"]
+
+        lines = report("category rules", stats).splitlines()
+        assert "never matching:" in lines
+        assert "  #None lidl, by #None groceries" in lines
+
+    def test_shadowed_by_winner(self):
+        rules = [
+            rule("cheap", max=Decimal("-15")),
+            rule("new year", end=date(2023, 1, 1)),
+            rule("groceries", regex="lidl"),
+            rule("lidl", description="COMPRA LIDL"),
+        ]
+
+        stats = statistics(rules, transactions)
+
+        # lidl overlaps groceries the most, but the earlier rules won its matches
+        assert stats[2].overlaps == {0: 1, 1: 1, 3: 2}
+        assert stats[2].shadowers == {0: 1, 1: 1}
+        assert "  #None groceries, by #None new year" in report("", stats).splitlines()
+
+    def test_tags(self):
+        rules = [
+            tag("lidl", regex="lidl"),
+            tag("expense", max=Decimal("0")),
+            tag("lidl", description="COMPRA LIDL"),
+        ]
+
+        stats = statistics(rules, transactions)
+
+        assert [(s.matches, s.wins) for s in stats] == [(2, 2), (2, 2), (2, 0)]
+        assert [s.overlaps for s in stats] == [{2: 2}, {}, {0: 2}]
+
+    def test_tags_shadowed(self):
+        rules = [
+            tag("expense", max=Decimal("0")),
+            tag("lidl", regex="lidl"),
+            tag("lidl", description="COMPRA LIDL"),
+        ]
+
+        stats = statistics(rules, transactions)
+
+        # expense is a different tag, so it doesn't shadow lidl
+        assert stats[2].shadowers == {1: 2}
+        assert "  #None lidl, by #None lidl" in report("tags", stats).splitlines()
+
+    def test_ledger(self):
+        client = MockClient()
+        client.insert([Bank("bank", "BANK", AccountType.checking)])
+        client.insert(
+            [
+                BankTransaction(date(2023, 1, 1), "a", Decimal("-1.5"), bank="bank"),
+                MoneyTransaction(date(2023, 1, 2), "b", Decimal("2")),
+            ]
+        )
+
+        frame = ledger(client)
+        assert len(frame) == 1
+        assert frame.row(0)[1:] == (
+            date(2023, 1, 1),
+            "a",
+            Decimal("-1.5"),
+            "bank",
+            None,
+        )
+
+    def test_rule_matches(self):
+        rules = [
+            rule("groceries", regex="lidl"),
+            rule("cheap", max=Decimal("-15")),
+            rule("salary", min=Decimal("0"), bank="bank"),
+            rule("january", start=date(2023, 1, 2), end=date(2023, 1, 31)),
+        ]
+
+        stats = statistics(rules, transactions)
+
+        # the same as the ORM rules, one transaction at a time
+        assert [s.matches for s in stats] == [
+            sum(r.matches(t) for t in records) for r in rules  # type: ignore
+        ]
@@ -0,0 +1,40 @@
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from pfbudget.db.client import Client
+from pfbudget.db.model import AccountType, Bank, Transaction
+from pfbudget.db.template import SQLiteTemplate
+
+
+class TestTemplate:
+    def test_memory_clones(self):
+        template = SQLiteTemplate()
+        a = Client("sqlite://", **template.options())
+        b = Client("sqlite://", **template.options())
+
+        a.insert([Bank("bank", "BANK", AccountType.checking)])
+        a.insert([Transaction(date(2023, 1, 1), "", Decimal("-10"))])
+
+        assert len(a.select(Bank)) == 1
+        assert len(a.select(Transaction)) == 1
+        assert not b.select(Bank)
+        assert not b.select(Transaction)
+
+    def test_file(self, tmp_path: Path):
+        path = tmp_path / "template.db"
+        template = SQLiteTemplate(path)
+        client = Client(
+            f"sqlite:///{tmp_path}/a.db", **template.options(tmp_path / "a.db")
+        )
+        client.insert([Bank("bank", "BANK", AccountType.checking)])
+        assert path.exists()
+
+        # an existing template file is reused as it is
+        client = Client(
+            f"sqlite:///{tmp_path}/b.db",
+            **SQLiteTemplate(path).options(tmp_path / "b.db"),
+        )
+        assert not client.select(Bank)
+        client.insert([Bank("bank", "BANK", AccountType.checking)])
+        assert len(client.select(Bank)) == 1
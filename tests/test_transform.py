@@ -1,22 +1,29 @@
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+import itertools
+import pickle
+import random
+from typing import Sequence
 import pytest
 
 import mocks.categories as mock
 
+from pfbudget.common.types import RecordCategory, RecordTag, TransactionRecord
 from pfbudget.db.model import (
     BankTransaction,
     Category,
     CategoryRule,
     CategorySelector,
+    TagRule,
     TransactionCategory,
     TransactionTag,
 )
 from pfbudget.transform.categorizer import Categorizer
-from pfbudget.transform.exceptions import MoreThanOneMatchError
+from pfbudget.transform.exceptions import MoreThanOneMatchError, UnsortedError
 from pfbudget.transform.nullifier import Nullifier
+from pfbudget.transform.parallel import CompiledRule, row
 from pfbudget.transform.tagger import Tagger
-from pfbudget.transform.transform import Transformer
+from pfbudget.transform.transform import ChangeSet, Transformer
 
 
 class TestTransform:
@@ -80,6 +87,21 @@ class TestTransform:
         with pytest.raises(MoreThanOneMatchError):
             categorizer.transform_inplace(transactions)
 
+    def test_nullifier_cents(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "", Decimal("-10.5"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 2), "", Decimal("10.50"), bank="Bank#2"),
+            BankTransaction(date(2023, 1, 1), "", Decimal("-10.51"), bank="Bank#1"),
+        ]
+
+        Nullifier().transform_inplace(transactions)
+
+        assert [t.category.name if t.category else None for t in transactions] == [
+            "null",
+            "null",
+            None,
+        ]
+
     def test_nullifier_with_rules(self):
         transactions = [
             BankTransaction(date(2023, 1, 1), "", Decimal("-500"), bank="Bank#1"),
@@ -157,3 +179,199 @@ class TestTransform:
 
         transactions = Categorizer(cat.rules).transform(transactions)
         assert all(t.category.name == cat.name for t in transactions)
+
+    def test_records(self):
+        records = [
+            TransactionRecord(date(2023, 1, 1), "desc#1", Decimal("-15"), "Bank#1"),
+            TransactionRecord(date(2023, 1, 2), "desc#2", Decimal("-10"), "Bank#1"),
+            TransactionRecord(date(2023, 1, 2), "desc#3", Decimal("10"), "Bank#2"),
+            TransactionRecord(date(2023, 1, 3), "desc#1", Decimal("-20"), "Bank#1"),
+        ]
+
+        rules = mock.category1.rules + mock.category2.rules
+        for rule in mock.category1.rules:
+            rule.name = mock.category1.name
+        for rule in mock.category2.rules:
+            rule.name = mock.category2.name
+        for rule in mock.tag_1.rules:
+            rule.tag = mock.tag_1.name
+
+        nullified = Nullifier().transform(records)
+        categorized = Categorizer(rules).transform(nullified)
+        tagged = Tagger(mock.tag_1.rules).transform(categorized)
+
+        # the input records are left as they were
+        assert not any(r.category or r.tags for r in records)
+        assert nullified[0] is records[0]
+
+        assert [t.category for t in tagged] == [
+            RecordCategory("cat#1", CategorySelector.rules),
+            RecordCategory("null", CategorySelector.nullifier),
+            RecordCategory("null", CategorySelector.nullifier),
+            RecordCategory("cat#1", CategorySelector.rules),
+        ]
+        assert tagged[0].tags == {RecordTag("cat#2"), RecordTag("tag#1")}
+
+        orm = tagged[0].orm()
+        assert orm.category == TransactionCategory("cat#1", CategorySelector.rules)
+        assert orm.tags == {TransactionTag("cat#2"), TransactionTag("tag#1")}
+
+    def test_changes(self):
+        transactions = [
+            BankTransaction(date(2023, 1, 1), "desc#1", Decimal("-10"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 2), "desc#2", Decimal("-10"), bank="Bank#1"),
+        ]
+
+        rules = mock.category1.rules
+        for rule in rules:
+            rule.name = mock.category1.name
+
+        changes = Categorizer(rules).changes(transactions)
+        assert changes.category(0, transactions[0]) == "cat#1"
+        assert 1 not in changes
+        assert not any(t.category for t in transactions)
+
+        # only the changed transactions are copied
+        result = changes.applied(transactions)
+        assert result[0] is not transactions[0]
+        assert result[1] is transactions[1]
+        assert result[0].category == TransactionCategory(
+            "cat#1", CategorySelector.rules
+        )
+        assert not transactions[0].category
+
+        changes.apply(transactions)
+        assert transactions[0].category == result[0].category
+
+    def test_changes_tags(self):
+        transaction = BankTransaction(
+            date(2023, 1, 1), "", Decimal("-10"), bank="Bank#1"
+        )
+        transaction.tags = {TransactionTag("tag#1")}
+
+        changes = ChangeSet()
+        changes.tag(0, "tag#2")
+        assert changes.tags(0, transaction) == {"tag#1", "tag#2"}
+
+        [tagged] = changes.applied([transaction])
+        assert tagged.tags == {TransactionTag("tag#1"), TransactionTag("tag#2")}
+        assert transaction.tags == {TransactionTag("tag#1")}
+
+    def test_parallel(self):
+        rng = random.Random(0)
+        descriptions = ["COMPRA LIDL", "TRF", "SALARY", "desc#1", None]
+        transactions = [
+            BankTransaction(
+                date(2023, 1, 1 + rng.randrange(28)),
+                rng.choice(descriptions),
+                Decimal(rng.randint(-3000, 3000)).scaleb(-2),
+                bank=rng.choice(["Bank#1", "Bank#2"]),
+            )
+            for _ in range(400)
+        ] + [
+            BankTransaction(date(2023, 1, 5), "TRF", Decimal("-99"), bank="Bank#1"),
+            BankTransaction(date(2023, 1, 6), "TRF", Decimal("99"), bank="Bank#2"),
+        ]
+
+        def rule(name: str, **kwargs) -> CategoryRule:
+            r = CategoryRule(**kwargs)
+            r.name = name
+            return r
+
+        def tag(name: str, **kwargs) -> TagRule:
+            r = TagRule(**kwargs)
+            r.tag = name
+            return r
+
+        categories = [
+            rule("groceries", regex="lidl", max=-0.005),
+            rule("salary", description="SALARY", min=Decimal("10")),
+            rule("bank", bank="Bank#1", start=date(2023, 1, 10)),
+        ]
+        tags = [tag("tag#1", regex="^trf"), tag("tag#2", max=Decimal("-10.001"))]
+        nulls = [rule("null", description="TRF")]
+
+        def categorize(jobs: int) -> Sequence[BankTransaction]:
+            result = Nullifier(nulls, jobs).transform(transactions)
+            result = Categorizer(categories, jobs).transform(result)
+            return Tagger(tags, jobs).transform(result)
+
+        assert categorize(2) == categorize(1)
+        assert sum(t.category.name == "null" for t in categorize(1) if t.category) >= 2
+
+    def test_compiled_rule(self):
+        r = CategoryRule(regex="desc", min=Decimal("-10.001"), max=Decimal("5.999"))
+        compiled = pickle.loads(pickle.dumps(CompiledRule.compile(r, "cat")))
+
+        assert (compiled.min, compiled.max) == (-1000, 599)
+        for amount in ("-10.01", "-10", "5.99", "6"):
+            t = BankTransaction(date(2023, 1, 1), "DESC", Decimal(amount))
+            assert compiled.matches(row(t)) == r.matches(t)
+
+    def test_compiled_rule_empty(self):
+        for regex in (".*", "^$"):
+            r = CategoryRule(regex=regex)
+            compiled = CompiledRule.compile(r, "cat")
+            for description in ("", "DESC", None):
+                t = BankTransaction(date(2023, 1, 1), description, Decimal("-1"))
+                assert compiled.matches(row(t)) == r.matches(t)
+
+    def test_stream(self):
+        rng = random.Random(0)
+        records = sorted(
+            TransactionRecord(
+                date(2023, 1, 1) + timedelta(days=rng.randrange(120)),
+                rng.choice(["COMPRA LIDL", "TRF", "SALARY"]),
+                Decimal(rng.randint(-3000, 3000)),
+                rng.choice(["Bank#1", "Bank#2"]),
+            )
+            for _ in range(300)
+        )
+        # transfers, a few days apart, with amounts no other transaction has
+        for i in range(20):
+            day = date(2023, 1, 1) + timedelta(days=6 * i)
+            records.append(TransactionRecord(day, "TRF", Decimal(-i - 0.5), "Bank#1"))
+            records.append(
+                TransactionRecord(
+                    day + timedelta(days=i % 5), "TRF", Decimal(i + 0.5), "Bank#2"
+                )
+            )
+        records.sort()
+
+        categories = [CategoryRule(regex="lidl"), CategoryRule(min=Decimal("0"))]
+        categories[0].name, categories[1].name = "groceries", "income"
+        tags = [TagRule(regex="^trf")]
+        tags[0].tag = "transfer"
+
+        expected = Tagger(tags).transform(
+            Categorizer(categories).transform(Nullifier().transform(records))
+        )
+
+        for size in (1, 7, 1000):
+            stream = Tagger(tags).stream(
+                Categorizer(categories).stream(
+                    Nullifier().stream(iter(records), size), size
+                ),
+                size,
+            )
+            assert list(stream) == expected
+        assert sum(t.category.name == "null" for t in expected if t.category) >= 40
+
+    def test_stream_lazy(self):
+        def transactions():
+            for i in itertools.count():
+                yield TransactionRecord(
+                    date(2023, 1, 1) + timedelta(days=i), "", Decimal(i), "Bank#1"
+                )
+
+        stream = Nullifier().stream(transactions(), 10)
+        assert len(list(itertools.islice(stream, 100))) == 100
+
+    def test_stream_unsorted(self):
+        records = [
+            TransactionRecord(date(2023, 1, 2), "", Decimal("-10"), "Bank#1"),
+            TransactionRecord(date(2023, 1, 1), "", Decimal("10"), "Bank#2"),
+        ]
+
+        with pytest.raises(UnsortedError):
+            list(Nullifier().stream(records, 1))
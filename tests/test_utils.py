@@ -0,0 +1,20 @@
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+
+from pfbudget.utils.utils import from_cents, parse_decimal, to_cents
+
+
+class TestUtils:
+    def test_parse_decimal(self):
+        assert parse_decimal("-1.5") == Decimal("-1.5")
+        assert parse_decimal("1.234,56 €") == Decimal("1234.56")
+        assert parse_decimal("+1,234.56") == Decimal("1234.56")
+
+    def test_cents(self):
+        for amount in ("0", "-0.01", "10.5", "-123456789012.34"):
+            assert from_cents(to_cents(Decimal(amount))) == Decimal(amount)
+
+        # rounded half away from zero, as a Numeric(16, 2) column
+        assert to_cents(Decimal("0.005")) == 1
+        assert to_cents(Decimal("-0.005")) == -1
+        assert to_cents(Decimal("0.001"), ROUND_CEILING) == 1
+        assert to_cents(Decimal("-0.001"), ROUND_FLOOR) == -1